@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+
+import parsers
+
+
+class CapacityTimeline:
+    """Link capacity from tc.log as a step function over the seconds since the start of the test."""
+
+    def __init__(self, seconds, bps):
+        order = np.argsort(seconds, kind='stable')
+        self.seconds = np.asarray(seconds, dtype='float64')[order]
+        self.bps = np.asarray(bps, dtype='float64')[order]
+
+    @classmethod
+    def from_tc(cls, tc_df, start_time):
+        if tc_df.empty:
+            return cls([], [])
+
+        if 'bandwidth_bps' in tc_df.columns:
+            bps = tc_df['bandwidth_bps']
+        elif 'bandwidth' in tc_df.columns:
+            bps = parsers.parse_bandwidth(tc_df['bandwidth'])
+        else:
+            # delay or loss only netem runs do not set a rate
+            return cls([], [])
+
+        if 't_rel' in tc_df.columns:
+            seconds = tc_df['t_rel'].to_numpy()
+        else:
+            seconds = parsers.relative_seconds(tc_df['time'], start_time)
+
+        # rows with invalid rates (NaN, see parsers.parse_bandwidth) are skipped
+        valid = bps.notna().to_numpy()
+        return cls(seconds[valid], bps.to_numpy()[valid])
+
+    @property
+    def empty(self):
+        return len(self.seconds) == 0
+
+    def at(self, seconds):
+        """capacity in effect at each of the given seconds (as-of lookup), NaN before the first update"""
+        seconds = np.asarray(seconds, dtype='float64')
+        idx = np.searchsorted(self.seconds, seconds, side='right') - 1
+        if self.empty:
+            return np.full(seconds.shape, np.nan)
+        return np.where(idx >= 0, self.bps[np.clip(idx, 0, None)], np.nan)
+
+    def utilization(self, seconds, bits, interval=1.0):
+        """sums bits per interval and divides them by the capacity at the start of each interval"""
+        seconds = np.asarray(seconds, dtype='float64')
+        if len(seconds) == 0:
+            return pd.DataFrame(columns=['rate', 'capacity', 'utilization'])
+
+        bins = np.floor(seconds / interval).astype('int64')
+        first_bin = bins.min()
+        rate = np.bincount(bins - first_bin, weights=np.nan_to_num(
+            np.asarray(bits, dtype='float64'))) / interval
+        second = (np.arange(len(rate)) + first_bin) * interval
+
+        df = pd.DataFrame({'rate': rate, 'capacity': self.at(second)},
+                          index=pd.Index(second, name='second'))
+        df['utilization'] = df['rate'] / df['capacity']
+        return df
@@ -0,0 +1,256 @@
+import json
+import sqlite3
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.feather as feather
+
+CATALOG_FILE = 'catalog.sqlite'
+
+# bump when the schema changes, the catalog is rebuilt then
+SCHEMA_VERSION = 2
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS files (
+    dir TEXT NOT NULL,
+    name TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    rows INTEGER,
+    time_min INTEGER,
+    time_max INTEGER,
+    PRIMARY KEY (dir, name)
+);
+CREATE TABLE IF NOT EXISTS cases (
+    dir TEXT PRIMARY KEY,
+    iteration TEXT NOT NULL,
+    testcase TEXT NOT NULL,
+    link TEXT,
+    transport TEXT,
+    cc TEXT,
+    config TEXT
+);
+CREATE INDEX IF NOT EXISTS cases_testcase ON cases (testcase);
+CREATE INDEX IF NOT EXISTS cases_link ON cases (link);
+CREATE INDEX IF NOT EXISTS cases_transport ON cases (transport);
+CREATE INDEX IF NOT EXISTS cases_cc ON cases (cc);
+'''
+
+# congestion controllers recognized in test case names
+CC_ALGORITHMS = ('nada', 'scream', 'gcc', 'bbr', 'cubic', 'newreno', 'reno', 'static')
+
+# config keys of the case attributes, at the top level or in the sender application
+ATTRIBUTE_KEYS = {
+    'link': ('link', 'link_type'),
+    'transport': ('transport',),
+    'cc': ('cc', 'congestion_control', 'congestion-control'),
+}
+
+def _feather_info(path):
+    """(rows, min time, max time) of a feather file, times in ns. The row
+    count comes from the file metadata, only the time column is read."""
+    try:
+        with pa.memory_map(str(path)) as source:
+            reader = pa.ipc.open_file(source)
+            rows = reader.count_rows()
+            schema = reader.schema
+        if rows == 0 or 'time' not in schema.names:
+            return rows, None, None
+        time_type = schema.field('time').type
+        if not (pa.types.is_integer(time_type) or pa.types.is_timestamp(time_type)):
+            return rows, None, None
+        time = feather.read_table(str(path), columns=['time'], memory_map=True)['time']
+        low, high = pc.min_max(time.cast('int64')).values()
+        return rows, low.as_py(), high.as_py()
+    except (pa.ArrowInvalid, OSError):
+        return None, None, None
+
+
+def _read_config(dir):
+    """first record of config.json (or the parsed config.feather) as json text"""
+    config_json = dir / Path('config.json')
+    if config_json.is_file():
+        with open(config_json) as f:
+            for line in f:
+                if line.strip():
+                    return json.dumps(json.loads(line))
+        return None
+
+    config_feather = dir / Path('config.feather')
+    try:
+        with pa.memory_map(str(config_feather)) as source:
+            table = pa.ipc.open_file(source).read_all()
+            if table.num_rows == 0:
+                return None
+            return table.slice(0, 1).to_pandas().iloc[0].to_json()
+    except (pa.ArrowInvalid, OSError):
+        return None
+
+
+def _name_attributes(testcase):
+    """link, transport and cc from a test case name as
+    <link>_<transport>-rtp-...-<cc>[-...], None where the name has none"""
+    link, _, stack = testcase.partition('_')
+    tokens = stack.split('-') if stack else []
+    return {
+        'link': link,
+        'transport': tokens[0] if tokens else None,
+        'cc': next((token for token in tokens if token in CC_ALGORITHMS), None),
+    }
+
+
+def _case_attributes(config, testcase):
+    """link, transport and cc of a test case from its config (json text or
+    None), the name is the fallback for attributes the config does not record"""
+    config = json.loads(config) if config is not None else {}
+    sources = [config]
+    for app in config.get('applications') or []:
+        if isinstance(app, dict) and app.get('name') == 'sender':
+            sources.append(app)
+
+    attributes = _name_attributes(testcase)
+    for name, keys in ATTRIBUTE_KEYS.items():
+        values = [source[key] for source in sources for key in keys
+                  if source.get(key) is not None]
+        if values:
+            attributes[name] = str(values[0])
+    return attributes
+
+
+class Catalog:
+    """Index of a results tree (iteration/testcase/*) in an SQLite file at its
+    root. Per file it stores size and mtime, for feather files also the row
+    count and time range, and per test case its config and the link,
+    transport and cc parsed from it (indexed columns). update()
+    only stats the tree and re-reads new or changed files."""
+
+    def __init__(self, root):
+        self.root = Path(root)
+        try:
+            self.db = self._connect(self.root / Path(CATALOG_FILE))
+        except sqlite3.OperationalError:
+            # read only tree, keep the catalog in memory
+            self.db = self._connect(':memory:')
+
+    @staticmethod
+    def _connect(path):
+        db = sqlite3.connect(path)
+        if db.execute('PRAGMA user_version').fetchone()[0] != SCHEMA_VERSION:
+            db.executescript('DROP TABLE IF EXISTS files; DROP TABLE IF EXISTS cases;')
+            db.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+        db.executescript(SCHEMA)
+        return db
+
+    def _dirs(self):
+        """directories of the tree up to the test cases, relative to root"""
+        yield ''
+        for iteration in sorted(self.root.iterdir()):
+            if iteration.is_dir():
+                yield iteration.name
+                for case in sorted(iteration.iterdir()):
+                    if case.is_dir():
+                        yield f'{iteration.name}/{case.name}'
+
+    def update(self):
+        known = {(dir, name): (size, mtime) for dir, name, size, mtime in
+                 self.db.execute('SELECT dir, name, size, mtime_ns FROM files')}
+        known_cases = {row[0] for row in self.db.execute('SELECT dir FROM cases')}
+        seen = set()
+        changed = set()
+
+        with self.db:
+            for dir in self._dirs():
+                # also case directories without any files
+                if dir.count('/') == 1 and dir not in known_cases:
+                    changed.add(dir)
+                for entry in (self.root / Path(dir)).iterdir():
+                    if not entry.is_file() or entry.name.startswith(CATALOG_FILE):
+                        continue
+                    key = (dir, entry.name)
+                    seen.add(key)
+                    stat = entry.stat()
+                    if known.get(key) == (stat.st_size, stat.st_mtime_ns):
+                        continue
+
+                    info = (_feather_info(entry) if entry.suffix == '.feather'
+                            else (None, None, None))
+                    self.db.execute('INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?)',
+                                    (*key, stat.st_size, stat.st_mtime_ns, *info))
+                    changed.add(dir)
+
+            for key in known.keys() - seen:
+                self.db.execute('DELETE FROM files WHERE dir = ? AND name = ?', key)
+                changed.add(key[0])
+            changed |= {dir for dir in known_cases if not (self.root / Path(dir)).is_dir()}
+
+            for dir in changed:
+                self._update_case(dir)
+        return self
+
+    def _update_case(self, dir):
+        self.db.execute('DELETE FROM cases WHERE dir = ?', (dir,))
+        if dir.count('/') != 1 or not (self.root / Path(dir)).is_dir():
+            return
+        config = _read_config(self.root / Path(dir))
+        if config is None:
+            # still listed like all case directories, attributes from the name
+            print(f'no config.json or config.feather in {self.root / Path(dir)}')
+        iteration, testcase = dir.split('/')
+        attributes = _case_attributes(config, testcase)
+        self.db.execute('INSERT INTO cases VALUES (?, ?, ?, ?, ?, ?, ?)',
+                        (dir, iteration, testcase, attributes['link'],
+                         attributes['transport'], attributes['cc'], config))
+
+    def cases(self, testcase=None, link=None, transport=None, cc=None):
+        """test cases as (testcase, path, iteration) tuples, optionally only
+        those with the given attributes"""
+        query = 'SELECT testcase, dir, iteration FROM cases WHERE 1'
+        params = []
+        for column, value in [('testcase', testcase), ('link', link),
+                              ('transport', transport), ('cc', cc)]:
+            if value is not None:
+                query += f' AND {column} = ?'
+                params.append(value)
+        query += ' ORDER BY iteration, testcase'
+        return [(testcase, str(self.root / Path(dir)), iteration)
+                for testcase, dir, iteration in self.db.execute(query, params)]
+
+    def case_keys(self):
+        """(path, iteration, testcase, link, transport, cc) of each test case"""
+        return [(str(self.root / Path(dir)), *keys) for dir, *keys in self.db.execute(
+            'SELECT dir, iteration, testcase, link, transport, cc FROM cases '
+            'ORDER BY iteration, testcase')]
+
+    def testcases(self):
+        return [row[0] for row in self.db.execute(
+            'SELECT DISTINCT testcase FROM cases ORDER BY testcase')]
+
+    def _distinct(self, column):
+        return [row[0] for row in self.db.execute(
+            f'SELECT DISTINCT {column} FROM cases WHERE {column} IS NOT NULL ORDER BY {column}')]
+
+    def links(self):
+        return self._distinct('link')
+
+    def transports(self):
+        return self._distinct('transport')
+
+    def ccs(self):
+        return self._distinct('cc')
+
+    def files(self, dir=None, suffixes=None):
+        """(dir, name, rows, time_min, time_max) of the files in dir (relative
+        to root, '' for root) or all files, optionally only with the suffixes"""
+        query = 'SELECT dir, name, rows, time_min, time_max FROM files WHERE 1'
+        params = []
+        if dir is not None:
+            query += ' AND dir = ?'
+            params.append(dir)
+        rows = self.db.execute(query + ' ORDER BY dir, name', params).fetchall()
+        if suffixes is not None:
+            rows = [row for row in rows if Path(row[1]).suffix in suffixes]
+        return rows
+
+    def close(self):
+        self.db.close()
@@ -0,0 +1,318 @@
+from functools import cached_property
+from pathlib import Path
+
+import pandas as pd
+
+import parsers
+import plotters
+import serializers
+import stats
+import summary
+import video_quality
+from capacity import CapacityTimeline
+
+
+class CaseContext:
+    """Data of one test case directory. Feather files are read on first use
+    and kept, derived frames (OWD, frame latency, summary) are computed once,
+    so all tables and plots of a case share them."""
+
+    def __init__(self, dir):
+        self.dir = Path(dir)
+        self._tables = {}
+
+    def __str__(self):
+        return str(self.dir)
+
+    def __fspath__(self):
+        return str(self.dir)
+
+    def table(self, name):
+        """LogTable of the feather file, None if it does not exist"""
+        if name not in self._tables:
+            path = self.dir / Path(name)
+            self._tables[name] = serializers.read_table(path) if path.is_file() else None
+        return self._tables[name]
+
+    def read(self, name):
+        """the feather file as a new pandas frame, None if it does not exist"""
+        table = self.table(name)
+        return None if table is None else table.to_pandas()
+
+    def forget(self, name):
+        """drops the loaded table, e.g. after the file was written"""
+        self._tables.pop(name, None)
+
+    def release(self):
+        """drops loaded tables and the per packet OWD, keeps the per frame and
+        per case data (e.g. to send a prepared context to another process)"""
+        self._tables.clear()
+        self.__dict__.pop('owd', None)
+
+    @cached_property
+    def start_time(self):
+        config = self.table('config.feather')
+        if config is None:
+            raise FileNotFoundError(f'config.feather not found in {self.dir}')
+        return pd.Timestamp(config.to_pandas(['time'])['time'][0])
+
+    @cached_property
+    def owd(self):
+        return get_owd(self)
+
+    @cached_property
+    def frame_latency(self):
+        """latency column of plotters.get_frame_latency_df, None without frames"""
+        frames = self.table('frames.feather')
+        if frames is None:
+            return None
+        df = plotters.get_frame_latency_df(self.start_time, frames)
+        return df if df.empty else df[['latency']]
+
+    def is_current(self, name, inputs):
+        """whether the file exists and no existing input file is newer"""
+        path = self.dir / Path(name)
+        if not path.is_file():
+            return False
+        mtime = path.stat().st_mtime_ns
+        inputs = [self.dir / Path(input) for input in inputs]
+        return all(input.stat().st_mtime_ns <= mtime for input in inputs if input.is_file())
+
+    @cached_property
+    def summary(self):
+        """summary.feather of the case, built from the case data if it is
+        missing or older than its inputs"""
+        if self.is_current(summary.SUMMARY_FILE, SUMMARY_INPUTS):
+            return summary.Summary(self.read(summary.SUMMARY_FILE))
+        return summary.Summary(build_summary(self))
+
+
+# files the summary is built from
+SUMMARY_INPUTS = [
+    'config.feather', 'tc.feather', 'frames.feather', 'video.quality.feather',
+    'ns4.rtp.feather', 'ns1.rtp.feather', 'sender.feather', 'receiver.feather',
+    'sender.roq.feather', 'sender.stderr.feather', 'receiver.stderr.feather',
+]
+
+
+def _write(df, case, name):
+    """writes df to the case directory, an empty df removes an older file"""
+    if df.empty:
+        (case.dir / Path(name)).unlink(missing_ok=True)
+        case.forget(name)
+        return False
+    serializers.write_feather(df, case.dir / Path(name))
+    case.forget(name)
+    return True
+
+
+def derive_rtp_stages(case):
+    """writes per packet stage delays of the RTP stack (udp or roq)"""
+    tx_log = case.read('sender.stderr.feather')
+    rx_log = case.read('receiver.stderr.feather')
+    if tx_log is None or rx_log is None:
+        return
+
+    pcap_tx = case.read('ns4.rtp.feather')
+    pcap_rx = case.read('ns1.rtp.feather')
+    config = case.read('config.feather')
+    if pcap_tx is not None and pcap_rx is not None and config is not None:
+        df = plotters.get_rtp_owd_udp_stages(
+            case.start_time, tx_log, rx_log, pcap_tx, pcap_rx, config)
+        _write(df, case, 'rtp.udp.stages.feather')
+
+    # qlog makes sure it is only derived for roq transport
+    if (case.dir / Path('sender.feather')).is_file():
+        df = plotters.get_rtp_owd_roq_stages(case.start_time, tx_log, rx_log)
+        _write(df, case, 'rtp.roq.stages.feather')
+
+
+def derive_frames(case):
+    """writes the lifecycle of each video frame"""
+    tx_log = case.read('sender.stderr.feather')
+    rx_log = case.read('receiver.stderr.feather')
+    if tx_log is None or rx_log is None:
+        return
+
+    try:
+        df = video_quality.get_frames(tx_log, rx_log)
+    except (KeyError, ValueError):
+        return
+    _write(df, case, 'frames.feather')
+
+
+def get_owd(case):
+    """per packet network OWD from pcaps, or from qlogs if there are no pcaps"""
+    pcap_tx = case.table('ns4.rtp.feather')
+    pcap_rx = case.table('ns1.rtp.feather')
+    if pcap_tx is not None and pcap_rx is not None:
+        return plotters.get_rtp_owd_pcap_df(case.start_time, pcap_tx, pcap_rx)
+
+    qlog_tx = case.table('sender.feather')
+    qlog_rx = case.table('receiver.feather')
+    if qlog_tx is not None and qlog_rx is not None:
+        ok, df = plotters.get_qlog_owd_df(case.start_time, qlog_tx, qlog_rx)
+        if ok:
+            return df
+    return None
+
+
+def get_loss(case):
+    """(sent, received) media packets from pcaps or qlogs"""
+    pcap_tx = case.table('ns4.rtp.feather')
+    pcap_rx = case.table('ns1.rtp.feather')
+    if pcap_tx is not None and pcap_rx is not None:
+        sent = pcap_tx.to_pandas(['extseq'])['extseq'].unique()
+        received = pcap_rx.to_pandas(['extseq'])['extseq'].unique()
+        return len(sent), int(pd.Series(received).isin(sent).sum())
+
+    qlog_tx = case.table('sender.feather')
+    qlog_rx = case.table('receiver.feather')
+    if qlog_tx is not None and qlog_rx is not None:
+        number = 'data.header.packet_number'
+        sent = qlog_tx.select('name', 'transport:packet_sent')
+        received = qlog_rx.select('name', 'transport:packet_received')
+        if sent.empty:
+            return None
+        sent = sent[number].unique()
+        received = received[number].unique() if not received.empty else []
+        return len(sent), int(pd.Series(received).isin(sent).sum())
+    return None
+
+
+def get_utilization(case):
+    """RTP utilization of the link capacity per second"""
+    tc = case.read('tc.feather')
+    if tc is None:
+        return None
+    start_time = case.start_time
+    capacity = CapacityTimeline.from_tc(tc, start_time)
+
+    # pcap util
+    rtp_pcap_tx_df = case.read('ns4.rtp.feather')
+    if rtp_pcap_tx_df is not None:
+        df = capacity.utilization(
+            parsers.relative_seconds(rtp_pcap_tx_df.index, start_time),
+            rtp_pcap_tx_df['length'] * 8)
+        return df.dropna(subset=['utilization'])
+
+    # qlog util
+    qlog_tx_df = case.read('sender.feather')
+    roq_df = case.read('sender.roq.feather')
+    if qlog_tx_df is None or roq_df is None:
+        return None
+
+    # get frames
+    qlog_frames = plotters._explode_qlog_frames(qlog_tx_df)
+
+    roq_stream_mapping = roq_df[roq_df['name'] == 'roq:stream_opened']
+    if roq_stream_mapping.empty:
+        return None
+
+    rtp_streams_mapping = roq_stream_mapping[roq_stream_mapping['data.flow_id'].isin(
+        plotters._RTP_FOW_IDS)]
+
+    if rtp_streams_mapping.empty:
+        return None
+
+    all_rtp_flows = []
+    for flow_id in sorted(rtp_streams_mapping['data.flow_id'].unique()):
+        flow_mapping = rtp_streams_mapping[rtp_streams_mapping['data.flow_id'] == flow_id]
+        rtp_tx = qlog_frames.merge(
+            flow_mapping, left_on='stream_id', right_on='data.stream_id', suffixes=['', '_mapping'])
+        all_rtp_flows.append(rtp_tx)
+
+    combined_rtp = pd.concat(all_rtp_flows, ignore_index=True)
+    df = capacity.utilization(
+        parsers.relative_seconds(combined_rtp['time'], start_time),
+        combined_rtp['length'] * 8)
+    return df.dropna(subset=['utilization'])
+
+
+def get_completion_times(case):
+    """seconds from start to finish of each transferred chunk"""
+    tx_log = case.table('sender.stderr.feather')
+    rx_log = case.table('receiver.stderr.feather')
+    if tx_log is None or rx_log is None:
+        return None
+
+    tx_df = tx_log.select('msg', 'DataSrc Chunk started')
+    rx_df = rx_log.select('msg', 'DataSink Chunk finished')
+    if tx_df.empty or rx_df.empty:
+        return None
+
+    merged_df = tx_df.merge(rx_df, on='chunk-number',
+                            suffixes=('_start', '_finish'))
+    if merged_df.empty:
+        return None
+
+    return (parsers.to_ns(merged_df['time_finish']) -
+            parsers.to_ns(merged_df['time_start'])) / 1e9
+
+
+def get_frame_latency(case):
+    df = case.frame_latency
+    return None if df is None or df.empty else df['latency']
+
+
+def build_summary(case):
+    """summary of the test case (see summary.summarize)"""
+    parts = []
+
+    owd = case.owd
+    if owd is not None:
+        parts.append(summary.summarize('owd', owd['latency']))
+
+    frame_latency = get_frame_latency(case)
+    if frame_latency is not None:
+        parts.append(summary.summarize('frame_latency', frame_latency))
+
+    completion_times = get_completion_times(case)
+    if completion_times is not None:
+        parts.append(summary.summarize('completion_time', completion_times))
+
+    utilization = get_utilization(case)
+    if utilization is not None:
+        parts.append(summary.summarize('utilization', utilization['utilization']))
+
+    loss = get_loss(case)
+    if loss is not None:
+        parts.append(summary.summarize_loss('loss', *loss))
+
+    quality = case.read('video.quality.feather')
+    if quality is not None:
+        for metric in ['psnr', 'ssim']:
+            if f'{metric}_avg' in quality.columns:
+                parts.append(summary.summarize(metric, quality[f'{metric}_avg']))
+
+    parts = [part for part in parts if not part.empty]
+    if not parts:
+        return pd.DataFrame(columns=summary.COLUMNS)
+    return pd.concat(parts, ignore_index=True)
+
+
+def derive_summary(case):
+    """writes latency, loss, utilization, completion time and video quality summaries"""
+    _write(build_summary(case), case, summary.SUMMARY_FILE)
+
+
+def derive_owd_quantiles(case, window, step):
+    """writes OWD quantiles over sliding windows"""
+    df = case.owd
+    if df is None or df.empty:
+        return
+    _write(stats.sliding_quantiles(df.index, df['latency'], window, step),
+           case, 'owd.window.feather')
+
+
+def derive_all(dir, owd_window=1.0, owd_step=0.1):
+    """derives tables from the parsed feather files in dir"""
+    case = CaseContext(dir)
+    # fails early without config
+    case.start_time
+
+    derive_rtp_stages(case)
+    derive_frames(case)
+    derive_owd_quantiles(case, owd_window, owd_step)
+    # last, it summarizes the derived tables
+    derive_summary(case)
@@ -2,6 +2,11 @@ from pathlib import Path
 import jinja2
 import os
 
+import catalog
+
+
+IMAGE_SUFFIXES = ['.png', '.webp', '.jpg']
+
 
 def test_name_of_image(img: Path):
     return '_'.join(img.name.split('_')[:-1])
@@ -9,16 +14,24 @@ def test_name_of_image(img: Path):
 def generate_html(input):
     data = []
     dir = Path(input)
-    for subdir in dir.iterdir():
-        if subdir.is_dir():
-            images = sorted(subdir.glob('*.png'))
+    results = catalog.Catalog(dir).update()
+
+    # images by directory, '' is the input directory itself
+    images_by_dir = {}
+    for subdir, name, *_ in results.files(suffixes=IMAGE_SUFFIXES):
+        if '/' not in subdir:
+            images_by_dir.setdefault(subdir, []).append(
+                dir / Path(subdir) / Path(name))
+
+    for subdir, images in images_by_dir.items():
+        if subdir:
             data.append({
-                'name': subdir.name,
+                'name': subdir,
                 'plots': [f for f in images],
             })
 
     # if we got folder of combined plots
-    images = sorted(dir.glob("*.png"))
+    images = images_by_dir.get('', [])
     testtypes = set(test_name_of_image(img) for img in images)
 
     for testtype in testtypes:
@@ -0,0 +1,76 @@
+import json
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+
+import serializers
+
+REPORT_NAME = 'plot-report.jsonl'
+
+# tracemalloc slows down allocations considerably, only enabled on request
+TRACE_MEMORY = False
+
+records = []
+
+
+def _rss():
+    """current resident set size in bytes, None if not available"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+@contextmanager
+def measure(plot, group, **info):
+    """records wall and cpu time, rows read from feather files and memory of
+    the plot call in the with block"""
+    record = {'plot': plot, 'group': str(group), **info}
+    rows = serializers.rows_read
+    rss = _rss()
+    if TRACE_MEMORY:
+        tracemalloc.start()
+    wall = time.perf_counter()
+    cpu = time.process_time()
+    try:
+        yield record
+        record.setdefault('status', 'ok')
+    except Exception as e:
+        record['status'] = f'error: {type(e).__name__}'
+        raise
+    finally:
+        record['wall_s'] = time.perf_counter() - wall
+        record['cpu_s'] = time.process_time() - cpu
+        record['rows'] = serializers.rows_read - rows
+        rss_end = _rss()
+        record['rss_delta_bytes'] = (rss_end - rss if rss is not None and rss_end is not None
+                                     else None)
+        if TRACE_MEMORY:
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            record['alloc_bytes'] = current
+            record['alloc_peak_bytes'] = peak
+        records.append(record)
+
+
+def write_report(out_dir):
+    """writes one json object per measured plot"""
+    if not records:
+        return None
+    path = Path(out_dir) / Path(REPORT_NAME)
+    with open(path, 'w') as f:
+        for record in records:
+            f.write(json.dumps(record) + '\n')
+    return path
+
+
+def print_slowest(n):
+    if n <= 0 or not records:
+        return
+    print(f'slowest {min(n, len(records))} of {len(records)} plots:')
+    for r in sorted(records, key=lambda r: r['wall_s'], reverse=True)[:n]:
+        print(f"{r['wall_s']:8.2f}s wall {r['cpu_s']:8.2f}s cpu {r['rows']:>10} rows  "
+              f"{r['plot']} ({r['group']}) {r['status']}")
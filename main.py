@@ -2,118 +2,112 @@
 
 import argparse
 import asyncio
+import cProfile
+import pstats
 
 from pathlib import Path
 
-import matplotlib.pyplot as plt
-import pandas as pd
-
-import parsers
-import plotters
-import html_generator
-import serializers
-import plot_version_comparison
-import video_quality
-
-import matplotlib
-
-matplotlib.rcParams.update({'font.size': 20})
+# heavy dependencies (pandas, matplotlib, pyshark, cv2, ...) are imported by
+# the sub-command handlers, so each command only loads what it needs
 
+# plot functions are names in plotters, resolved when plotting
 plots = [
     # RTP rates
-    # ('RTP Rates (logging)', plotters.plot_rtp_rates_log, 1,1, [
+    # ('RTP Rates (logging)', 'plot_rtp_rates_log', 1,1, [
     #  'tc.feather', 'sender.stderr.feather', 'receiver.stderr.feather'], 'rtp_rates_logs.png'),
-    ('RTP Network Rates (pcaps)', plotters.plot_rtp_rates_pcaps, 1, 1, [
+    ('RTP Network Rates (pcaps)', 'plot_rtp_rates_pcaps', 1, 1, [
      'tc.feather', 'sender.stderr.feather', 'ns4.rtp.feather', 'ns1.rtp.feather', 'config.feather'], 'rtp_rates.png'),
-    ('QUIC Network Rates (qlog)', plotters.plot_quic_rates, 1, 1, [
+    ('QUIC Network Rates (qlog)', 'plot_quic_rates', 1, 1, [
      'tc.feather', 'sender.stderr.feather', 'sender.feather', 'receiver.feather'], 'quic_rates.png'),
-    # ('RTP Send Rate', plotters.plot_rtp_rate, 1,1, [
+    # ('RTP Send Rate', 'plot_rtp_rate', 1,1, [
     #  'sender.stderr.feather'], 'rtp_send_rate.png'),
-    # ('RTP Recv Rate', plotters.plot_rtp_rate, 1,1, [
+    # ('RTP Recv Rate', 'plot_rtp_rate', 1,1, [
     #  'receiver.stderr.feather'], 'rtp_recv_rate.png'),
 
     # combined rates
-    ('Send Rates (logging)', plotters.plot_all_send_rates, 1, 1, [
+    ('Send Rates (logging)', 'plot_all_send_rates', 1, 1, [
      'tc.feather', 'sender.stderr.feather'], 'all_send_rates.png'),
-    ('Receive Rates (logging)', plotters.plot_all_recv_rates, 1, 1, [
+    ('Receive Rates (logging)', 'plot_all_recv_rates', 1, 1, [
      'tc.feather', 'sender.stderr.feather', 'receiver.stderr.feather'], 'all_recv_rates.png'),
-    ('Send Rates (pcap)', plotters.plot_all_send_rates_pcaps, 1, 1, [
+    ('Send Rates (pcap)', 'plot_all_send_rates_pcaps', 1, 1, [
      'tc.feather', 'sender.stderr.feather', 'ns4.rtp.feather', 'ns4.dtls.feather', 'config.feather'], 'all_send_rates_pcaps.png'),
-    ('Receive Rates (pcap)', plotters.plot_all_recv_rates_pcaps, 1, 1, [
+    ('Receive Rates (pcap)', 'plot_all_recv_rates_pcaps', 1, 1, [
      'tc.feather', 'sender.stderr.feather', 'ns1.rtp.feather', 'ns1.dtls.feather', 'config.feather'], 'all_recv_rates_pcaps.png'),
-    ('Send Rates (qlog)', plotters.plot_all_send_rates_qlog, 1, 1, [
+    ('Send Rates (qlog)', 'plot_all_send_rates_qlog', 1, 1, [
      'tc.feather', 'sender.stderr.feather', 'receiver.stderr.feather', 'sender.feather', 'sender.roq.feather'], 'all_send_rates_qlog.png'),
-    ('Receive Rates (qlog)', plotters.plot_all_recv_rates_qlog, 1, 1, [
+    ('Receive Rates (qlog)', 'plot_all_recv_rates_qlog', 1, 1, [
      'tc.feather', 'sender.stderr.feather', 'receiver.stderr.feather', 'receiver.feather', 'sender.roq.feather'], 'all_recv_rates_qlog.png'),
 
     # loss
-    ('RTP Network Loss Rate (pcap)', plotters.plot_rtp_loss_rate_pcap, 1, 1, ['ns4.rtp.feather',
+    ('RTP Network Loss Rate (pcap)', 'plot_rtp_loss_rate_pcap', 1, 1, ['ns4.rtp.feather',
      'ns1.rtp.feather'], 'rtp_loss.png'),
-    ('RTP Loss Rate (network)', plotters.plot_rtp_loss_rate_log, 1, 1, ['sender.stderr.feather',
+    ('RTP Loss Rate (network)', 'plot_rtp_loss_rate_log', 1, 1, ['sender.stderr.feather',
      'receiver.stderr.feather'], 'rtp_loss_net.png'),
-    ('RTP Loss Rate (after jitter)', plotters.plot_rtp_full_loss_rate_log, 1, 1, ['sender.stderr.feather',
+    ('RTP Loss Rate (after jitter)', 'plot_rtp_full_loss_rate_log', 1, 1, ['sender.stderr.feather',
      'receiver.stderr.feather'], 'rtp_loss_full.png'),
 
     # OWD
-    ('Network OWD (RTP pcap)', plotters.plot_rtp_owd_pcap, 1, 1, ['ns4.rtp.feather',
+    ('Network OWD (RTP pcap)', 'plot_rtp_owd_pcap', 1, 1, ['ns4.rtp.feather',
      'ns1.rtp.feather'], 'rtp_owd.png'),
-    ('Network OWD (QUIC qlog)', plotters.plot_qlog_owd, 1, 1, ['sender.feather',
+    ('Network OWD (QUIC qlog)', 'plot_qlog_owd', 1, 1, ['sender.feather',
      'receiver.feather'], 'quic_owd.png'),
-    ('RTP OWD', plotters.plot_rtp_owd_log_udp, 1, 1, ['sender.stderr.feather',
-     'receiver.stderr.feather', 'ns4.rtp.feather', 'ns1.rtp.feather', 'config.feather'], 'rtp_owd_log_stacked.png'),
-    ('RTP OWD', plotters.plot_rtp_owd_log_roq, 1, 1, ['sender.stderr.feather',
-     'receiver.stderr.feather', 'sender.feather'], 'rtp_owd_quic_stacked.png'),
-    ('RTP OWD', plotters.plot_rtp_owd_log_udp_overall, 1, 1, ['sender.stderr.feather',
-     'receiver.stderr.feather', 'ns4.rtp.feather', 'ns1.rtp.feather', 'config.feather'], 'rtp_owd_log.png'),
-    ('RTP OWD', plotters.plot_rtp_owd_log_roq_overall, 1, 1, ['sender.stderr.feather',
-     'receiver.stderr.feather', 'sender.feather'], 'rtp_owd_quic.png'),
+    ('Network OWD percentiles', 'plot_owd_quantiles', 1, 1, [
+     'owd.window.feather'], 'owd_quantiles.png'),
+    ('RTP OWD', 'plot_rtp_owd_stages', 1, 1, [
+     'rtp.udp.stages.feather'], 'rtp_owd_log_stacked.png'),
+    ('RTP OWD', 'plot_rtp_owd_stages', 1, 1, [
+     'rtp.roq.stages.feather'], 'rtp_owd_quic_stacked.png'),
+    ('RTP OWD', 'plot_rtp_owd_stages_overall', 1, 1, [
+     'rtp.udp.stages.feather'], 'rtp_owd_log.png'),
+    ('RTP OWD', 'plot_rtp_owd_stages_overall', 1, 1, [
+     'rtp.roq.stages.feather'], 'rtp_owd_quic.png'),
 
     # DTLS
-    ('DTLS OWD (pcap)', plotters.plot_dtls_owd, 1, 1, ['ns4.dtls.feather',
+    ('DTLS OWD (pcap)', 'plot_dtls_owd', 1, 1, ['ns4.dtls.feather',
      'ns1.dtls.feather', 'config.feather'], 'dtls_owd.png'),
-    ('DTLS loss (pcap)', plotters.plot_dtls_loss, 1, 1, ['ns4.dtls.feather',
+    ('DTLS loss (pcap)', 'plot_dtls_loss', 1, 1, ['ns4.dtls.feather',
      'ns1.dtls.feather', 'config.feather'], 'dtls_loss.png'),
-    ('DTLS rate (pcap)', plotters.plot_dtls_rates, 1, 1, [
+    ('DTLS rate (pcap)', 'plot_dtls_rates', 1, 1, [
         'tc.feather', 'sender.stderr.feather', 'ns4.dtls.feather', 'ns1.dtls.feather',
         'config.feather'], 'dtls_rate.png'),
 
     # CC stats
-    ('SCReAM Queue Delay', plotters.plot_scream_queue_delay, 1, 1,
+    ('SCReAM Queue Delay', 'plot_scream_queue_delay', 1, 1,
      ['sender.stderr.feather'], 'scream_queue_delay.png'),
-    ('SCReAM CWND', plotters.plot_scream_cwnd, 1, 1, [
+    ('SCReAM CWND', 'plot_scream_cwnd', 1, 1, [
      'sender.stderr.feather'], 'scream_cwnd.png'),
-    ('GCC RTT', plotters.plot_gcc_rtt, 1, 1, [
+    ('GCC RTT', 'plot_gcc_rtt', 1, 1, [
      'sender.stderr.feather'], 'gcc_rtt.png'),
-    ('GCC Target Rates', plotters.plot_gcc_target_rates, 1, 1, [
+    ('GCC Target Rates', 'plot_gcc_target_rates', 1, 1, [
         'sender.stderr.feather'], 'gcc_target_rates.png'),
-    ('GCC Estimates', plotters.plot_gcc_estimates, 1, 1, [
+    ('GCC Estimates', 'plot_gcc_estimates', 1, 1, [
      'sender.stderr.feather'], 'gcc_estimates.png'),
-    ('GCC Usage and State', plotters.plot_gcc_usage_and_state, 1, 1,
+    ('GCC Usage and State', 'plot_gcc_usage_and_state', 1, 1,
      ['sender.stderr.feather'], 'gcc_usage_state.png'),
-    ('SCTP Stats', plotters.plot_sctp_stats, 1, 1,
+    ('SCTP Stats', 'plot_sctp_stats', 1, 1,
      ['sender.stderr.sctp.feather'], 'sctp_stats.png'),
 
-    ('Encoding frame sizes', plotters.plot_encoding_frame_size, 1, 1, [
+    ('Encoding frame sizes', 'plot_encoding_frame_size', 1, 1, [
      'sender.stderr.feather'], 'encoding_frame_sizes.png'),
-    ('Decoding frame sizes', plotters.plot_decoding_frame_size, 1, 1, [
+    ('Decoding frame sizes', 'plot_decoding_frame_size', 1, 1, [
         'receiver.stderr.feather'], 'receiver_frame_sizes.png'),
 
-    ('Encoding time', plotters.plot_encoding_time, 1, 1, [
+    ('Encoding time', 'plot_encoding_time', 1, 1, [
      'sender.stderr.feather'], 'encoding_time.png'),
-    ('Decoding time', plotters.plot_decoding_time, 1, 1, [
+    ('Decoding time', 'plot_decoding_time', 1, 1, [
      'receiver.stderr.feather'], 'decoding_time.png'),
 
-    ('E2E Latency', plotters.plot_e2e_latency, 1, 1, [
+    ('E2E Latency', 'plot_e2e_latency', 1, 1, [
      'sender.stderr.feather', 'receiver.stderr.feather'], 'e2e_latency.png'),
-    ('Frame Latency e2e', plotters.plot_frame_latency, 1, 1, [
-     'sender.stderr.feather', 'receiver.stderr.feather'], 'frame_latency.png'),
-    ('Video Quality Metrics', plotters.plot_video_quality, 1, 1, [
+    ('Frame Latency e2e', 'plot_frame_latency', 1, 1, [
+     'frames.feather'], 'frame_latency.png'),
+    ('Video Quality Metrics', 'plot_video_quality', 1, 1, [
      'video.quality.feather'], 'video_quality.png'),
-    ('Encoded Video Rate', plotters.plot_video_rate, 1, 1, [
+    ('Encoded Video Rate', 'plot_video_rate', 1, 1, [
      'sender.stderr.feather'], 'video_rate.png'),
-    ('Encoded Frame Sizes', plotters.plot_frame_size_dist, 1, 1, [
+    ('Encoded Frame Sizes', 'plot_frame_size_dist', 1, 1, [
      'sender.stderr.feather'], 'video_frame_size_dist.png'),
-    ('Encoded Frame Sizes', plotters.plot_frame_size, 1, 1, [
+    ('Encoded Frame Sizes', 'plot_frame_size', 1, 1, [
      'sender.stderr.feather'], 'video_frame_size.png'),
 
 
@@ -121,65 +115,80 @@ plots = [
     # pcap plots twice: plot first without dtls and override it if dtls present
 
     # Send rate + owd
-    ('Send Rates + network owd', plotters.plot_all_send_rates_and_owd_pcaps_nodtls, 2, 1, [
+    ('Send Rates + network owd', 'plot_all_send_rates_and_owd_pcaps_nodtls', 2, 1, [
      'tc.feather', 'sender.stderr.feather', 'ns4.rtp.feather', 'ns1.rtp.feather', 'config.feather'], 'all_send_rates_pcaps_owd.png'),
-    ('Send Rates + network owd', plotters.plot_all_send_rates_and_owd_pcaps, 2, 1, [
+    ('Send Rates + network owd', 'plot_all_send_rates_and_owd_pcaps', 2, 1, [
      'tc.feather', 'sender.stderr.feather', 'ns4.rtp.feather', 'ns1.rtp.feather', 'ns4.dtls.feather', 'config.feather'], 'all_send_rates_pcaps_owd.png'),
-    ('Send Rates + network owd', plotters.plot_rtp_rates_and_owd_quic, 2, 1, [
+    ('Send Rates + network owd', 'plot_rtp_rates_and_owd_quic', 2, 1, [
      'tc.feather', 'sender.stderr.feather', 'receiver.stderr.feather', 'sender.feather', 'receiver.feather', 'sender.roq.feather'], 'quic_rates_owd.png'),
-    ('Send Rates + network owd (quic overall)', plotters.plot_send_rates_and_owd_quic, 2, 1, [
+    ('Send Rates + network owd (quic overall)', 'plot_send_rates_and_owd_quic', 2, 1, [
      'tc.feather', 'sender.stderr.feather', 'receiver.stderr.feather', 'sender.feather', 'receiver.feather'], 'quic_rates_owd_overall.png'),
 
     # Send rate + loss
-    ('Send Rates + losses', plotters.plot_all_send_rates_and_loss_pcaps_nodtls, 2, 1, [
+    ('Send Rates + losses', 'plot_all_send_rates_and_loss_pcaps_nodtls', 2, 1, [
      'tc.feather', 'sender.stderr.feather', 'ns4.rtp.feather', 'ns1.rtp.feather', 'config.feather'], 'all_send_rates_pcaps_loss.png'),
-    ('Send Rates + losses', plotters.plot_all_send_rates_and_loss_pcaps, 2, 1, [
+    ('Send Rates + losses', 'plot_all_send_rates_and_loss_pcaps', 2, 1, [
      'tc.feather', 'sender.stderr.feather', 'ns4.rtp.feather', 'ns1.rtp.feather', 'ns4.dtls.feather', 'config.feather'], 'all_send_rates_pcaps_loss.png'),
-    ('Send Rates + losses', plotters.plot_rtp_rates_and_loss_quic, 2, 1, [
+    ('Send Rates + losses', 'plot_rtp_rates_and_loss_quic', 2, 1, [
      'tc.feather', 'sender.stderr.feather', 'receiver.stderr.feather', 'sender.feather', 'receiver.feather', 'sender.roq.feather'], 'quic_rates_loss.png'),
-    ('Send Rates + losses (quic overall)', plotters.plot_send_rates_and_loss_quic, 2, 1, [
+    ('Send Rates + losses (quic overall)', 'plot_send_rates_and_loss_quic', 2, 1, [
      'tc.feather', 'sender.stderr.feather', 'receiver.stderr.feather', 'sender.feather', 'receiver.feather'], 'quic_rates_loss_overall.png'),
 
     # plots for understanding the encoder behavior
-    ('frame size + tr', plotters.plot_frame_size_and_tr, 2, 1, [
+    ('frame size + tr', 'plot_frame_size_and_tr', 2, 1, [
      'tc.feather', 'sender.stderr.feather', 'receiver.stderr.feather'], 'video_frame_tr.png'),
 
     # other
-   ('completion time', plotters.plot_file_completion, 1, 1, [
+   ('completion time', 'plot_file_completion', 1, 1, [
     'sender.stderr.feather', 'receiver.stderr.feather'], 'comp_time.png'),
 ]
 
 
-async def parse_file(input, out_dir, ref_time=None):
+def _write_feather(df, file, start_time=None):
+    import parsers
+    import serializers
+
+    if start_time is not None:
+        df = parsers.add_relative_time(df, start_time)
+    serializers.write_feather(df, file)
+
+
+async def parse_file(input, out_dir, ref_time=None, start_time=None):
+    import pandas as pd
+    import parsers
+    import serializers
+
     path = Path(input)
     if path.name in ['config.json', 'tc.log', 'receiver.stderr.log', 'sender.stderr.log']:
         df = parsers.parse_json_log(input)
-        serializers.write_feather(
-            df, Path(out_dir) / Path(input).with_suffix('.feather').name)
+        if path.name == 'tc.log' and 'bandwidth' in df.columns:
+            df['bandwidth_bps'] = parsers.parse_bandwidth(df['bandwidth'])
+        _write_feather(
+            df, Path(out_dir) / Path(input).with_suffix('.feather').name, start_time)
     if path.name in ['sender.qlog', 'receiver.qlog']:
         df = parsers.parse_quic_qlog(input)
-        serializers.write_feather(
-            df, Path(out_dir) / Path(input).with_suffix('.feather').name)
+        _write_feather(
+            df, Path(out_dir) / Path(input).with_suffix('.feather').name, start_time)
     if path.name in ['sender.roq.qlog']:
         df = parsers.parse_roq_qlog(input)
-        serializers.write_feather(
-            df, Path(out_dir) / Path(input).with_suffix('.feather').name)
+        _write_feather(
+            df, Path(out_dir) / Path(input).with_suffix('.feather').name, start_time)
     if path.name in ['sender.stderr.log']:
         df = parsers.parse_pion_sctp_log(input, ref_time)
-        serializers.write_feather(
-            df, Path(out_dir) / Path(input).with_suffix('.sctp.feather').name)
+        _write_feather(
+            df, Path(out_dir) / Path(input).with_suffix('.sctp.feather').name, start_time)
     if path.suffix == '.pcap':
         rtp, rtcp, dtls = await parsers.parse_pcap(input)
 
         if not rtp.empty:
-            serializers.write_feather(
-                rtp, Path(out_dir) / Path(Path(input).stem + '.rtp.feather'))
+            _write_feather(
+                rtp, Path(out_dir) / Path(Path(input).stem + '.rtp.feather'), start_time)
         if not rtcp.empty:
-            serializers.write_feather(
-                rtcp, Path(out_dir) / Path(Path(input).stem + '.rtcp.feather'))
+            _write_feather(
+                rtcp, Path(out_dir) / Path(Path(input).stem + '.rtcp.feather'), start_time)
         if not dtls.empty:
-            serializers.write_feather(
-                dtls, Path(out_dir) / Path(Path(input).stem + '.dtls.feather'))
+            _write_feather(
+                dtls, Path(out_dir) / Path(Path(input).stem + '.dtls.feather'), start_time)
     if path.name in ['video.quality.csv', 'lost_frames.csv']:
         df = pd.read_csv(input)
         serializers.write_feather(
@@ -188,6 +197,8 @@ async def parse_file(input, out_dir, ref_time=None):
 
 async def parse_config(input_dir):
     """parses config without saving it"""
+    import parsers
+
     config_path = Path(input_dir) / Path('config.json')
     if not config_path.is_file():
         raise FileNotFoundError(f'config.json not found in {input_dir}')
@@ -198,44 +209,59 @@ async def parse_config(input_dir):
 
 
 async def parse_all_cmd(args):
+    import pandas as pd
+    import derive
+
     dir = Path(args.input)
 
     # Parse config.json to get timezone
     config = await parse_config(dir)
     ref = pd.Timestamp(config['time'][0])
+    # start of the test in UTC, all times are stored relative to it
+    start_time = ref.tz_convert('UTC').tz_localize(None) if ref.tz else ref
 
     for file in dir.iterdir():
         if file.is_file():
-            await parse_file(file, args.output, ref_time=ref)
+            await parse_file(file, args.output, ref_time=ref, start_time=start_time)
+
+    derive.derive_all(args.output)
+
+
+async def derive_cmd(args):
+    import derive
+    import stats
+
+    stats.SKETCH_ACCURACY = args.sketch_accuracy
+    derive.derive_all(args.input, args.owd_window, args.owd_step)
 
 
 async def parse_cmd(args):
     await parse_file(args.input, args.output)
 
 
-async def plot_cmd(args):
-    config_feather = Path(args.input) / Path('config.feather')
-    config = serializers.read_feather(config_feather)
-    start_time = pd.Timestamp(config['time'][0])
+def _configure_plotting(args):
+    import matplotlib
+    import instrument
+    import render
 
-    for title, func, num_rows, num_column, files, out_name in plots:
-        fig_height = 3*num_rows
-        fig, ax = plt.subplots(
-            nrows=num_rows, ncols=num_column, figsize=(8, fig_height), sharex=True)
-        paths = [Path(args.input) / Path(f) for f in files]
-        if all(p.is_file() for p in paths):
-            dfs = [serializers.read_feather(p) for p in paths]
-            plotted = func(ax, start_time, *dfs)
-            if not plotted:
-                print(f'dropping empty plot {func.__name__}')
-                plt.close(fig)
-                continue
-        else:
-            missing = [str(p) for p in paths if not p.is_file()]
-            print(
-                f'skipping plot {func.__name__} due to missing dependencies {', '.join(missing)}')
-            plt.close(fig)
-            continue
+    matplotlib.rcParams.update({'font.size': 20})
+    instrument.TRACE_MEMORY = args.trace_memory
+    render.DECIMATE = not args.no_decimate
+    render.DENSITY = args.density
+    render.FORMAT = args.format
+    if args.preview:
+        render.use_preview()
+
+
+def _plot(title, func, num_rows, num_column, start_time, dfs, out_path):
+    """draws one entry of plots, returns False if there was nothing to plot"""
+    import render
+
+    fig_height = 3*num_rows
+    with render.figure(nrows=num_rows, ncols=num_column, figsize=(8, fig_height), sharex=True) as (fig, ax):
+        plotted = func(ax, start_time, *dfs)
+        if not plotted:
+            return False
 
         if num_column > 1 or num_rows > 1:
             fig.suptitle(title)
@@ -250,35 +276,118 @@ async def plot_cmd(args):
         fig.autofmt_xdate()
         fig.tight_layout()
         # fig.subplots_adjust(hspace=0.3)
-        fig.savefig(Path(args.output) / Path(out_name), dpi=300)
-        plt.close(fig)
+        render.save(fig, out_path)
+    return True
+
+
+async def plot_cmd(args):
+    import pandas as pd
+    import instrument
+    import plotters
+    import serializers
+
+    _configure_plotting(args)
+    config_feather = Path(args.input) / Path('config.feather')
+    config = serializers.read_feather(config_feather)
+    start_time = pd.Timestamp(config['time'][0])
+
+    for title, func_name, num_rows, num_column, files, out_name in plots:
+        paths = [Path(args.input) / Path(f) for f in files]
+        if not all(p.is_file() for p in paths):
+            missing = [str(p) for p in paths if not p.is_file()]
+            print(
+                f'skipping plot {func_name} due to missing dependencies {', '.join(missing)}')
+            continue
+
+        func = getattr(plotters, func_name)
+        with instrument.measure(func_name, args.input, out=out_name) as record:
+            dfs = [serializers.read_table(p) for p in paths]
+            record['input_rows'] = {f: len(df) for f, df in zip(files, dfs)}
+            if not _plot(title, func, num_rows, num_column, start_time, dfs,
+                         Path(args.output) / Path(out_name)):
+                record['status'] = 'empty'
+                print(f'dropping empty plot {func_name}')
+
+    instrument.write_report(args.output)
+    instrument.print_slowest(args.slowest)
 
 
 async def generate_cmd(args):
+    import html_generator
+
     html_generator.generate_html(args.input)
 
 
+async def catalog_cmd(args):
+    import catalog
+
+    results = catalog.Catalog(args.input).update()
+    files = results.files()
+    rows = sum(f[2] or 0 for f in files)
+    print(f'{len(results.cases())} test cases, {len(files)} files, {rows} feather rows '
+          f'in {Path(args.input) / Path(catalog.CATALOG_FILE)}')
+
+
 async def plot_combis_cmd(args):
+    import instrument
+    import plot_version_comparison
+
+    _configure_plotting(args)
+    plot_version_comparison.JOBS = args.jobs
+    plot_version_comparison.WORKER_INIT = (_configure_plotting, args)
+    failed = None
     if args.mode == 'version':
-        plot_version_comparison.plot_version_comparison(
+        failed = plot_version_comparison.plot_version_comparison(
             args.input, args.output)
     elif args.mode == 'link':
-        plot_version_comparison.plot_link_comparision(args.input, args.output)
+        failed = plot_version_comparison.plot_link_comparision(
+            args.input, args.output)
     elif args.mode == 'avgs':
         plot_version_comparison.calc_avgs_comparision(args.input, args.output)
     else:
-        plot_version_comparison.plot_predefined_comparisons(
+        failed = plot_version_comparison.plot_predefined_comparisons(
             args.input, args.output)
 
+    instrument.write_report(args.output)
+    instrument.print_slowest(args.slowest)
+    if failed:
+        print(f'failed comparisons: {", ".join(failed)}')
+        raise SystemExit(1)
+
 
 async def calc_video_metrics(args):
+    import video_quality
+
     video_quality.calculate_quality_metrics(
         args.reference, args.input, args.output)
 
 
+def _run_profiled(args):
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        asyncio.run(args.func(args))
+    finally:
+        profiler.disable()
+        profiler.dump_stats(args.profile)
+
+        summary = Path(f'{args.profile}.txt')
+        with open(summary, 'w') as f:
+            stats = pstats.Stats(profiler, stream=f).strip_dirs()
+            f.write('by own time\n')
+            stats.sort_stats('tottime').print_stats(args.profile_top)
+            f.write('by cumulative time\n')
+            stats.sort_stats('cumulative').print_stats(args.profile_top)
+        print(f'profile written to {args.profile}, summary to {summary}')
+
+
 def main():
     parser = argparse.ArgumentParser(
         formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('--profile', metavar='FILE',
+                        help='run the sub-command under cProfile and write the stats to FILE and a summary of the hottest functions to FILE.txt')
+    parser.add_argument('--profile-top', type=int, default=30, metavar='N',
+                        help='number of functions in the profile summary')
     subparsers = parser.add_subparsers(help='sub-command help', required=True)
 
     parse = subparsers.add_parser(
@@ -296,12 +405,36 @@ def main():
         '-o', '--output', help='output directory', required=True)
     parse_all.set_defaults(func=parse_all_cmd)
 
+    derive_parser = subparsers.add_parser(
+        'derive', help='derives tables (e.g. per packet stage delays) from the feather files of a parsed directory')
+    derive_parser.add_argument(
+        '-i', '--input', help='directory with parsed feather files', required=True)
+    derive_parser.add_argument('--owd-window', type=float, default=1.0,
+                               help='length of the sliding windows of the OWD quantiles in seconds')
+    derive_parser.add_argument('--owd-step', type=float, default=0.1,
+                               help='seconds between the ends of two OWD quantile windows')
+    derive_parser.add_argument('--sketch-accuracy', type=float, default=0.01,
+                               help='relative accuracy of the quantile sketches in summary.feather')
+    derive_parser.set_defaults(func=derive_cmd)
+
     plot = subparsers.add_parser(
         'plot', help='reads a data frame from a feather file and creates plots')
     plot.add_argument(
         '-i', '--input', help='input directory', required=True)
     plot.add_argument(
         '-o', '--output', help='output directory', required=True)
+    plot.add_argument('--no-decimate', action='store_true',
+                      help='draw every point of line plots instead of reducing them to the min/max per pixel column')
+    plot.add_argument('--density', action='store_true',
+                      help='draw dense scatter plots and frame latency comparisons as 2D histogram image')
+    plot.add_argument('--preview', action='store_true',
+                      help='quick low resolution plots with simplified and decimated lines')
+    plot.add_argument('--format', choices=['png', 'webp', 'jpg'], default='png',
+                      help='image format, file names stay the same except for the suffix')
+    plot.add_argument('--slowest', type=int, default=10, metavar='N',
+                      help='print the N slowest plots, timings of all plots are written to plot-report.jsonl in the output directory')
+    plot.add_argument('--trace-memory', action='store_true',
+                      help='also trace python allocations of each plot (slow)')
     plot.set_defaults(func=plot_cmd)
 
     generate = subparsers.add_parser(
@@ -311,6 +444,12 @@ def main():
     generate.add_argument(
         '-i', '--input', help='input directory', required=True)
 
+    catalog_parser = subparsers.add_parser(
+        'catalog', help='builds or updates the catalog of a results tree (test cases, feather row counts and time ranges), comparisons and generate keep it up to date themselves')
+    catalog_parser.add_argument(
+        '-i', '--input', help='results directory', required=True)
+    catalog_parser.set_defaults(func=catalog_cmd)
+
     plot_combis = subparsers.add_parser(
         'plot-combis', help='creates a combined plot for each test case')
     plot_combis.add_argument(
@@ -319,6 +458,20 @@ def main():
         '-o', '--output', help='output directory for plots', required=True)
     plot_combis.add_argument('-m', '--mode', choices=['version', 'link', "default", "avgs"], default='version',
                              help='comparison mode: "version" combines by test version (e.g. each webrtc-gcc test), "link" combines by link type (e.g. each static test), "default" uses predefined combinations, "avgs" calculates some average metrics over all test cases')
+    plot_combis.add_argument('--no-decimate', action='store_true',
+                             help='draw every point of line plots instead of reducing them to the min/max per pixel column')
+    plot_combis.add_argument('--density', action='store_true',
+                             help='draw dense scatter plots and frame latency comparisons as 2D histogram image')
+    plot_combis.add_argument('--preview', action='store_true',
+                             help='quick low resolution plots with simplified and decimated lines')
+    plot_combis.add_argument('--format', choices=['png', 'webp', 'jpg'], default='png',
+                             help='image format, file names stay the same except for the suffix')
+    plot_combis.add_argument('--slowest', type=int, default=10, metavar='N',
+                             help='print the N slowest plots, timings of all plots are written to plot-report.jsonl in the output directory')
+    plot_combis.add_argument('--trace-memory', action='store_true',
+                             help='also trace python allocations of each plot (slow)')
+    plot_combis.add_argument('-j', '--jobs', type=int, default=1,
+                             help='worker processes, each plots one comparison (or loads one test case) at a time')
     plot_combis.set_defaults(func=plot_combis_cmd)
 
     video_qm = subparsers.add_parser(
@@ -332,7 +485,10 @@ def main():
     video_qm.set_defaults(func=calc_video_metrics)
 
     args = parser.parse_args()
-    asyncio.run(args.func(args))
+    if args.profile:
+        _run_profiled(args)
+    else:
+        asyncio.run(args.func(args))
 
 
 if __name__ == "__main__":
@@ -1,8 +1,58 @@
 import json
 import re
 
+import numpy as np
 import pandas as pd
-import pyshark
+
+
+unit_multipliers = {
+    'bit': 1,
+    'kbit': 1_000,
+    'mbit': 1_000_000,
+    'gbit': 1_000_000_000,
+}
+
+
+def parse_bandwidth(bandwidth):
+    """converts a series of tc rate strings (e.g. 2.5mbit) to bits per second,
+    values with an unknown format or unit become NaN"""
+    parts = bandwidth.astype('string').str.strip().str.lower().str.extract(
+        r'^([\d.]+)([a-z]+)')
+    values = pd.to_numeric(parts[0], errors='coerce').astype('float64')
+    bps = values * parts[1].map(unit_multipliers).astype('float64')
+    invalid = bandwidth.notna() & bps.isna()
+    if invalid.any():
+        print(f'skipping {invalid.sum()} invalid rates, e.g. {bandwidth[invalid].iloc[0]}')
+    return bps
+
+
+def to_ns(times):
+    """returns datetimes (or int64 nanoseconds) as int64 nanoseconds since epoch in UTC"""
+    if pd.api.types.is_integer_dtype(times):
+        return np.asarray(times, dtype='int64')
+    times = pd.DatetimeIndex(pd.to_datetime(times))
+    if times.tz is not None:
+        times = times.tz_convert('UTC').tz_localize(None)
+    return np.asarray(times, dtype='datetime64[ns]').view('int64')
+
+
+def relative_seconds(times, start_time):
+    """seconds since start_time as float64"""
+    return (to_ns(times) - pd.Timestamp(start_time).value) / 1e9
+
+
+def add_relative_time(df, start_time):
+    """stores the time column (or time index) as int64 nanoseconds and adds
+    t_rel, the seconds since start_time"""
+    if df.empty:
+        return df
+    if 'time' in df.columns:
+        df['time'] = to_ns(df['time'])
+        df['t_rel'] = relative_seconds(df['time'], start_time)
+    elif df.index.name == 'time':
+        df.index = pd.Index(to_ns(df.index), name='time')
+        df['t_rel'] = relative_seconds(df.index, start_time)
+    return df
 
 
 def parse_csv(csv_file):
@@ -115,6 +165,9 @@ def _read_json_lines(log_file):
 
 
 async def parse_pcap(pcap_file):
+    # pyshark is slow to import and only needed for pcaps
+    import pyshark
+
     rtp_data = []
     rtcp_data = []
     dtls_data = []
@@ -1,15 +1,27 @@
+import os
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
 
-import matplotlib.pyplot as plt
 import matplotlib.ticker as mticker
-import numpy as np
 import pandas as pd
+import catalog
+import derive
+import instrument
 import plotters
-import serializers
+import render
+import stats
+import summary
 
 # Settings for the plots
 FIG_SIZE = (8, 3)
-FIG_DPI = 300
+
+# worker processes for the comparison groups (or the cases of a group)
+JOBS = 1
+# (function, *args) called in each worker process before its first task,
+# e.g. to apply the plot settings of the main process
+WORKER_INIT = None
 
 predefined_plots = [
     # (name-of-plot, [(testcase, case-name), ...])
@@ -33,22 +45,21 @@ def _save_delay_graph(ax, fig, image_path, legend, yname):
 
     fig.tight_layout()
     fig.autofmt_xdate()
-    fig.savefig(image_path, bbox_inches="tight")
-    plt.close()
+    render.save(fig, image_path, bbox_inches="tight")
 
 
-def _get_start_time(path_to_case):
-    config_feather = Path(path_to_case) / Path("config.feather")
-    config = serializers.read_feather(config_feather)
-    return pd.Timestamp(config["time"][0])
+def _plot_capacity(ax, legend, case):
+    plotters.plot_capacity(ax, case.start_time, case.table("tc.feather"))
+    legend.append("capacity")
 
 
-def _plot_capacity(ax, legend, path_to_case):
-    start_time = _get_start_time(path_to_case)
-    cap_feather = Path(path_to_case) / Path("tc.feather")
-    cap = serializers.read_feather(cap_feather)
-    plotters.plot_capacity(ax, start_time, cap)
-    legend.append("capacity")
+def _stream(cases):
+    """yields one case after another and releases the raw data (tables, OWD)
+    of each case before the next one is loaded. Only the reduced data of the
+    cases (summary, frame latency) stays in memory."""
+    for case in cases:
+        yield case
+        case[1].release()
 
 
 def plot_fdelay(name, cases, out):
@@ -56,509 +67,385 @@ def plot_fdelay(name, cases, out):
     legend = []
     image_name = Path(out) / Path(f"{name}_fdelay.png")
 
-    fig, ax = plt.subplots(dpi=FIG_DPI, figsize=FIG_SIZE)
+    with render.figure(figsize=FIG_SIZE, dpi=render.DPI) as (fig, ax):
+        series = []
+        for case in _stream(cases):
+            df = case[1].frame_latency
 
-    for case in cases:
-        start_time = _get_start_time(case[1])
-
-        feather_sender = Path(case[1]) / Path("sender.stderr.feather")
-        feather_recv = Path(case[1]) / Path("receiver.stderr.feather")
+            if df is not None:
+                if render.DENSITY:
+                    if not df.empty:
+                        series.append((df.index, df['latency']))
+                        legend.append(case[2])
+                    continue
 
-        if feather_sender.is_file() and feather_recv.is_file():
-            df_recv = serializers.read_feather(feather_recv)
-            df_sender = serializers.read_feather(feather_sender)
+                plotted = plotters.plot_frame_latency_df(ax, df)
 
-            plotted = plotters.plot_frame_latency(
-                ax, start_time, df_sender, df_recv)
+                if plotted:
+                    legend.append(case[2])
 
-            if plotted:
-                legend.append(case[2])
+        if series:
+            render.density(ax, series, legend,
+                           workers=max(1, os.cpu_count() // JOBS))
+            plotters._frame_latency_ax_config(ax)
 
-    _save_delay_graph(ax, fig, image_name, legend, "Latency")
+        _save_delay_graph(ax, fig, image_name, legend, "Latency")
 
 
 def plot_owd_cdf(name, cases, out):
     legend = []
     image_name = Path(out) / Path(f"{name}_delay_cdf.png")
 
-    fig, ax = plt.subplots(dpi=FIG_DPI, figsize=FIG_SIZE)
-
-    for case in cases:
-        start_time = _get_start_time(case[1])
-
-        # pcap owd
-        rtp_pcap_tx = Path(case[1]) / Path('ns4.rtp.feather')
-        rtp_pcap_rx = Path(case[1]) / Path('ns1.rtp.feather')
-
-        if rtp_pcap_tx.is_file() and rtp_pcap_rx.is_file():
-            rtp_pcap_tx_df = serializers.read_feather(rtp_pcap_tx)
-            rtp_pcap_rx_df = serializers.read_feather(rtp_pcap_rx)
-
-            plotted = plotters.plot_rtp_owd_pcap_cdf(
-                ax, start_time, rtp_pcap_tx_df, rtp_pcap_rx_df)
-            if plotted:
+    with render.figure(figsize=FIG_SIZE, dpi=render.DPI) as (fig, ax):
+        for case in _stream(cases):
+            case_summary = case[1].summary
+            if case_summary.has("owd"):
+                plotters.plot_ecdf_grid(ax, *case_summary.ecdf("owd"))
                 legend.append(case[2])
-            continue
-
-        # quic owd TODO: also only rtp owd?
-        qlog_tx_feather = Path(case[1]) / Path("sender.feather")
-        qlog_rx_feater = Path(case[1]) / Path("receiver.feather")
-
-        if qlog_tx_feather.is_file() and qlog_rx_feater.is_file():
-            qlog_tx_df = serializers.read_feather(qlog_tx_feather)
-            qlog_rx_df = serializers.read_feather(qlog_rx_feater)
-
-            plotted = plotters.plot_qlog_owd_cdf(
-                ax, start_time, qlog_tx_df, qlog_rx_df
-            )
-
-            if plotted:
-                legend.append(case[2])
-
-    ax.legend(legend)
-    ax.set_ylabel("CDF")
-    ax.set_xlabel("Latency (ms)")
-    ax.set_title(image_name.name.split("/")[-1].replace(".png", ""))
-    ax.xaxis.set_major_formatter(
-        mticker.FuncFormatter(lambda x, pos: f'{x*1000:.0f}'))
-
-    fig.tight_layout()
-    fig.savefig(image_name, bbox_inches="tight")
-    plt.close()
-
-
-def _get_owd_df(case):
-    """Returns delay df and ok bool"""
-    start_time = _get_start_time(case[1])
-
-    # pcap owd
-    rtp_pcap_tx = Path(case[1]) / Path('ns4.rtp.feather')
-    rtp_pcap_rx = Path(case[1]) / Path('ns1.rtp.feather')
-
-    if rtp_pcap_tx.is_file() and rtp_pcap_rx.is_file():
-        rtp_pcap_tx_df = serializers.read_feather(rtp_pcap_tx)
-        rtp_pcap_rx_df = serializers.read_feather(rtp_pcap_rx)
-
-        df = plotters.get_rtp_owd_pcap_df(
-            start_time, rtp_pcap_tx_df, rtp_pcap_rx_df)
-        return df, True
-
-    # quic owd TODO: also only rtp owd?
-    qlog_tx_feather = Path(case[1]) / Path("sender.feather")
-    qlog_rx_feater = Path(case[1]) / Path("receiver.feather")
 
-    if qlog_tx_feather.is_file() and qlog_rx_feater.is_file():
-        qlog_tx_df = serializers.read_feather(qlog_tx_feather)
-        qlog_rx_df = serializers.read_feather(qlog_rx_feater)
+        ax.legend(legend)
+        ax.set_ylabel("CDF")
+        ax.set_xlabel("Latency (ms)")
+        ax.set_title(image_name.name.split("/")[-1].replace(".png", ""))
+        ax.xaxis.set_major_formatter(
+            mticker.FuncFormatter(lambda x, pos: f'{x*1000:.0f}'))
 
-        ok, delay_df = plotters.get_qlog_owd_df(
-            start_time, qlog_tx_df, qlog_rx_df)
-        if ok:
-            return delay_df, True
-
-    return pd.DataFrame(), False
-
-
-def _convert_bandwidth_to_bps(bandwidth_str):
-    """convert bw string to bps"""
-    units = {
-        'gbit': 1_000_000_000,
-        'mbit': 1_000_000,
-        'kbit': 1_000,
-        'bit': 1,
-    }
-    for unit in units:
-        if bandwidth_str.endswith(unit):
-            value = float(bandwidth_str[:-len(unit)])
-            return int(value * units[unit])
-    raise ValueError(f"Unknown bandwidth unit in '{bandwidth_str}'")
-
-
-def _get_utilization_df(case):
-    """Returns util data and ok bool. If util_of_rtp == True: RTP util, else data util"""
-
-    tc_feather = Path(case[1]) / Path("tc.feather")
-    if not tc_feather.is_file():
-        return pd.DataFrame(), False
-
-    tc_df = serializers.read_feather(tc_feather)
-
-    tc_df = tc_df.set_index(pd.DatetimeIndex(tc_df.index))
-    tc_df['bandwidth_bps'] = tc_df['bandwidth'].apply(
-        _convert_bandwidth_to_bps)
-    capacity_series = tc_df['bandwidth_bps'].resample('1s').ffill()
-
-    # pcap util
-    rtp_pcap_tx = Path(case[1]) / Path('ns4.rtp.feather')
-
-    if rtp_pcap_tx.is_file():
-        rtp_pcap_tx_df = serializers.read_feather(rtp_pcap_tx)
-        rtp_pcap_tx_df['rate'] = rtp_pcap_tx_df['length'] * 8
-
-        rtp_pcap_tx_df = rtp_pcap_tx_df.set_index(
-            pd.DatetimeIndex(rtp_pcap_tx_df.index))  # TODO
-        df = rtp_pcap_tx_df.resample('1s')['rate'].sum().to_frame()
-
-        # calc utilization
-        df['capacity'] = capacity_series.reindex(df.index, method='ffill')
-        df['utilization'] = df['rate'] / df['capacity']
-
-        return df, True
-
-    qlog_tx_feather = Path(case[1]) / Path("sender.feather")
-    roq_df_feather = Path(case[1]) / Path("sender.roq.feather")
-
-    # qlog util
-    if qlog_tx_feather.is_file() and roq_df_feather.is_file():
-        qlog_tx_df = serializers.read_feather(qlog_tx_feather)
-        roq_df = serializers.read_feather(roq_df_feather)
-
-        # get frames
-        qlog_frames = plotters._explode_qlog_frames(qlog_tx_df)
-
-        roq_stream_mapping = roq_df[roq_df['name'] == 'roq:stream_opened']
-        if roq_stream_mapping.empty:
-            return pd.DataFrame(), False
-
-        rtp_streams_mapping = roq_stream_mapping[roq_stream_mapping['data.flow_id'].isin(
-            plotters._RTP_FOW_IDS)]
-
-        if rtp_streams_mapping.empty:
-            return pd.DataFrame(), False
-
-        all_rtp_flows = []
-        for flow_id in sorted(rtp_streams_mapping['data.flow_id'].unique()):
-            flow_mapping = rtp_streams_mapping[rtp_streams_mapping['data.flow_id'] == flow_id]
-            rtp_tx = qlog_frames.merge(
-                flow_mapping, left_on='stream_id', right_on='data.stream_id', suffixes=['', '_mapping'])
-            rtp_tx['rate'] = rtp_tx['length'] * 8
-            all_rtp_flows.append(rtp_tx)
-
-        if all_rtp_flows:
-            combined_rtp = pd.concat(all_rtp_flows, ignore_index=True)
-
-            combined_rtp = combined_rtp.set_index(
-                pd.DatetimeIndex(combined_rtp['time']))
-            df = combined_rtp.resample('1s')['rate'].sum().to_frame()
-
-            df['capacity'] = capacity_series.reindex(df.index, method='ffill')
-            df['utilization'] = df['rate'] / df['capacity']
-
-            return df, True
-
-    return pd.DataFrame(), False
+        fig.tight_layout()
+        render.save(fig, image_name, bbox_inches="tight")
 
 
 def plot_owd_boxplot(name, cases, out):
-    legend = []
-    dfs = []
+    boxes = []
     image_name = Path(out) / Path(f"{name}_delay_box.png")
-    fig, ax = plt.subplots(dpi=FIG_DPI, figsize=FIG_SIZE)
-
-    for case in cases:
-        df, ok = _get_owd_df(case)
-        if ok:
-            legend.append(case[2])
-            dfs.append(df)
+    with render.figure(figsize=FIG_SIZE, dpi=render.DPI) as (fig, ax):
+        for case in _stream(cases):
+            box = case[1].summary.box_stats("owd", case[2])
+            if box is not None:
+                boxes.append(box)
 
-    ax.boxplot([df['latency'] for df in dfs], tick_labels=legend,
-               showfliers=False)
-    ax.yaxis.set_major_formatter(
-        mticker.FuncFormatter(lambda x, pos: f'{x*1000:.0f}'))
+        if boxes:
+            plotters.plot_box_stats(ax, boxes)
+        ax.yaxis.set_major_formatter(
+            mticker.FuncFormatter(lambda x, pos: f'{x*1000:.0f}'))
 
-    ax.set_ylabel("latency (ms)")
-    # ax.set_title(image_name.name.split("/")[-1].replace(".png", ""))
+        ax.set_ylabel("latency (ms)")
+        # ax.set_title(image_name.name.split("/")[-1].replace(".png", ""))
 
-    fig.tight_layout()
-    fig.savefig(image_name, bbox_inches="tight")
-    plt.close()
+        fig.tight_layout()
+        render.save(fig, image_name, bbox_inches="tight")
 
 
 def plot_target_rate(name, cases, out):
     legend = []
     image_name = Path(out) / Path(f"{name}_target-rate.png")
 
-    fig, ax = plt.subplots(dpi=FIG_DPI, figsize=FIG_SIZE)
-
-    if len(cases) != 0:
-        _plot_capacity(ax, legend, cases[0][1])
-
-    # graphs
-    for case in cases:
-        start_time = _get_start_time(case[1])
-
-        feather_file = f"{case[1]}/sender.stderr.feather"
-        df = serializers.read_feather(feather_file)
-        plotters.plot_target_rate(
-            ax, start_time, df, event_name="NEW_TARGET_MEDIA_RATE")
-
-        legend.append(case[2])
-
-    _save_rate_graph(ax, fig, image_name, legend, "Rate")
-
-
-def calc_comp_for_test(case):
-    feather_sender = Path(case[1]) / Path("sender.stderr.feather")
-    feather_recv = Path(case[1]) / Path("receiver.stderr.feather")
-    if not feather_sender.is_file() or not feather_recv.is_file():
-        return [], False
-
-    tx_df = serializers.read_feather(feather_sender)
-    rx_df = serializers.read_feather(feather_recv)
-
-    tx_df = tx_df[tx_df['msg'] == 'DataSrc Chunk started']
-    rx_df = rx_df[rx_df['msg'] == 'DataSink Chunk finished']
-
-    if tx_df.empty or rx_df.empty:
-        return [], False
-
-    merged_df = tx_df.merge(rx_df, on='chunk-number',
-                            suffixes=('_start', '_finish'))
-    if merged_df.empty:
-        return [], False
-
-    merged_df['completion_time'] = (
-        pd.to_datetime(merged_df['time_finish']) -
-        pd.to_datetime(merged_df['time_start'])
-    )
+    with render.figure(figsize=FIG_SIZE, dpi=render.DPI) as (fig, ax):
+        if len(cases) != 0:
+            _plot_capacity(ax, legend, cases[0][1])
 
-    return merged_df['completion_time'].to_numpy(), True
+        # graphs
+        for case in _stream(cases):
+            df = case[1].table("sender.stderr.feather")
+            plotters.plot_target_rate(
+                ax, case[1].start_time, df, event_name="NEW_TARGET_MEDIA_RATE")
 
+            legend.append(case[2])
 
-def _calc_and_combine_same_tests(cases, avg_fct):
-    """ calc avg with avg_fct and combine same test types"""
-    test_type_data = {}
-    for case in cases:
-        comp_times, ok = avg_fct(case)
-        if ok:
-            test_type = case[0]
-            if test_type not in test_type_data:
-                test_type_data[test_type] = []
-            test_type_data[test_type].append(comp_times)
-
-    return test_type_data
-
-
-def calc_avg_comp_time(cases, out):
-    test_type_data = _calc_and_combine_same_tests(cases, calc_comp_for_test)
-
-    output_file = Path(out) / Path("completion-time.csv")
-    results = []
-    print("Average Completion Time Statistics:")
-
-    for test_type, comp_time_arrays in test_type_data.items():
-        combined = np.concatenate(comp_time_arrays)
-        # calculate average
-        avg_comp_time = combined.mean()
-        avg_seconds = avg_comp_time / pd.Timedelta(seconds=1)
-        num_tests = len(comp_time_arrays)
-        print(
-            f"{test_type}: avg completion time = {avg_seconds:.2f} seconds (N={num_tests})")
-        results.append({
-            'test_type': test_type,
-            'avg_completion_time_seconds': avg_seconds,
-            'num_tests': num_tests
-        })
-
-    if results:
-        df = pd.DataFrame(results)
-        df.to_csv(output_file, index=False)
-
-
-def calc_avg_delay(cases, out):
-    test_type_data = _calc_and_combine_same_tests(cases, _get_owd_df)
-
-    output_file = Path(out) / Path("delay.csv")
-    results = []
-    print("Average Delay Statistics:")
-
-    for test_type, delay_dfs in test_type_data.items():
-        combined = np.concatenate([df['latency'].to_numpy()
-                                  for df in delay_dfs])
-
-        # Calculate statistics
-        avg_delay = combined.mean() * 1000
-        median_delay = np.median(combined) * 1000
-        p99_delay = np.percentile(combined, 99) * 1000
-        num_tests = len(delay_dfs)
-
-        print(
-            f"{test_type}: avg delay = {avg_delay:.2f} ms, "
-            f"median = {median_delay:.2f} ms, "
-            f"99th percentile = {p99_delay:.2f} ms (N={num_tests})")
-
-        results.append({
-            'test_type': test_type,
-            'avg_delay_ms': avg_delay,
-            'median_delay_ms': median_delay,
-            'p99_delay_ms': p99_delay,
-            'num_tests': num_tests
-        })
-
-    if results:
-        df = pd.DataFrame(results)
-        df.to_csv(output_file, index=False)
-
-
-def calc_util(cases, out):
-    test_type_data = _calc_and_combine_same_tests(cases, _get_utilization_df)
-
-    output_file = Path(out) / Path("util.csv")
-    results = []
-    print("Average Utilization Statistics:")
-
-    for test_type, delay_dfs in test_type_data.items():
-        combined = np.concatenate([df['utilization'].to_numpy()
-                                  for df in delay_dfs])
-
-        # Calculate statistics
-        avg_util = combined.mean() * 100
-        median_util = np.median(combined) * 100
-        num_tests = len(delay_dfs)
-
-        print(
-            f"{test_type}: avg utilization = {avg_util:.2f} %, "
-            f"median = {median_util:.2f} %, "
-            f"(N={num_tests})")
-
-        results.append({
-            'test_type': test_type,
-            'avg_utilization': avg_util,
-            'median_utilization': median_util,
-            'num_tests': num_tests
-        })
-
-    if results:
-        df = pd.DataFrame(results)
-        df.to_csv(output_file, index=False)
+        _save_rate_graph(ax, fig, image_name, legend, "Rate")
+
+
+# average tables of calc_avgs:
+# (metric, csv file, heading, scale, unit, [(column, statistic, name), ...])
+avg_tables = [
+    ("completion_time", "completion-time.csv", "Average Completion Time Statistics:",
+     1, "seconds", [("avg_completion_time_seconds", "mean", "avg completion time")]),
+    ("owd", "delay.csv", "Average Delay Statistics:", 1000, "ms", [
+        ("avg_delay_ms", "mean", "avg delay"),
+        ("median_delay_ms", "p50", "median"),
+        ("p99_delay_ms", "p99", "99th percentile")]),
+    ("frame_latency", "frame-latency.csv", "Average Frame Latency Statistics:", 1000, "ms", [
+        ("avg_latency_ms", "mean", "avg frame latency"),
+        ("median_latency_ms", "p50", "median"),
+        ("p99_latency_ms", "p99", "99th percentile")]),
+    ("utilization", "util.csv", "Average Utilization Statistics:", 100, "%", [
+        ("avg_utilization", "mean", "avg utilization"),
+        ("median_utilization", "p50", "median")]),
+]
 
 
-def plot_video_quality(plot_name, cases, out, name, plot_fct):
+def _write_avgs(avgs, out):
+    """prints the statistics per test type and writes the csv files of avg_tables"""
+    for metric, csv_file, heading, scale, unit, columns in avg_tables:
+        print(heading)
+        results = []
+        rows = avgs[avgs.index.get_level_values("metric") == metric]
+        for (test_type, _), row in rows.iterrows():
+            values = [row[stat] * scale for _, stat, _ in columns]
+            num_tests = int(row["cases"])
+            print(f"{test_type}: " + ", ".join(
+                f"{name} = {value:.2f} {unit}" for (_, _, name), value in zip(columns, values)) +
+                f" (N={num_tests})")
+            results.append({"test_type": test_type,
+                            **{column: value for (column, _, _), value in zip(columns, values)},
+                            "num_tests": num_tests})
+
+        if results:
+            df = pd.DataFrame(results)
+            df.to_csv(Path(out) / Path(csv_file), index=False)
+
+
+def plot_video_quality(plot_name, cases, out, name):
     legend = []
     image_name = Path(out) / Path(f"{plot_name}_{name}.png")
 
-    fig, ax = plt.subplots(dpi=FIG_DPI, figsize=FIG_SIZE)
-
-    # graphs
-    for case in cases:
-        feather_file = Path(case[1]) / Path("video.quality.feather")
-        if not feather_file.is_file():
-            continue
+    with render.figure(figsize=FIG_SIZE, dpi=render.DPI) as (fig, ax):
+        # graphs
+        for case in _stream(cases):
+            case_summary = case[1].summary
+            if not case_summary.has(name):
+                continue
 
-        qm_df = serializers.read_feather(feather_file)
-        plot_fct(ax, None, qm_df)
-        legend.append(case[2])
-
-    ax.legend(legend)
-    ax.set_ylabel("CDF")
-    ax.set_xlabel(name)
-    ax.set_title(image_name.name.split("/")[-1].replace(".png", ""))
+            plotters.plot_ecdf_grid(ax, *case_summary.ecdf(name))
+            legend.append(case[2])
 
-    fig.tight_layout()
-    fig.savefig(image_name, bbox_inches="tight")
-    plt.close()
+        ax.set_ylim([0, 1])
+        ax.legend(legend)
+        ax.set_ylabel("CDF")
+        ax.set_xlabel(name)
+        ax.set_title(image_name.name.split("/")[-1].replace(".png", ""))
 
+        fig.tight_layout()
+        render.save(fig, image_name, bbox_inches="tight")
 
-def plot_everything(name, cases, out):
-    """Plots all version comparison plots"""
-    plot_fdelay(name, cases, out)
-    plot_owd_cdf(name, cases, out)
-    plot_owd_boxplot(name, cases, out)
-    plot_target_rate(name, cases, out)
-    plot_video_quality(name, cases, out, "ssim",
-                       plotters.plot_video_quality_ssim_cdf)
-    plot_video_quality(name, cases, out, "psnr",
-                       plotters.plot_video_quality_psnr_cdf)
 
+def _contexts(cases):
+    """replaces the case paths with a derive.CaseContext each"""
+    return [case if isinstance(case[1], derive.CaseContext)
+            else (case[0], derive.CaseContext(case[1]), case[2]) for case in cases]
 
-def get_test_types(testcases):
-    """Get all unique test types in testcase tuple list. Types: static_webrtc-nada, ..."""
-    testtypes = [case[0] for case in testcases]
-    return set(testtypes)
 
+def plot_everything(name, cases, out):
+    """Plots all version comparison plots. The data of each case is loaded
+    once and shared by all plots."""
+    cases = _contexts(cases)
+    plots = [
+        ("fdelay", plot_fdelay, ()),
+        ("delay_cdf", plot_owd_cdf, ()),
+        ("delay_box", plot_owd_boxplot, ()),
+        ("target-rate", plot_target_rate, ()),
+        ("ssim", plot_video_quality, ("ssim",)),
+        ("psnr", plot_video_quality, ("psnr",)),
+    ]
+    for plot_name, plot_fct, args in plots:
+        with instrument.measure(plot_name, name, cases=len(cases)):
+            plot_fct(name, cases, out, *args)
+
+
+def _pool(workers):
+    init, *args = WORKER_INIT or (None,)
+    return ProcessPoolExecutor(max_workers=workers, initializer=init,
+                               initargs=tuple(args))
+
+
+def _call(fct, item):
+    """fct(item) as (result, error traceback, instrument records of the call)"""
+    start = len(instrument.records)
+    try:
+        result, error = fct(item), None
+    except Exception:
+        result, error = None, traceback.format_exc()
+    records = instrument.records[start:]
+    del instrument.records[start:]
+    return result, error, records
+
+
+def _call_isolated(fct, item):
+    with _pool(1) as pool:
+        try:
+            return pool.submit(_call, fct, item).result()
+        except BrokenProcessPool:
+            return None, "worker process died", []
+
+
+def _map(fct, items):
+    """calls fct for each item, in JOBS worker processes if JOBS > 1. Returns
+    (result, error) per item in the order of items, error is the traceback of
+    a failed item. A failed item does not stop the others, if a worker process
+    dies, the unfinished items are retried one by one in their own process."""
+    if JOBS <= 1 or len(items) <= 1:
+        outcomes = [_call(fct, item) for item in items]
+    else:
+        outcomes = [None] * len(items)
+        with _pool(min(JOBS, len(items))) as pool:
+            futures = [pool.submit(_call, fct, item) for item in items]
+            for i, future in enumerate(futures):
+                try:
+                    outcomes[i] = future.result()
+                except BrokenProcessPool:
+                    pass
+        for i, outcome in enumerate(outcomes):
+            if outcome is None:
+                outcomes[i] = _call_isolated(fct, items[i])
 
-def _get_link_types(testcases):
-    """Get all unique link types in testcase tuple list. Types: static, ..."""
-    linktypes = [case[0].split("_")[0] for case in testcases]
-    return set(linktypes)
+    results = []
+    for result, error, records in outcomes:
+        instrument.records.extend(records)
+        results.append((result, error))
+    return results
+
+
+def _load_summary(case):
+    """case with a context holding its summary"""
+    context = derive.CaseContext(case[1])
+    context.summary
+    context.release()
+    return (case[0], context, case[2])
+
+
+def _load_case(case):
+    """case with a context holding the data of the comparison plots"""
+    context = derive.CaseContext(case[1])
+    context.start_time
+    context.frame_latency
+    context.summary
+    context.release()
+    return (case[0], context, case[2])
+
+
+def _load_cases(load, cases):
+    """loads the cases in parallel, failed cases are reported and left out"""
+    loaded = []
+    for case, (result, error) in zip(cases, _map(load, cases)):
+        if error is None:
+            loaded.append(result)
+        else:
+            print(f"loading {case[1]} failed:\n{error}")
+    return loaded
+
+
+def _plot_group(group):
+    plot_everything(*group)
+
+
+def _plot_groups(groups, out):
+    """plot_everything for each (name, cases) group. Groups are plotted in
+    parallel, with fewer groups than JOBS the cases of each group are loaded
+    in parallel first. Returns the names of the failed groups."""
+    if len(groups) >= JOBS:
+        tasks = [(name, cases, out) for name, cases in groups]
+    else:
+        tasks = [(name, _load_cases(_load_case, cases), out)
+                 for name, cases in groups]
+
+    failed = []
+    for task, (_, error) in zip(tasks, _map(_plot_group, tasks)):
+        if error is not None:
+            print(f"plotting {task[0]} failed:\n{error}")
+            failed.append(task[0])
+    return failed
+
+
+def _write_cis(df, out):
+    """bootstrap confidence intervals of the pooled mean, median and p99 per
+    test type (the statistics of the avgs tables), resampling its iterations,
+    next to the csv files of avg_tables (*-ci.csv)"""
+    cis = summary.pooled_bootstrap(df, "testcase", "iteration", quantiles=(0.5, 0.99))
+    statistics = {"mean": "mean", "p50": "median", "p99": "p99"}
+
+    for metric, csv_file, _, scale, unit, _ in avg_tables:
+        rows = cis[cis["metric"] == metric]
+        if rows.empty:
+            continue
+        df_ci = pd.DataFrame({
+            "test_type": rows["testcase"].astype(str),
+            "statistic": rows["statistic"].map(statistics),
+            "unit": unit,
+            "estimate": rows["estimate"] * scale,
+            "ci_low": rows["ci_low"] * scale,
+            "ci_high": rows["ci_high"] * scale,
+            "confidence": stats.CONFIDENCE,
+            "num_tests": rows["cases"],
+        })
+        df_ci.to_csv(Path(out) / Path(csv_file.replace(".csv", "-ci.csv")), index=False)
 
 
-def calc_avgs(testcases, out):
-    calc_avg_comp_time(testcases, out)
-    calc_avg_delay(testcases, out)
-    calc_util(testcases, out)
+def load_tidy(results):
+    """summaries of all test cases in the catalog.Catalog results as one long
+    table with categorical iteration, testcase, link, transport and cc columns"""
+    keys = {path: {"iteration": iteration, "testcase": testcase, "link": link,
+                   "transport": transport, "cc": cc}
+            for path, iteration, testcase, link, transport, cc in results.case_keys()}
+    # only the summaries are needed
+    loaded = _load_cases(_load_summary, results.cases())
+    return summary.tidy([case[1].summary for case in loaded],
+                        [keys[str(case[1])] for case in loaded])
 
 
-def plot_by_testtype(testcases, out):
-    sorted_testcases = sorted(testcases, key=lambda tup: tup[2])
+def calc_avgs(results, out):
+    df = load_tidy(results)
+    if df.empty:
+        return
+    avgs = summary.sketch_stats(df, "testcase", quantiles=(0.5, 0.99))
+    _write_avgs(avgs, out)
+    _write_cis(df, out)
 
-    testtypes = get_test_types(sorted_testcases)
 
+def plot_by_testtype(results, out):
+    """groups the cases of the catalog.Catalog results by test type"""
+    groups = []
     # plot for each test type
-    for testtype in testtypes:
-        cases = list(
-            filter(lambda case: case[0] == testtype, sorted_testcases))
-        plot_everything(testtype, cases, out)
-
+    for testtype in results.testcases():
+        groups.append((testtype, results.cases(testcase=testtype)))
+    return _plot_groups(groups, out)
 
-def plot_by_link(testcases, out):
-    sorted_testcases = sorted(testcases, key=lambda tup: tup[2])
-    sorted_testcases = [(tup[0], tup[1], tup[0])
-                        for tup in sorted_testcases]  # change name
 
-    link_types = _get_link_types(sorted_testcases)
-
-    # plot for each test type
-    for link_type in link_types:
-        cases = list(
-            filter(lambda case: case[0].split("_")[0] == link_type, sorted_testcases))
-        plot_everything(link_type, cases, out)
+def plot_by_link(results, out):
+    """groups the cases of the catalog.Catalog results by link type"""
+    groups = []
+    # plot for each link type
+    for link_type in results.links():
+        cases = [(case[0], case[1], case[0])  # change name
+                 for case in results.cases(link=link_type)]
+        groups.append((link_type, cases))
+    return _plot_groups(groups, out)
 
 
-def plot_by_predefined(testcases, out):
-    sorted_iterations = sorted(testcases, key=lambda tup: tup[2])
-
+def plot_by_predefined(results, out):
+    groups = []
     for plot in predefined_plots:
         plot_name = plot[0]
         cases = []
         for case in plot[1]:
-            for test_iter in sorted_iterations:
-                if test_iter[0] == case[0]:
-                    print(f"match: ({case[0]}, {case[1]}) -> {test_iter[1]}")
-                    cases.append((test_iter[0], test_iter[1], case[1]))
-        plot_everything(plot_name, cases, out)
+            for test_iter in results.cases(testcase=case[0]):
+                print(f"match: ({case[0]}, {case[1]}) -> {test_iter[1]}")
+                cases.append((test_iter[0], test_iter[1], case[1]))
+        groups.append((plot_name, cases))
+    return _plot_groups(groups, out)
 
 
-def get_all_testcases(dir: str):
-    """Returns list of tupels (testtype, path, name) of each test case"""
-    testcases = []
+def _catalog(dir):
+    return catalog.Catalog(dir).update()
 
-    tests_dir = Path(dir)
-    for test_iteration in tests_dir.iterdir():
-        if test_iteration.is_dir():
-            for test_case in test_iteration.iterdir():
-                if test_case.is_dir():
-                    testcase = (test_case.name, str(
-                        test_case), test_iteration.name)
-                    testcases.append(testcase)
 
-    return testcases
+def get_all_testcases(dir: str):
+    """Returns list of tupels (testtype, path, name) of each test case"""
+    return _catalog(dir).cases()
 
 
 def calc_avgs_comparision(input: str, output: str):
-    calc_avgs(get_all_testcases(input), output)
+    calc_avgs(_catalog(input), output)
 
 
 def plot_link_comparision(input: str, output: str):
     """Combine results per link type. E.g. each static test combined"""
-    plot_by_link(get_all_testcases(input), output)
+    return plot_by_link(_catalog(input), output)
 
 
 def plot_version_comparison(input: str, output: str):
     """Combine results per version. E.g. each iteration of webrtc-gcc-pacing"""
-    plot_by_testtype(get_all_testcases(input), output)
+    return plot_by_testtype(_catalog(input), output)
 
 
 def plot_predefined_comparisons(input: str, output: str):
     """Plot the statically defined comparisons in predefined_plots"""
-    plot_by_predefined(get_all_testcases(input), output)
+    return plot_by_predefined(_catalog(input), output)
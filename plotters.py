@@ -1,19 +1,16 @@
-import datetime
-import re
 import matplotlib.ticker as mticker
+from matplotlib.collections import LineCollection
+import numpy as np
 import pandas as pd
 
-import video_quality
+import parsers
+import render
+import serializers
+import stats
+from capacity import CapacityTimeline
 
 DEFAULT_LINE_WIDTH = 1.0
 
-unit_multipliers = {
-    'bit': 1,
-    'kbit': 1_000,
-    'mbit': 1_000_000,
-    'gbit': 1_000_000_000,
-}
-
 usage_and_state = {
     -1: 'over / decrease',
     0: 'hold / normal',
@@ -23,15 +20,18 @@ usage_and_state = {
 _RTP_FOW_IDS = {0, 10, 20}
 
 
-def parse_rate(rate_str):
-    match = re.match(r'([\d.]+)([a-zA-Z]+)', rate_str.strip())
-    if not match:
-        raise ValueError(f'invalid rate format {rate_str}')
-    value, unit = match.groups()
-    unit = unit.lower()
-    if unit not in unit_multipliers:
-        raise ValueError(f'unknown unit {unit}')
-    return float(value) * unit_multipliers[unit]
+def _events(log, value, column='msg'):
+    """rows of a log (LogTable or DataFrame) where column == value as new DataFrame"""
+    if isinstance(log, serializers.LogTable):
+        return log.select(column, value)
+    return log[log[column] == value].copy()
+
+
+def _frame(log, columns=None):
+    """log as DataFrame, converts only the given columns of a LogTable"""
+    if isinstance(log, serializers.LogTable):
+        return log.to_pandas(columns)
+    return log
 
 
 def _name_space_to_ip(namespace):
@@ -46,6 +46,7 @@ def _name_space_to_ip(namespace):
 
 
 def _get_ips_from_config(config_df):
+    config_df = _frame(config_df, ['applications'])
     sender_ip = '0.0.0.0'
     receiver_ip = '0.0.0.0'
 
@@ -60,11 +61,13 @@ def _get_ips_from_config(config_df):
 
 
 def set_start_time_index(df, start_time, time_column):
-    df['timestamp'] = pd.to_datetime(df[time_column])
-    df.set_index('timestamp', inplace=True)
-    df['second'] = (df.index - start_time).total_seconds()
-    df.set_index('second', inplace=True)
-    return df
+    """returns df indexed by the seconds since start_time, uses the t_rel
+    column from parse-all if available"""
+    if time_column == 'time' and 't_rel' in df.columns:
+        seconds = df['t_rel']
+    else:
+        seconds = parsers.relative_seconds(df[time_column], start_time)
+    return df.set_index(pd.Index(seconds, name='second'))
 
 
 def plot_rtp_rates_log(ax, start_time, cap_df, tx_df, rx_df):
@@ -78,13 +81,13 @@ def plot_rtp_rates_log(ax, start_time, cap_df, tx_df, rx_df):
 
 
 def _plot_rtp_send_rate_pcaps(ax, start_time, sender_ip, rtp_tx_df, name='tx'):
-    rtp_tx_df = rtp_tx_df[rtp_tx_df['src'] == sender_ip].copy()
+    rtp_tx_df = _events(rtp_tx_df, sender_ip, 'src')
     rtp_tx_df['rate'] = rtp_tx_df['length'] * 8
     return _plot_rate(ax, start_time, rtp_tx_df, name)
 
 
 def _plot_rtp_recv_rate_pcaps(ax, start_time, receiver_ip, rtp_rx_df, name='rx'):
-    rtp_rx_df = rtp_rx_df[rtp_rx_df['dst'] == receiver_ip].copy()
+    rtp_rx_df = _events(rtp_rx_df, receiver_ip, 'dst')
     rtp_rx_df['rate'] = rtp_rx_df['length'] * 8
     return _plot_rate(ax, start_time, rtp_rx_df, name)
 
@@ -108,10 +111,8 @@ def plot_quic_rates(ax, start_time, cap_df, tx_log_df, qlog_tx_df, qlog_rx_df):
     plot_capacity(ax, start_time, cap_df)
     plot_target_rate(ax, start_time, tx_log_df, color='tab:green')
 
-    quic_tx_latency_df = qlog_tx_df[qlog_tx_df['name']
-                                    == 'transport:packet_sent'].copy()
-    quic_rx_latency_df = qlog_rx_df[qlog_rx_df['name']
-                                    == 'transport:packet_received'].copy()
+    quic_tx_latency_df = _events(qlog_tx_df, 'transport:packet_sent', 'name')
+    quic_rx_latency_df = _events(qlog_rx_df, 'transport:packet_received', 'name')
 
     if quic_tx_latency_df.empty or quic_rx_latency_df.empty:
         return False
@@ -247,8 +248,7 @@ def plot_send_rates_and_loss_quic(axs, start_time, cap_df, tx_log_df, rx_log_df,
 def _plot_send_rate_quic(ax, start_time, cap_df, tx_log_df, rx_log_df, qlog_tx_df, qlog_rx_df):
     plot_capacity(ax, start_time, cap_df)
 
-    quic_tx_latency_df = qlog_tx_df[qlog_tx_df['name']
-                                    == 'transport:packet_sent'].copy()
+    quic_tx_latency_df = _events(qlog_tx_df, 'transport:packet_sent', 'name')
     if quic_tx_latency_df.empty:
         return False
 
@@ -285,7 +285,7 @@ def _plot_all_qlog_rates(ax, start_time, cap_df, tx_df, rx_df, quic_df, roq_df,
     # get frames
     qlog_frames = _explode_qlog_frames(quic_df)
 
-    roq_stream_mapping = roq_df[roq_df['name'] == 'roq:stream_opened']
+    roq_stream_mapping = _events(roq_df, 'roq:stream_opened', 'name')
     if roq_stream_mapping.empty:
         return False
 
@@ -314,9 +314,9 @@ def _plot_all_qlog_rates(ax, start_time, cap_df, tx_df, rx_df, quic_df, roq_df,
 
     # plot data stream
     data_df = pd.DataFrame()
-    dc_stream_mapping = rx_df[rx_df['msg'] == 'new dc stream']
+    dc_stream_mapping = _events(rx_df, 'new dc stream')
     if not dc_stream_mapping.empty:
-        data_streams_mapping = dc_stream_mapping[dc_stream_mapping['flowID'] == 3]
+        data_streams_mapping = _events(dc_stream_mapping, 3, 'flowID')
 
         if not data_streams_mapping.empty:
             data_tx = qlog_frames.merge(
@@ -338,6 +338,7 @@ def _plot_all_qlog_rates(ax, start_time, cap_df, tx_df, rx_df, quic_df, roq_df,
 
 
 def _explode_qlog_frames(qlog_df):
+    qlog_df = _frame(qlog_df)
     frames_df = qlog_df.explode('data.frames')
     frames_normalized = pd.json_normalize(frames_df['data.frames'], sep='.')
     frames_normalized.index = frames_df.index
@@ -346,10 +347,8 @@ def _explode_qlog_frames(qlog_df):
 
 
 def _plot_qlog_owd_per_flow(ax, start_time, qlog_tx_df, qlog_rx_df, roq_df):
-    quic_tx_latency_df = qlog_tx_df[qlog_tx_df['name']
-                                    == 'transport:packet_sent'].copy()
-    quic_rx_latency_df = qlog_rx_df[qlog_rx_df['name']
-                                    == 'transport:packet_received'].copy()
+    quic_tx_latency_df = _events(qlog_tx_df, 'transport:packet_sent', 'name')
+    quic_rx_latency_df = _events(qlog_rx_df, 'transport:packet_received', 'name')
 
     if quic_tx_latency_df.empty or quic_rx_latency_df.empty:
         return False
@@ -358,7 +357,7 @@ def _plot_qlog_owd_per_flow(ax, start_time, qlog_tx_df, qlog_rx_df, roq_df):
     tx_qlog_frames = _explode_qlog_frames(qlog_tx_df)
     rx_qlog_frames = _explode_qlog_frames(qlog_rx_df)
 
-    stream_mapping = roq_df[roq_df['name'] == 'roq:stream_opened']
+    stream_mapping = _events(roq_df, 'roq:stream_opened', 'name')
     if stream_mapping.empty:
         return False
 
@@ -386,16 +385,14 @@ def _plot_qlog_owd_per_flow(ax, start_time, qlog_tx_df, qlog_rx_df, roq_df):
 
 
 def plot_all_send_rates_qlog(ax, start_time, cap_df, tx_df, rx_df, qlog_tx_df, roq_df, only_flow_rates=False):
-    quic_tx_df = qlog_tx_df[qlog_tx_df['name']
-                            == 'transport:packet_sent'].copy()
+    quic_tx_df = _events(qlog_tx_df, 'transport:packet_sent', 'name')
     if quic_tx_df.empty:
         return False
     return _plot_all_qlog_rates(ax, start_time, cap_df, tx_df, rx_df, quic_tx_df, roq_df, only_flow_rates=only_flow_rates)
 
 
 def plot_all_recv_rates_qlog(ax, start_time, cap_df, tx_df, rx_df, qlog_rx_df, roq_df):
-    qlog_rx_df = qlog_rx_df[qlog_rx_df['name']
-                            == 'transport:packet_received'].copy()
+    qlog_rx_df = _events(qlog_rx_df, 'transport:packet_received', 'name')
     if qlog_rx_df.empty:
         return False
     return _plot_all_qlog_rates(ax, start_time, cap_df, tx_df, rx_df, qlog_rx_df, roq_df)
@@ -413,15 +410,14 @@ def _rate_plot_ax_config(ax):
 
 
 def plot_capacity(ax, start_time, df):
-    if not df.empty:
-        df['rate'] = df['bandwidth'].apply(parse_rate)
-        df = set_start_time_index(df, start_time, 'time')
-        ax.step(df.index, df['rate'], where='post',
+    capacity = CapacityTimeline.from_tc(_frame(df), start_time)
+    if not capacity.empty:
+        ax.step(capacity.seconds, capacity.bps, where='post',
                 label='Bandwidth', linewidth=DEFAULT_LINE_WIDTH, color="grey")
 
 
 def plot_target_rate(ax, start_time, df, event_name='NEW_TARGET_MEDIA_RATE', label='target', color='black'):
-    df = df[df['msg'] == event_name].copy()
+    df = _events(df, event_name)
     if df.empty:
         return False
     df = set_start_time_index(df, start_time, 'time')
@@ -430,7 +426,7 @@ def plot_target_rate(ax, start_time, df, event_name='NEW_TARGET_MEDIA_RATE', lab
 
 
 def plot_rtp_rate_logging(ax, start_time, df, label):
-    df = df[df['msg'] == 'rtp packet'].copy()
+    df = _events(df, 'rtp packet')
     if df.empty:
         return False, df
     df['rate'] = df['rtp-packet.payload-length'] * 8
@@ -438,7 +434,7 @@ def plot_rtp_rate_logging(ax, start_time, df, label):
 
 
 def plot_data_rate(ax, start_time, df, label, event_name='DataSource sent data'):
-    df = df[df['msg'] == event_name].copy()
+    df = _events(df, event_name)
     if df.empty:
         return False, df
     df['rate'] = df['payload-length'] * 8
@@ -447,26 +443,29 @@ def plot_data_rate(ax, start_time, df, label, event_name='DataSource sent data')
 
 def _plot_rate(ax, start_time, df, label):
     """time as index and rate as column"""
-    df = df.resample('500ms').sum(numeric_only=True).copy() # resample
-    df['rate'] = df['rate'] * 2 # convert rate
+    # sum rate over 500ms bins of the absolute time
+    bins = parsers.to_ns(df.index) // 500_000_000
+    first_bin = bins.min() if len(bins) > 0 else 0
+    rate = np.bincount(bins - first_bin, weights=np.nan_to_num(
+        df['rate'].to_numpy(dtype='float64'))) * 2  # convert rate
+    second = ((np.arange(len(rate)) + first_bin) * 500_000_000 -
+              start_time.value) / 1e9
+    df = pd.DataFrame({'rate': rate}, index=pd.Index(second, name='second'))
 
-    df['second'] = (df.index - start_time).total_seconds()
-    df.set_index('second', inplace=True)
-    
     # fill in zeros before min and after max
     max_second = 100.0
     if not df.empty:
         min_second = df.index.min()
         max_data_second = df.index.max()
-        
+
         for s in range(0, int(min_second)):
             df.loc[s] = 0
-        
+
         for s in range(int(max_data_second) + 1, int(max_second) + 1):
             df.loc[s] = 0
-        
+
         df = df.sort_index()
-    
+
     ax.plot(df.index, df['rate'], label=label, linewidth=DEFAULT_LINE_WIDTH)
 
     return True, df
@@ -483,8 +482,8 @@ def plot_rtp_loss_rate_pcap(ax, start_time, rtp_tx_df, rtp_rx_df):
 
 def plot_rtp_loss_rate_log(ax, start_time, rtp_tx_df, rtp_rx_df):
     """rtp loss without jitter buffer"""
-    rtp_tx_df = rtp_tx_df[rtp_tx_df['msg'] == 'rtp packet'].copy()
-    rtp_rx_df = rtp_rx_df[rtp_rx_df['msg'] == 'rtp packet'].copy()
+    rtp_tx_df = _events(rtp_tx_df, 'rtp packet')
+    rtp_rx_df = _events(rtp_rx_df, 'rtp packet')
     if rtp_tx_df.empty:
         return False
 
@@ -493,15 +492,13 @@ def plot_rtp_loss_rate_log(ax, start_time, rtp_tx_df, rtp_rx_df):
 
 def _plot_rtp_loss_count_quic(ax, start_time, qlog_tx_df, qlog_rx_df, roq_df):
     """rtp loss without jitter buffer"""
-    quic_tx_df = qlog_tx_df[qlog_tx_df['name']
-                            == 'transport:packet_sent'].copy()
-    quic_rx_df = qlog_rx_df[qlog_rx_df['name']
-                            == 'transport:packet_received'].copy()
+    quic_tx_df = _events(qlog_tx_df, 'transport:packet_sent', 'name')
+    quic_rx_df = _events(qlog_rx_df, 'transport:packet_received', 'name')
 
     if quic_tx_df.empty or quic_rx_df.empty:
         return False
 
-    stream_mapping = roq_df[roq_df['name'] == 'roq:stream_opened']
+    stream_mapping = _events(roq_df, 'roq:stream_opened', 'name')
     if stream_mapping.empty:
         return False
 
@@ -527,10 +524,8 @@ def _plot_rtp_loss_count_quic(ax, start_time, qlog_tx_df, qlog_rx_df, roq_df):
 
 def _plot_loss_count_quic(ax, start_time, qlog_tx_df, qlog_rx_df):
     """rtp loss without jitter buffer"""
-    quic_tx_df = qlog_tx_df[qlog_tx_df['name']
-                            == 'transport:packet_sent'].copy()
-    quic_rx_df = qlog_rx_df[qlog_rx_df['name']
-                            == 'transport:packet_received'].copy()
+    quic_tx_df = _events(qlog_tx_df, 'transport:packet_sent', 'name')
+    quic_rx_df = _events(qlog_rx_df, 'transport:packet_received', 'name')
 
     if quic_tx_df.empty or quic_rx_df.empty:
         return False
@@ -540,8 +535,8 @@ def _plot_loss_count_quic(ax, start_time, qlog_tx_df, qlog_rx_df):
 
 def plot_rtp_full_loss_rate_log(ax, start_time, rtp_tx_df, rtp_rx_df):
     """rtp loss with jitter buffer"""
-    rtp_tx_df = rtp_tx_df[rtp_tx_df['msg'] == 'rtp to pts mapping'].copy()
-    rtp_rx_df = rtp_rx_df[rtp_rx_df['msg'] == 'rtp to pts mapping'].copy()
+    rtp_tx_df = _events(rtp_tx_df, 'rtp to pts mapping')
+    rtp_rx_df = _events(rtp_rx_df, 'rtp to pts mapping')
     if rtp_tx_df.empty:
         return False
 
@@ -551,8 +546,10 @@ def plot_rtp_full_loss_rate_log(ax, start_time, rtp_tx_df, rtp_rx_df):
 def _plot_rtp_loss_rate(ax, start_time, rtp_tx_df, rtp_rx_df, seq_nr_name):
     if rtp_tx_df.empty:
         return False
+    rtp_tx_df = _frame(rtp_tx_df, ['time', seq_nr_name])
     if rtp_rx_df.empty:
         rtp_rx_df = pd.DataFrame(columns=rtp_tx_df.columns)
+    rtp_rx_df = _frame(rtp_rx_df, ['time', seq_nr_name])
 
     rtp_tx_df = rtp_tx_df.reset_index()
     rtp_rx_df = rtp_rx_df.reset_index()
@@ -560,8 +557,9 @@ def _plot_rtp_loss_rate(ax, start_time, rtp_tx_df, rtp_rx_df, seq_nr_name):
     rx_df = rtp_rx_df[['time', seq_nr_name]]
     merged_df = pd.merge(tx_df, rx_df, on=seq_nr_name,
                          how='left', indicator=True)
-    merged_df['tx'] = pd.to_datetime(merged_df['time_x'])
-    merged_df['second'] = merged_df['tx'].dt.floor('s')
+    # floor to the second of the absolute time
+    merged_df['second'] = (parsers.to_ns(merged_df['time_x']) // 1_000_000_000 *
+                           1_000_000_000 - start_time.value) / 1e9
     merged_df['lost'] = merged_df['_merge'] == 'left_only'
     merged_df = merged_df.groupby('second').agg(
         sent=(seq_nr_name, 'count'),
@@ -569,9 +567,6 @@ def _plot_rtp_loss_rate(ax, start_time, rtp_tx_df, rtp_rx_df, seq_nr_name):
     )
     merged_df['loss_rate'] = merged_df['lost'] / merged_df['sent']
 
-    merged_df['second'] = (merged_df.index - start_time).total_seconds()
-    merged_df.set_index('second', inplace=True)
-
     ax.plot(merged_df.index, merged_df['loss_rate'],
             linewidth=DEFAULT_LINE_WIDTH)
     ax.set_xlabel('Time')
@@ -586,8 +581,10 @@ def _plot_rtp_loss_rate(ax, start_time, rtp_tx_df, rtp_rx_df, seq_nr_name):
 def _plot_loss_count(ax, start_time, rtp_tx_df, rtp_rx_df, seq_nr_name):
     if rtp_tx_df.empty:
         return False
+    rtp_tx_df = _frame(rtp_tx_df, ['time', seq_nr_name])
     if rtp_rx_df.empty:
         rtp_rx_df = pd.DataFrame(columns=rtp_tx_df.columns)
+    rtp_rx_df = _frame(rtp_rx_df, ['time', seq_nr_name])
 
     rtp_tx_df = rtp_tx_df.reset_index()
     rtp_rx_df = rtp_rx_df.reset_index()
@@ -595,17 +592,15 @@ def _plot_loss_count(ax, start_time, rtp_tx_df, rtp_rx_df, seq_nr_name):
     rx_df = rtp_rx_df[['time', seq_nr_name]]
     merged_df = pd.merge(tx_df, rx_df, on=seq_nr_name,
                          how='left', indicator=True)
-    merged_df['tx'] = pd.to_datetime(merged_df['time_x'])
-    merged_df['second'] = merged_df['tx'].dt.floor('s')
+    # floor to the second of the absolute time
+    merged_df['second'] = (parsers.to_ns(merged_df['time_x']) // 1_000_000_000 *
+                           1_000_000_000 - start_time.value) / 1e9
     merged_df['lost'] = merged_df['_merge'] == 'left_only'
     merged_df = merged_df.groupby('second').agg(
         sent=(seq_nr_name, 'count'),
         lost=('lost', 'sum')
     )
 
-    merged_df['second'] = (merged_df.index - start_time).total_seconds()
-    merged_df.set_index('second', inplace=True)
-
     ax.plot(merged_df.index, merged_df['lost'], linewidth=DEFAULT_LINE_WIDTH)
     ax.set_xlabel('Time')
     ax.set_ylabel('Lost packets')
@@ -617,18 +612,18 @@ def _plot_loss_count(ax, start_time, rtp_tx_df, rtp_rx_df, seq_nr_name):
 
 
 def plot_rtp_owd_pcap(ax, start_time, rtp_tx_df, rtp_rx_df):
-    rtp_tx_latency_df = rtp_tx_df.copy()
-    rtp_rx_latency_df = rtp_rx_df.copy()
-    rtp_tx_latency_df['ts'] = rtp_tx_df.index
-    rtp_rx_latency_df['ts'] = rtp_rx_df.index
+    rtp_tx_latency_df = _frame(rtp_tx_df, ['extseq']).copy()
+    rtp_rx_latency_df = _frame(rtp_rx_df, ['extseq']).copy()
+    rtp_tx_latency_df['ts'] = rtp_tx_latency_df.index
+    rtp_rx_latency_df['ts'] = rtp_rx_latency_df.index
     return _plot_owd(ax, start_time, rtp_tx_latency_df, rtp_rx_latency_df, 'extseq', label='Media')
 
 
 def get_rtp_owd_pcap_df(start_time, rtp_tx_df, rtp_rx_df):
-    rtp_tx_latency_df = rtp_tx_df.copy()
-    rtp_rx_latency_df = rtp_rx_df.copy()
-    rtp_tx_latency_df['ts'] = rtp_tx_df.index
-    rtp_rx_latency_df['ts'] = rtp_rx_df.index
+    rtp_tx_latency_df = _frame(rtp_tx_df, ['extseq']).copy()
+    rtp_rx_latency_df = _frame(rtp_rx_df, ['extseq']).copy()
+    rtp_tx_latency_df['ts'] = rtp_tx_latency_df.index
+    rtp_rx_latency_df['ts'] = rtp_rx_latency_df.index
     return _merge_owd(start_time, rtp_tx_latency_df, rtp_rx_latency_df, 'extseq')
 
 
@@ -640,11 +635,63 @@ def plot_rtp_owd_pcap_cdf(ax, start_time, rtp_tx_df, rtp_rx_df):
     return True
 
 
+def plot_ecdf_grid(ax, x, p, label=None):
+    """plots an ECDF stored as quantiles x at probabilities p (see stats.ecdf_grid)"""
+    x = np.asarray(x)
+    p = np.asarray(p)
+    # of grid points with the same x only the last one changes the steps
+    keep = np.ones(len(x), dtype=bool)
+    keep[1:-1] = x[1:-1] != x[2:]
+    line, = ax.plot(x[keep], p[keep], drawstyle='steps-post', label=label)
+    # like Axes.ecdf, no margins beyond 0 and 1
+    line.sticky_edges.y[:] = [0, 1]
+    return line
+
+
+def plot_box_stats(ax, boxes):
+    """draws box stats (see stats.box_stats, with a label each) like
+    Axes.bxp without fliers, but as two line collections for all boxes"""
+    n = len(boxes)
+    positions = np.arange(1, n + 1)
+    width = np.clip(0.15 * max(n - 1, 1), 0.15, 0.5)
+    stat = {name: np.array([box[name] for box in boxes], dtype='float64')
+            for name in ['q1', 'med', 'q3', 'whislo', 'whishi']}
+    left = positions - width / 2
+    right = positions + width / 2
+    cap_left = positions - width / 4
+    cap_right = positions + width / 4
+
+    def segments(x0, y0, x1, y1):
+        return np.stack([np.stack([x0, y0], axis=-1), np.stack([x1, y1], axis=-1)], axis=1)
+
+    lines = np.concatenate([
+        # box outline
+        segments(left, stat['q1'], right, stat['q1']),
+        segments(right, stat['q1'], right, stat['q3']),
+        segments(right, stat['q3'], left, stat['q3']),
+        segments(left, stat['q3'], left, stat['q1']),
+        # whiskers and caps
+        segments(positions, stat['q1'], positions, stat['whislo']),
+        segments(positions, stat['q3'], positions, stat['whishi']),
+        segments(cap_left, stat['whislo'], cap_right, stat['whislo']),
+        segments(cap_left, stat['whishi'], cap_right, stat['whishi']),
+    ])
+    ax.add_collection(LineCollection(lines, colors='black', linewidths=1))
+    medians = LineCollection(segments(left, stat['med'], right, stat['med']),
+                             colors='C1', linewidths=1)
+    ax.add_collection(medians)
+    ax.autoscale_view()
+
+    ax.set_xlim(0.5, n + 0.5)
+    ax.set_xticks(positions, [box.get('label') for box in boxes])
+    return True
+
+
 def plot_dtls_owd(ax, start_time, dtls_tx_df, dtls_rx_df, config_df):
     sender_ip, receiver_ip = _get_ips_from_config(config_df)
 
-    dtls_tx_latency_df = dtls_tx_df[dtls_tx_df['src'] == sender_ip].copy()
-    dtls_rx_latency_df = dtls_rx_df[dtls_rx_df['dst'] == receiver_ip].copy()
+    dtls_tx_latency_df = _events(dtls_tx_df, sender_ip, 'src')
+    dtls_rx_latency_df = _events(dtls_rx_df, receiver_ip, 'dst')
     dtls_tx_latency_df['ts'] = dtls_tx_latency_df.index
     dtls_rx_latency_df['ts'] = dtls_rx_latency_df.index
 
@@ -654,8 +701,8 @@ def plot_dtls_owd(ax, start_time, dtls_tx_df, dtls_rx_df, config_df):
 def plot_dtls_loss(ax, start_time, dtls_tx_df, dtls_rx_df, config_df):
     sender_ip, receiver_ip = _get_ips_from_config(config_df)
 
-    dtls_tx_latency_df = dtls_tx_df[dtls_tx_df['src'] == sender_ip].copy()
-    dtls_rx_latency_df = dtls_rx_df[dtls_rx_df['dst'] == receiver_ip].copy()
+    dtls_tx_latency_df = _events(dtls_tx_df, sender_ip, 'src')
+    dtls_rx_latency_df = _events(dtls_rx_df, receiver_ip, 'dst')
 
     return _plot_rtp_loss_rate(ax, start_time, dtls_tx_latency_df, dtls_rx_latency_df, 'seq')
 
@@ -664,13 +711,13 @@ def _plot_dlts_send_rate(ax, start_time, sender_ip, dtls_tx_df, name='tx'):
     if dtls_tx_df.empty:
         return False, pd.DataFrame()
 
-    dtls_tx_df = dtls_tx_df[dtls_tx_df['src'] == sender_ip].copy()
+    dtls_tx_df = _events(dtls_tx_df, sender_ip, 'src')
     dtls_tx_df['rate'] = dtls_tx_df['length'] * 8
     return _plot_rate(ax, start_time, dtls_tx_df, name)
 
 
 def _plot_dlts_recv_rate(ax, start_time, receiver_ip, dtls_rx_df, name='rx'):
-    dtls_rx_df = dtls_rx_df[dtls_rx_df['dst'] == receiver_ip].copy()
+    dtls_rx_df = _events(dtls_rx_df, receiver_ip, 'dst')
     dtls_rx_df['rate'] = dtls_rx_df['length'] * 8
     return _plot_rate(ax, start_time, dtls_rx_df, name)
 
@@ -689,10 +736,8 @@ def plot_dtls_rates(ax, start_time, cap_df, tx_df, dtls_tx_df, dtls_rx_df, confi
 
 
 def plot_qlog_owd(ax, start_time, qlog_tx_df, qlog_rx_df):
-    quic_tx_latency_df = qlog_tx_df[qlog_tx_df['name']
-                                    == 'transport:packet_sent'].copy()
-    quic_rx_latency_df = qlog_rx_df[qlog_rx_df['name']
-                                    == 'transport:packet_received'].copy()
+    quic_tx_latency_df = _events(qlog_tx_df, 'transport:packet_sent', 'name')
+    quic_rx_latency_df = _events(qlog_rx_df, 'transport:packet_received', 'name')
 
     if quic_tx_latency_df.empty or quic_rx_latency_df.empty:
         return False
@@ -703,10 +748,8 @@ def plot_qlog_owd(ax, start_time, qlog_tx_df, qlog_rx_df):
 
 
 def get_qlog_owd_df(start_time, qlog_tx_df, qlog_rx_df):
-    quic_tx_latency_df = qlog_tx_df[qlog_tx_df['name']
-                                    == 'transport:packet_sent'].copy()
-    quic_rx_latency_df = qlog_rx_df[qlog_rx_df['name']
-                                    == 'transport:packet_received'].copy()
+    quic_tx_latency_df = _events(qlog_tx_df, 'transport:packet_sent', 'name')
+    quic_rx_latency_df = _events(qlog_rx_df, 'transport:packet_received', 'name')
 
     if quic_tx_latency_df.empty or quic_rx_latency_df.empty:
         return False, pd.DataFrame()
@@ -728,168 +771,113 @@ def plot_qlog_owd_cdf(ax, start_time, qlog_tx_df, qlog_rx_df):
     return True
 
 
-def plot_rtp_owd_log_udp(ax, start_time, rtp_tx_df, rtp_rx_df, pcap_tx_df, pcap_rx_df, config_df, stacked=True):
-    """ for udp and webrtc transport"""
-
-    tx_mapping = rtp_tx_df[rtp_tx_df['msg'] == 'rtp to pts mapping'].copy()
-    rx_mapping = rtp_rx_df[rtp_rx_df['msg'] == 'rtp to pts mapping'].copy()
+def get_rtp_owd_udp_stages(start_time, rtp_tx_df, rtp_rx_df, pcap_tx_df, pcap_rx_df, config_df):
+    """ per packet stage delays for udp and webrtc transport"""
+    tx_mapping = _events(rtp_tx_df, 'rtp to pts mapping')
+    rx_mapping = _events(rtp_rx_df, 'rtp to pts mapping')
     if tx_mapping.empty or rx_mapping.empty:
-        return False
+        return pd.DataFrame()
 
-    # tx: mapping-log <-> pcap -> sender stack delay
+    # mapping logs use unwrapped sequence numbers, pcaps start one cycle later
     tx_mapping['ts'] = tx_mapping['time']
     tx_mapping['extseq'] = tx_mapping['unwrapped-sequence-number'].astype(
-        'int64')
-    tx_mapping['extseq'] = tx_mapping['extseq'] + 65536
+        'int64') + 65536
+    rx_mapping['ts'] = rx_mapping['time']
+    rx_mapping['extseq'] = rx_mapping['unwrapped-sequence-number'].astype(
+        'int64') + 65536
 
     sender_ip, receiver_ip = _get_ips_from_config(config_df)
 
-    tx_pcap = pcap_tx_df[pcap_tx_df['src'] == sender_ip].copy()
+    tx_pcap = _events(pcap_tx_df, sender_ip, 'src')
     tx_pcap['ts'] = tx_pcap.index
-
-    send_stack_delay = _merge_owd(start_time, tx_mapping,
-                                  tx_pcap, 'extseq')
-    send_stack_delay['send_stack_delay'] = send_stack_delay['latency']
-
-    # rx: pcap <-> mapping-log -> receiver stack delay
-    rx_mapping['ts'] = rx_mapping['time']
-    rx_mapping['extseq'] = rx_mapping['unwrapped-sequence-number'].astype(
-        'int64')
-    rx_mapping['extseq'] = rx_mapping['extseq'] + 65536
-
-    rx_pcap = pcap_rx_df[pcap_rx_df['dst'] == receiver_ip].copy()
+    rx_pcap = _events(pcap_rx_df, receiver_ip, 'dst')
     rx_pcap['ts'] = rx_pcap.index
 
-    recv_stack_delay = _merge_owd(start_time, rx_pcap, rx_mapping,
-                                  'extseq')
-    recv_stack_delay['recv_stack_delay'] = recv_stack_delay['latency']
-
-    print("len recv delay: ", len(recv_stack_delay))
-
-    # tx pcaps -> rx pcaps -> network delay
-    network_delay = _merge_owd(start_time, tx_pcap, rx_pcap, 'extseq')
-    network_delay['network_delay'] = network_delay['latency']
-
-    # combine all delays
-
-    # Set extseq as index before joining
-    send_stack_delay = send_stack_delay.reset_index().set_index('extseq')
-    recv_stack_delay = recv_stack_delay.reset_index().set_index('extseq')
-    network_delay = network_delay.reset_index().set_index('extseq')
-
-    combined_df = send_stack_delay.join(
-        recv_stack_delay, how='inner', lsuffix='', rsuffix='_recv')
-    combined_df = combined_df.join(
-        network_delay, how='inner', lsuffix='', rsuffix='_network')
-
-    if stacked:
-        ax.stackplot(combined_df['second'],
-                     combined_df['send_stack_delay'],
-                     combined_df['network_delay'],
-                     combined_df['recv_stack_delay'],
-                     labels=['send stack', 'network', 'recv stack'],
-                     alpha=0.7)
-    else:
-        combined_df['total_latency'] = (combined_df['send_stack_delay'] +
-                                        combined_df['network_delay'] +
-                                        combined_df['recv_stack_delay'])
-        ax.plot(combined_df['second'], combined_df['total_latency'],
-                label='latency', linewidth=DEFAULT_LINE_WIDTH)
-
-    ax.legend()
-
-    _plot_owd_settings(ax)
-    return True
+    # mapping-log -> tx pcap -> rx pcap -> mapping-log
+    return get_stage_delays(start_time, [tx_mapping, tx_pcap, rx_pcap, rx_mapping],
+                            ['send stack', 'network', 'recv stack'], 'extseq')
 
 
-def plot_rtp_owd_log_udp_overall(ax, start_time, rtp_tx_df, rtp_rx_df, pcap_tx_df, pcap_rx_df, config_df):
-    return plot_rtp_owd_log_udp(ax, start_time, rtp_tx_df, rtp_rx_df,
-                                pcap_tx_df, pcap_rx_df, config_df, stacked=False)
-
-
-def plot_rtp_owd_log_roq(ax, start_time, rtp_tx_df, rtp_rx_df, quic_tx_df, stacked=True):
-    """ for roq transport. quic_tx_df not used but makes sure it is only called for roq transport"""
-
-    tx_mapping = rtp_tx_df[rtp_tx_df['msg'] == 'rtp to pts mapping'].copy()
+def get_rtp_owd_roq_stages(start_time, rtp_tx_df, rtp_rx_df):
+    """ per packet stage delays for roq transport"""
+    tx_mapping = _events(rtp_tx_df, 'rtp to pts mapping')
     if tx_mapping.empty:
-        return False
+        return pd.DataFrame()
     if 'flow-id' in tx_mapping.columns:
         flow_ids = tx_mapping['flow-id'].unique()
         if len(flow_ids) > 1:
-            return False
+            return pd.DataFrame()
 
-    rtp_tx_log = rtp_tx_df[rtp_tx_df['msg'] == 'rtp packet'].copy()
-    rtp_rx_log = rtp_rx_df[rtp_rx_df['msg'] == 'rtp packet'].copy()
-    rx_mapping = rtp_rx_df[rtp_rx_df['msg'] == 'rtp to pts mapping'].copy()
+    rtp_tx_log = _events(rtp_tx_df, 'rtp packet')
+    rtp_rx_log = _events(rtp_rx_df, 'rtp packet')
+    rx_mapping = _events(rtp_rx_df, 'rtp to pts mapping')
 
-    if tx_mapping.empty or rtp_tx_log.empty or rtp_rx_log.empty or rx_mapping.empty:
-        return False
+    if rtp_tx_log.empty or rtp_rx_log.empty or rx_mapping.empty:
+        return pd.DataFrame()
 
-    tx_mapping['ts'] = tx_mapping['time']
-    tx_mapping['extseq'] = tx_mapping['unwrapped-sequence-number'].astype(
-        'int64')
+    for df, seq_nr_name in [(tx_mapping, 'unwrapped-sequence-number'),
+                            (rtp_tx_log, 'rtp-packet.sequence-number'),
+                            (rtp_rx_log, 'rtp-packet.sequence-number'),
+                            (rx_mapping, 'unwrapped-sequence-number')]:
+        df['ts'] = df['time']
+        df['extseq'] = df[seq_nr_name].astype('int64')
 
-    rtp_tx_log['ts'] = rtp_tx_log['time']
-    rtp_tx_log['extseq'] = rtp_tx_log['rtp-packet.sequence-number'].astype(
-        'int64')
+    # mapping-log -> rtp log -> rtp log -> mapping-log
+    return get_stage_delays(start_time, [tx_mapping, rtp_tx_log, rtp_rx_log, rx_mapping],
+                            ['send stack', 'quic stack + network', 'recv stack'], 'extseq')
 
-    rx_mapping['ts'] = rx_mapping['time']
-    rx_mapping['extseq'] = rx_mapping['unwrapped-sequence-number'].astype(
-        'int64')
 
-    rtp_rx_log['ts'] = rtp_rx_log['time']
-    rtp_rx_log['extseq'] = rtp_rx_log['rtp-packet.sequence-number'].astype(
-        'int64')
+def get_stage_delays(start_time, points, stages, seq_nr_name):
+    """joins an ordered list of observation points into per packet stage delays
 
-    quic_stack_network = _merge_owd(start_time, rtp_tx_log,
-                                    rtp_rx_log, 'extseq')
-    quic_stack_network['net_quic_delay'] = quic_stack_network['latency']
+    Each point needs a 'ts' column and the sequence number column. The result
+    has one row per packet seen at every point, indexed by the seconds of the
+    first observation, with one delay column (in seconds) per stage."""
+    if any(df.empty for df in points):
+        return pd.DataFrame()
 
-    recv_stack_delay = _merge_owd(start_time, rtp_rx_log, rx_mapping,
-                                  'extseq')
-    recv_stack_delay['recv_stack_delay'] = recv_stack_delay['latency']
+    # single multi-way join on the sequence number
+    timestamps = pd.concat(
+        [pd.Series(parsers.to_ns(df['ts']), index=df[seq_nr_name]).groupby(level=0).first()
+         for df in points], axis=1, join='inner', ignore_index=True)
 
-    send_stack_delay = _merge_owd(start_time, tx_mapping,
-                                  rtp_tx_log, 'extseq')
-    send_stack_delay['send_stack_delay'] = send_stack_delay['latency']
+    df = pd.DataFrame(index=timestamps.index)
+    for i, stage in enumerate(stages):
+        df[stage] = (timestamps[i + 1] - timestamps[i]) / 1e9
+    df = df.reset_index(names=seq_nr_name)
+    df['second'] = (timestamps[0].to_numpy() - start_time.value) / 1e9
+    return df.set_index('second').sort_index()
 
-    send_stack_delay = send_stack_delay.reset_index().set_index('extseq')
-    recv_stack_delay = recv_stack_delay.reset_index().set_index('extseq')
-    quic_stack_network = quic_stack_network.reset_index().set_index('extseq')
 
-    combined_df = quic_stack_network.join(
-        recv_stack_delay, how='inner', lsuffix='', rsuffix='_recv')
-    combined_df = combined_df.join(
-        send_stack_delay, how='inner', lsuffix='_send', rsuffix='')
+def plot_rtp_owd_stages(ax, start_time, stages_df, stacked=True):
+    """plots stage delays created by get_stage_delays"""
+    if stages_df.empty:
+        return False
+    stages_df = _frame(stages_df)
 
+    stages = [column for column in stages_df.columns if column != 'extseq']
     if stacked:
-        ax.stackplot(combined_df['second'],
-                     combined_df['send_stack_delay'],
-                     combined_df['net_quic_delay'],
-                     combined_df['recv_stack_delay'],
-                     labels=['send stack', 'quic stack + network', 'recv stack'],
-                     alpha=0.7)
+        render.stackplot(ax, stages_df.index,
+                         *[stages_df[stage] for stage in stages],
+                         labels=stages,
+                         alpha=0.7)
     else:
-        combined_df['total_latency'] = (combined_df['send_stack_delay'] +
-                                        combined_df['net_quic_delay'] +
-                                        combined_df['recv_stack_delay'])
-        ax.plot(combined_df['second'], combined_df['total_latency'],
-                label='latency', linewidth=DEFAULT_LINE_WIDTH)
+        render.plot_line(ax, stages_df.index, stages_df[stages].sum(axis=1),
+                         label='latency', linewidth=DEFAULT_LINE_WIDTH)
 
     ax.legend()
     _plot_owd_settings(ax)
     return True
 
 
-def plot_rtp_owd_log_roq_overall(ax, start_time, rtp_tx_df, rtp_rx_df, quic_tx_df):
-    return plot_rtp_owd_log_roq(ax, start_time, rtp_tx_df,
-                                rtp_rx_df, quic_tx_df, stacked=False)
+def plot_rtp_owd_stages_overall(ax, start_time, stages_df):
+    return plot_rtp_owd_stages(ax, start_time, stages_df, stacked=False)
 
 
 def _merge_owd(start_time, rtp_tx_latency_df, rtp_rx_latency_df, seq_nr_name):
     merged_df = rtp_tx_latency_df.merge(rtp_rx_latency_df, on=seq_nr_name)
-    merged_df['latency'] = (merged_df['ts_y'] - merged_df['ts_x']) / \
-        datetime.timedelta(milliseconds=1) / 1000.0
+    merged_df['latency'] = (parsers.to_ns(merged_df['ts_y']) -
+                            parsers.to_ns(merged_df['ts_x'])) / 1e9
     df = set_start_time_index(merged_df, start_time, 'ts_x')
     return df
 
@@ -899,7 +887,22 @@ def _plot_owd(ax, start_time, rtp_tx_latency_df, rtp_rx_latency_df, seq_nr_name,
         return False
     df = _merge_owd(start_time, rtp_tx_latency_df,
                     rtp_rx_latency_df, seq_nr_name)
-    ax.plot(df.index, df['latency'], label=label, linewidth=DEFAULT_LINE_WIDTH, linestyle='-')
+    render.plot_line(ax, df.index, df['latency'], label=label,
+                     linewidth=DEFAULT_LINE_WIDTH, linestyle='-')
+    _plot_owd_settings(ax)
+    return True
+
+
+def plot_owd_quantiles(ax, start_time, quantiles_df):
+    """plots sliding window OWD quantiles created by stats.sliding_quantiles"""
+    if quantiles_df.empty:
+        return False
+    df = _frame(quantiles_df)
+
+    for column in [c for c in df.columns if c != 'count']:
+        ax.plot(df.index, df[column], label=column,
+                linewidth=DEFAULT_LINE_WIDTH)
+    ax.legend(loc='upper right')
     _plot_owd_settings(ax)
     return True
 
@@ -915,7 +918,7 @@ def _plot_owd_settings(ax):
 
 
 def plot_scream_queue_delay(ax, start_time, df):
-    df = df[df['msg'] == 'SCReAM stats'].copy()
+    df = _events(df, 'SCReAM stats')
     if df.empty:
         return False
     df = set_start_time_index(df, start_time, 'time')
@@ -938,7 +941,7 @@ def plot_scream_queue_delay(ax, start_time, df):
 
 
 def plot_scream_cwnd(ax, start_time, df):
-    df = df[df['msg'] == 'SCReAM stats'].copy()
+    df = _events(df, 'SCReAM stats')
     if df.empty:
         return False
     df = set_start_time_index(df, start_time, 'time')
@@ -955,7 +958,7 @@ def plot_scream_cwnd(ax, start_time, df):
 
 
 def plot_gcc_rtt(ax, start_time, df):
-    df = df[df['msg'] == 'pion-trace-log'].copy()
+    df = _events(df, 'pion-trace-log')
     if df.empty:
         return False
     if not 'rtt' in df.columns:
@@ -974,7 +977,7 @@ def plot_gcc_rtt(ax, start_time, df):
 
 
 def plot_gcc_target_rates(ax, start_time, df):
-    df = df[df['msg'] == 'pion-trace-log'].copy()
+    df = _events(df, 'pion-trace-log')
     if df.empty:
         return False
     if 'loss-target' not in df.columns or 'delay-target' not in df.columns:
@@ -996,7 +999,7 @@ def plot_gcc_target_rates(ax, start_time, df):
 
 
 def plot_gcc_estimates(ax, start_time, df):
-    df = df[df['msg'] == 'pion-trace-log'].copy()
+    df = _events(df, 'pion-trace-log')
     if df.empty:
         return False
     if 'estimate' not in df.columns:
@@ -1023,7 +1026,7 @@ def plot_gcc_estimates(ax, start_time, df):
 
 
 def plot_gcc_usage_and_state(ax, start_time, df):
-    df = df[df['msg'] == 'pion-trace-log'].copy()
+    df = _events(df, 'pion-trace-log')
     if df.empty:
         return False
     if 'usage' not in df.columns or 'state' not in df.columns:
@@ -1048,7 +1051,7 @@ def plot_sctp_stats(ax, start_time, df):
     if df.empty:
         return False
 
-    df = df[df['msg'] == 'pion-sctp-cwnd'].copy()
+    df = _events(df, 'pion-sctp-cwnd')
     if df.empty:
         return False
 
@@ -1064,8 +1067,8 @@ def plot_sctp_stats(ax, start_time, df):
 
 
 def plot_encoding_frame_size(ax, start_time, df):
-    encoding = df[df['msg'] == 'encoding frame']
-    encoded = df[df['msg'] == 'encoded frame']
+    encoding = _events(df, 'encoding frame')
+    encoded = _events(df, 'encoded frame')
     if encoding.empty and encoded.empty:
         return False
     _plot_frame_sizes(ax, encoding, 'raw', encoded, 'encoded')
@@ -1073,8 +1076,8 @@ def plot_encoding_frame_size(ax, start_time, df):
 
 
 def plot_decoding_frame_size(ax, start_time, df):
-    decoding = df[df['msg'] == 'decoding frame']
-    decoded = df[df['msg'] == 'decoded frame']
+    decoding = _events(df, 'decoding frame')
+    decoded = _events(df, 'decoded frame')
     if decoding.empty and decoded.empty:
         return False
     _plot_frame_sizes(ax, decoding, 'encoded', decoded, 'raw')
@@ -1091,8 +1094,8 @@ def _plot_frame_sizes(ax, df_a, label_a, df_b, label_b):
 
 
 def plot_encoding_time(ax, start_time, df):
-    encoding = df[df['msg'] == 'encoding frame']
-    encoded = df[df['msg'] == 'encoded frame']
+    encoding = _events(df, 'encoding frame')
+    encoded = _events(df, 'encoded frame')
     if encoding.empty and encoded.empty:
         return False
     _plot_encoding_time(ax, encoding, encoded)
@@ -1100,8 +1103,8 @@ def plot_encoding_time(ax, start_time, df):
 
 
 def plot_decoding_time(ax, start_time, df):
-    decoding = df[df['msg'] == 'decoding frame']
-    decoded = df[df['msg'] == 'decoded frame']
+    decoding = _events(df, 'decoding frame')
+    decoded = _events(df, 'decoded frame')
     if decoding.empty and decoded.empty:
         return False
     _plot_encoding_time(ax, decoding, decoded)
@@ -1112,51 +1115,55 @@ def _plot_encoding_time(ax, df_a, df_b):
     df_a = df_a.reset_index()
     df_b = df_b.reset_index()
     df = pd.merge(df_a, df_b, left_index=True, right_index=True)
-    df['latency'] = (pd.to_datetime(df['time_y'])-pd.to_datetime(df['time_x'])) / \
-        datetime.timedelta(milliseconds=1) / 1000.0
+    df['latency'] = (parsers.to_ns(df['time_y']) -
+                     parsers.to_ns(df['time_x'])) / 1e9
     ax.bar(df.index, df['latency'], label='Encoding latency')
     ax.yaxis.set_major_formatter(mticker.EngFormatter(unit='s'))
     ax.legend(loc='upper right')
 
 
 def plot_e2e_latency(ax, start_time, encoding_df, decoding_df):
-    encoding = encoding_df[encoding_df['msg']
-                           == 'encoding frame'].reset_index()
-    decoding = decoding_df[decoding_df['msg']
-                           == 'decoded frame'].reset_index()
+    encoding = _events(encoding_df, 'encoding frame').reset_index()
+    decoding = _events(decoding_df, 'decoded frame').reset_index()
     if encoding.empty and decoding.empty:
         return False
     df = pd.merge(encoding, decoding, left_index=True, right_index=True)
-    df['latency'] = (pd.to_datetime(df['time_y'])-pd.to_datetime(df['time_x'])) / \
-        datetime.timedelta(milliseconds=1) / 1000.0
+    df['latency'] = (parsers.to_ns(df['time_y']) -
+                     parsers.to_ns(df['time_x'])) / 1e9
     ax.bar(df.index, df['latency'], label='E2E Latency')
     ax.yaxis.set_major_formatter(mticker.EngFormatter(unit='s'))
     ax.legend(loc='upper right')
     return True
 
 
-def plot_frame_latency(ax, start_time, tx_df, rx_df):
-    try:
-        tx_merged = video_quality.map_frames_sender_pipeline(tx_df)
-        rx_merged = video_quality.map_frames_receiver_pipeline(rx_df)
-    except (KeyError, ValueError):
-        return False
+def get_frame_latency_df(start_time, frames_df):
+    """latency from encoder sink to decoder src of each received frame"""
+    df = _events(frames_df, 'received', 'status')
+    if df.empty:
+        return df
 
-    merged_df = tx_merged.merge(
-        rx_merged, on='rtp-timestamp_mapping', suffixes=('_tx', '_rx'))
+    df['latency'] = (parsers.to_ns(df['time_decoder_src']) -
+                     parsers.to_ns(df['time_encoder_sink'])) / 1e9
+    return set_start_time_index(df, start_time, 'time_encoder_sink')
 
-    # group on time_ori and time_frame_rx and aggregate
-    grouped_df = merged_df.groupby(['time_ori', 'time_frame_rx']).agg(
-        frames_count=('rtp-timestamp_mapping', 'count')
-    ).reset_index()
 
-    grouped_df['latency'] = (
-        pd.to_datetime(grouped_df['time_frame_rx']) - pd.to_datetime(grouped_df['time_ori'])) / \
-        datetime.timedelta(milliseconds=1) / 1000.0
+def plot_frame_latency(ax, start_time, frames_df):
+    """plots latency from encoder sink to decoder src of each received frame"""
+    return plot_frame_latency_df(ax, get_frame_latency_df(start_time, frames_df))
 
-    df = set_start_time_index(grouped_df, start_time, 'time_ori')
-    ax.plot(df.index, df['latency'], label='Latency',
-            linewidth=DEFAULT_LINE_WIDTH)
+
+def plot_frame_latency_df(ax, df):
+    """plots frame latencies of get_frame_latency_df"""
+    if df.empty:
+        return False
+
+    render.plot_line(ax, df.index, df['latency'], label='Latency',
+                     linewidth=DEFAULT_LINE_WIDTH)
+    _frame_latency_ax_config(ax)
+    return True
+
+
+def _frame_latency_ax_config(ax):
     # ax.set_ylim(bottom=0, top=0.5)
     ax.set_xlabel('Time')
     ax.set_ylabel('Latency (ms)')
@@ -1168,6 +1175,7 @@ def plot_frame_latency(ax, start_time, tx_df, rx_df):
 
 
 def plot_video_quality(ax, start_time, qm_df):
+    qm_df = _frame(qm_df)
     ax_psnr = ax
     ax_ssim = ax_psnr.twinx()
 
@@ -1192,7 +1200,8 @@ def plot_video_quality(ax, start_time, qm_df):
 
 
 def plot_video_quality_psnr_cdf(ax, _, qm_df):
-    ax.ecdf(qm_df["psnr_avg"], label="psnr avg")
+    qm_df = _frame(qm_df, ['psnr_avg'])
+    plot_ecdf_grid(ax, *stats.ecdf_grid(qm_df["psnr_avg"]), label="psnr avg")
     ax.set_xlabel("PSNR")
     ax.set_ylabel("CDF")
     ax.set_ylim([0, 1])
@@ -1201,7 +1210,8 @@ def plot_video_quality_psnr_cdf(ax, _, qm_df):
 
 
 def plot_video_quality_ssim_cdf(ax, _, qm_df):
-    ax.ecdf(qm_df["ssim_avg"], label="ssim avg")
+    qm_df = _frame(qm_df, ['ssim_avg'])
+    plot_ecdf_grid(ax, *stats.ecdf_grid(qm_df["ssim_avg"]), label="ssim avg")
     ax.set_xlabel("SSIM")
     ax.set_ylabel("CDF")
     ax.set_ylim([0, 1])
@@ -1210,7 +1220,7 @@ def plot_video_quality_ssim_cdf(ax, _, qm_df):
 
 
 def plot_video_rate(ax, start_time, rx_df):
-    rx_data = rx_df[rx_df['msg'] == 'encoder src'].copy()
+    rx_data = _events(rx_df, 'encoder src')
     if rx_data.empty:
         return False
 
@@ -1219,7 +1229,7 @@ def plot_video_rate(ax, start_time, rx_df):
         if len(flow_ids) > 1:
             # Plot each flow separately
             for flow_id in flow_ids:
-                flow_data = rx_data[rx_data['flow-id'] == flow_id].copy()
+                flow_data = _events(rx_data, flow_id, 'flow-id')
                 flow_data['rate'] = flow_data['length'] * 8
                 _plot_data_rate(ax, start_time, flow_data,
                                 f'video rate flow {int(flow_id)}')
@@ -1235,7 +1245,7 @@ def plot_video_rate(ax, start_time, rx_df):
 
 
 def plot_frame_size_dist(ax, start_time, tx_df):
-    rx_data = tx_df[tx_df['msg'] == 'encoder src'].copy()
+    rx_data = _events(tx_df, 'encoder src')
     if rx_data.empty:
         return False
 
@@ -1262,14 +1272,17 @@ def plot_frame_size_dist(ax, start_time, tx_df):
 
 
 def plot_frame_size(ax, start_time, tx_df):
-    rx_data = tx_df[tx_df['msg'] == 'encoder src'].copy()
+    rx_data = _events(tx_df, 'encoder src')
     if rx_data.empty:
         return False
 
     rx_data = set_start_time_index(rx_data, start_time, 'time')
 
-    ax.scatter(rx_data.index, rx_data['length'],
-               label='Frame Size', s=8, marker='.')
+    if render.DENSITY:
+        render.density(ax, [(rx_data.index, rx_data['length'])], ['Frame Size'])
+    else:
+        ax.scatter(rx_data.index, rx_data['length'],
+                   label='Frame Size', s=8, marker='.')
 
     ax.set_xlabel('Time')
     ax.set_ylabel('Size')
@@ -1294,8 +1307,8 @@ def plot_frame_size_and_tr(axs, start_time, cap_df, tx_df, rx_df):
 
 
 def plot_file_completion(axs, start_time, tx_df, rx_df):
-    tx_df = tx_df[tx_df['msg'] == 'DataSrc Chunk started']
-    rx_df = rx_df[rx_df['msg'] == 'DataSink Chunk finished']
+    tx_df = _events(tx_df, 'DataSrc Chunk started')
+    rx_df = _events(rx_df, 'DataSink Chunk finished')
 
     if tx_df.empty or rx_df.empty:
         return False
@@ -1306,9 +1319,9 @@ def plot_file_completion(axs, start_time, tx_df, rx_df):
         return False
 
     merged_df['completion_time'] = (
-        pd.to_datetime(merged_df['time_finish']) -
-        pd.to_datetime(merged_df['time_start'])
-    ) / datetime.timedelta(seconds=1)
+        parsers.to_ns(merged_df['time_finish']) -
+        parsers.to_ns(merged_df['time_start'])
+    ) / 1e9
 
     avg_completion_time = merged_df['completion_time'].mean()
     axs.axhline(y=avg_completion_time, color='red', linestyle='--', linewidth=1,
@@ -0,0 +1,206 @@
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+
+import matplotlib
+import matplotlib.colors
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+# resolution and format of saved figures
+DPI = 300
+FORMAT = 'png'
+
+# --preview: quick low resolution figures for browsing results
+PREVIEW_DPI = 100
+
+# encoder settings for lossy formats
+_SAVE_KWARGS = {
+    'png': {},
+    'webp': {'pil_kwargs': {'quality': 80}},
+    'jpg': {'pil_kwargs': {'quality': 85}},
+}
+
+# line plots with more points than DECIMATE_FACTOR times the axes width in
+# pixels are reduced to the first, last, min and max point of each pixel column
+DECIMATE = True
+DECIMATE_FACTOR = 10
+
+# draw dense scatter and comparison plots as 2D histogram image with bins of
+# DENSITY_BIN x DENSITY_BIN output pixels
+DENSITY = False
+DENSITY_BIN = 4
+
+
+def use_preview():
+    """lower resolution, always decimate and let Agg simplify and chunk long paths"""
+    global DPI, DECIMATE
+    DPI = PREVIEW_DPI
+    DECIMATE = True
+    matplotlib.rcParams.update({
+        'path.simplify': True,
+        'path.simplify_threshold': 1.0,
+        'agg.path.chunksize': 10000,
+    })
+
+
+@contextmanager
+def figure(nrows=1, ncols=1, figsize=(8, 3), dpi=None, **kwargs):
+    """figure with its own Agg canvas instead of pyplot's global figure
+    manager. Nothing references it after the block, also on exceptions, and
+    figures in different threads do not share state."""
+    fig = Figure(figsize=figsize, dpi=dpi)
+    FigureCanvasAgg(fig)
+    try:
+        yield fig, fig.subplots(nrows=nrows, ncols=ncols, **kwargs)
+    finally:
+        fig.clear()
+
+
+def save(fig, path, **kwargs):
+    """saves fig with the configured resolution and format. The file name
+    stays the same except for the suffix."""
+    path = Path(path).with_suffix(f'.{FORMAT}')
+    fig.savefig(path, dpi=DPI, format=FORMAT, **_SAVE_KWARGS[FORMAT], **kwargs)
+    return path
+
+
+def _pixel_width(ax):
+    fig = ax.get_figure()
+    return max(1, int(ax.get_position().width * fig.get_figwidth() * DPI))
+
+
+def decimate_indices(x, y, buckets):
+    """indices of the first, last, min and max point in each of buckets equal
+    width x intervals (M4). x has to be sorted."""
+    x = np.asarray(x, dtype='float64')
+    y = np.asarray(y, dtype='float64')
+    if len(x) == 0 or x[-1] <= x[0]:
+        return np.arange(len(x))
+
+    bins = ((x - x[0]) / (x[-1] - x[0]) * buckets).astype('int64')
+    bins = np.minimum(bins, buckets - 1)
+
+    starts = np.flatnonzero(np.diff(bins)) + 1
+    firsts = np.concatenate(([0], starts))
+    lasts = np.concatenate((starts - 1, [len(x) - 1]))
+
+    # sorted by bucket and y => min is first and max is last row of each bucket
+    order = np.lexsort((y, bins))
+    mins = order[firsts]
+    maxs = order[lasts]
+
+    return np.unique(np.concatenate((firsts, lasts, mins, maxs)))
+
+
+def _keep(ax, x, y):
+    """indices to draw (in ascending order of x) or None if all points
+    should be drawn"""
+    if not DECIMATE:
+        return None
+    buckets = _pixel_width(ax)
+    if len(x) <= DECIMATE_FACTOR * buckets:
+        return None
+    x = np.asarray(x, dtype='float64')
+    y = np.asarray(y, dtype='float64')
+    # points without x are dropped, unsorted x (e.g. pcap timestamps merged
+    # on extseq) are sorted first
+    order = np.flatnonzero(~np.isnan(x))
+    order = order[np.argsort(x[order], kind='stable')]
+    return order[decimate_indices(x[order], y[order], buckets)]
+
+
+def plot_line(ax, x, y, **kwargs):
+    """ax.plot that decimates series with far more points than pixels"""
+    keep = _keep(ax, x, y)
+    if keep is not None:
+        x = np.asarray(x)[keep]
+        y = np.asarray(y)[keep]
+    return ax.plot(x, y, **kwargs)
+
+
+def stackplot(ax, x, *ys, **kwargs):
+    """ax.stackplot that decimates all series on the points of their sum"""
+    keep = _keep(ax, x, np.sum(ys, axis=0))
+    if keep is not None:
+        x = np.asarray(x)[keep]
+        ys = [np.asarray(y)[keep] for y in ys]
+    return ax.stackplot(x, *ys, **kwargs)
+
+
+def _bin_size(ax):
+    fig = ax.get_figure()
+    position = ax.get_position()
+    return (max(1, int(position.width * fig.get_figwidth() * DPI / DENSITY_BIN)),
+            max(1, int(position.height * fig.get_figheight() * DPI / DENSITY_BIN)))
+
+
+def histogram(x, y, extent, width, height):
+    """counts of the points in each of width x height bins over extent (x0, x1, y0, y1)"""
+    x = np.asarray(x, dtype='float64')
+    y = np.asarray(y, dtype='float64')
+    x0, x1, y0, y1 = extent
+    valid = np.isfinite(x) & np.isfinite(y)
+    ix = ((x[valid] - x0) / max(x1 - x0, 1e-12) * width).astype('int64')
+    iy = ((y[valid] - y0) / max(y1 - y0, 1e-12) * height).astype('int64')
+    ix = np.clip(ix, 0, width - 1)
+    iy = np.clip(iy, 0, height - 1)
+    counts = np.bincount(iy * width + ix, minlength=width * height)
+    return counts.reshape(height, width)
+
+
+def _extent(series):
+    xs = [np.asarray(x, dtype='float64') for x, _ in series if len(x)]
+    ys = [np.asarray(y, dtype='float64') for _, y in series if len(y)]
+    if not xs:
+        return None
+    x0 = min(np.nanmin(x) for x in xs)
+    x1 = max(np.nanmax(x) for x in xs)
+    y0 = min(0, min(np.nanmin(y) for y in ys))
+    y1 = max(np.nanmax(y) for y in ys)
+    return (x0, x1 if x1 > x0 else x0 + 1, y0, y1 if y1 > y0 else y0 + 1)
+
+
+def density(ax, series, labels, colors=None, workers=None):
+    """draws the points of each (x, y) series as 2D histogram sized to the
+    pixels of ax. All series are composited into one image, each in its
+    own color with opacity growing with the log of the count. Empty lines are
+    added as legend handles. workers > 1 bins the series in parallel."""
+    extent = _extent(series)
+    if extent is None:
+        return False
+    width, height = _bin_size(ax)
+
+    def _bin(s):
+        return histogram(s[0], s[1], extent, width, height)
+
+    if workers is not None and workers > 1 and len(series) > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            counts = list(executor.map(_bin, series))
+    else:
+        counts = [_bin(s) for s in series]
+
+    if colors is None:
+        colors = matplotlib.rcParams['axes.prop_cycle'].by_key()['color']
+
+    image = np.zeros((height, width, 4))
+    for i, (count, label) in enumerate(zip(counts, labels)):
+        color = colors[i % len(colors)]
+        if count.max() > 0:
+            # visible for single points, opaque at the densest bin
+            alpha = np.where(count > 0, 0.3 + 0.7 *
+                             np.log1p(count) / np.log1p(count.max()), 0)
+            rgb = np.array(matplotlib.colors.to_rgb(color))
+            image[..., :3] = (rgb * alpha[..., None] +
+                              image[..., :3] * (1 - alpha[..., None]))
+            image[..., 3] = alpha + image[..., 3] * (1 - alpha)
+        ax.plot([], [], color=color, label=label)
+
+    # colors are premultiplied with alpha while compositing
+    rgb = np.divide(image[..., :3], image[..., 3:], out=np.zeros_like(image[..., :3]),
+                    where=image[..., 3:] > 0)
+    image[..., :3] = rgb
+    ax.imshow(image, extent=extent, origin='lower', aspect='auto',
+              interpolation='nearest')
+    return True
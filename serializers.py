@@ -1,13 +1,96 @@
 import pyarrow as pa
+import pyarrow.compute as pc
 import pyarrow.feather as feather
 
+# event and address columns are stored dictionary encoded, so selecting
+# events compares small integer indices instead of strings
+DICTIONARY_COLUMNS = ('msg', 'name', 'src', 'dst', 'status', 'metric', 'stat')
 
-def read_feather(file):
+# number of rows read from feather files by this process
+rows_read = 0
+
+
+class LogTable:
+    """Parsed log kept as Arrow table. Selections are filtered with Arrow
+    compute kernels and only the selected rows are converted to pandas."""
+
+    def __init__(self, table):
+        self.table = table
+
+    @property
+    def empty(self):
+        return self.table.num_rows == 0
+
+    @property
+    def columns(self):
+        return self.table.column_names
+
+    def __len__(self):
+        return self.table.num_rows
+
+    def select(self, column, value, columns=None):
+        """rows where column == value as pandas DataFrame"""
+        if column not in self.table.column_names:
+            raise KeyError(column)
+        mask = _equal(self.table[column], value)
+        return _to_pandas(self._project(columns).filter(mask))
+
+    def to_pandas(self, columns=None):
+        return _to_pandas(self._project(columns))
+
+    def _project(self, columns):
+        if columns is None:
+            return self.table
+        # keep the index columns (e.g. pcap time), pandas needs them to restore the index
+        index_columns = [c for c in _index_columns(self.table)
+                         if c not in columns]
+        return self.table.select(list(columns) + index_columns)
+
+
+def _index_columns(table):
+    metadata = table.schema.pandas_metadata or {}
+    return [c for c in metadata.get('index_columns', []) if isinstance(c, str)]
+
+
+def _equal(column, value):
+    if not pa.types.is_dictionary(column.type):
+        return pc.equal(column, value)
+
+    # index is -1 if the value is not in a chunk's dictionary => no match
+    masks = [pc.fill_null(pc.equal(chunk.indices, chunk.dictionary.index(value)), False)
+             for chunk in column.chunks]
+    return pa.chunked_array(masks, type=pa.bool_())
+
+
+def _to_pandas(table):
+    # decode dictionaries, so pandas gets the same dtypes as before encoding
+    for i, field in enumerate(table.schema):
+        if pa.types.is_dictionary(field.type):
+            table = table.set_column(
+                i, field.name, table.column(i).cast(field.type.value_type))
+    return table.to_pandas()
+
+
+def _dictionary_encode(table):
+    for i, field in enumerate(table.schema):
+        if field.name in DICTIONARY_COLUMNS and (pa.types.is_string(field.type) or
+                                                 pa.types.is_large_string(field.type)):
+            table = table.set_column(
+                i, field.name, pc.dictionary_encode(table.column(i)))
+    return table
+
+
+def read_table(file):
+    global rows_read
     table = pa.ipc.open_file(file).read_all()
-    df = table.to_pandas()
-    return df
+    rows_read += table.num_rows
+    return LogTable(table)
+
+
+def read_feather(file):
+    return read_table(file).to_pandas()
 
 
 def write_feather(df, file):
-    table = pa.Table.from_pandas(df)
+    table = _dictionary_encode(pa.Table.from_pandas(df))
     feather.write_feather(table, file)
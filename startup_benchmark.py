@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+"""Measures the startup time of each main.py sub-command.
+
+Each command is started with a nonexistent input, so it fails right after
+its handler imported its dependencies. The median wall time of several runs
+is printed together with the number of loaded modules. Any other failure
+(e.g. an import or syntax error) fails the benchmark, as do commands slower
+than --max-seconds or than --tolerance times their time in --baseline."""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+MAIN = Path(__file__).parent / Path('main.py')
+
+# runs main with the given arguments and reports the modules loaded until exit
+RUNNER = '''
+import atexit, sys
+atexit.register(lambda: print(len(sys.modules), file=sys.stderr))
+sys.argv = sys.argv[1:]
+sys.path.insert(0, {dir!r})
+import runpy
+runpy.run_path(sys.argv[0], run_name='__main__')
+'''
+
+
+def _commands(tmp):
+    missing = str(Path(tmp) / Path('missing'))
+    return {
+        'parse': ['parse', '-i', missing, '-o', tmp],
+        'parse-all': ['parse-all', '-i', missing, '-o', tmp],
+        'derive': ['derive', '-i', missing],
+        'plot': ['plot', '-i', missing, '-o', tmp],
+        'plot-combis': ['plot-combis', '-i', missing, '-o', tmp],
+        'video-quality': ['video-quality', '-r', missing, '-i', missing, '-o', tmp],
+        'generate': ['generate', '-i', missing],
+        'catalog': ['catalog', '-i', missing],
+    }
+
+
+# error of the commands for the nonexistent input
+EXPECTED_ERROR = 'FileNotFoundError'
+
+
+def _run(args, cwd):
+    """(wall time, loaded modules, error) of one run, error is None if the
+    command succeeded or failed with EXPECTED_ERROR"""
+    runner = RUNNER.format(dir=str(MAIN.parent))
+    start = time.perf_counter()
+    r = subprocess.run([sys.executable, '-c', runner, str(MAIN), *args],
+                       cwd=cwd, capture_output=True, text=True)
+    wall = time.perf_counter() - start
+    lines = r.stderr.strip().splitlines()
+    modules = int(lines[-1]) if lines and lines[-1].isdigit() else None
+    if modules is not None:
+        lines = lines[:-1]
+    error = None
+    if r.returncode != 0 and not any(line.startswith(EXPECTED_ERROR) for line in lines):
+        error = lines[-1] if lines else f'exit status {r.returncode}'
+    return wall, modules, error
+
+
+def _check(name, wall, args, baseline):
+    """reasons why the time of the command is a regression"""
+    reasons = []
+    if args.max_seconds is not None and wall > args.max_seconds:
+        reasons.append(f'slower than {args.max_seconds:.3f}s')
+    if name in baseline and wall > args.tolerance * baseline[name]:
+        reasons.append(f'slower than {args.tolerance:g} x {baseline[name]:.3f}s baseline')
+    return reasons
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-n', '--runs', type=int, default=5,
+                        help='runs per sub-command')
+    parser.add_argument('--max-seconds', type=float,
+                        help='fail if a sub-command takes longer')
+    parser.add_argument('--baseline',
+                        help='json file of earlier times (see --save) to compare with')
+    parser.add_argument('--tolerance', type=float, default=1.5,
+                        help='fail if a sub-command takes longer than this factor '
+                        'times its baseline time')
+    parser.add_argument('--save', help='write the times as json file')
+    parser.add_argument('commands', nargs='*',
+                        help='sub-commands to measure (default: all)')
+    args = parser.parse_args()
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    times = {}
+    failures = []
+    with tempfile.TemporaryDirectory() as tmp:
+        commands = _commands(tmp)
+        commands['--help'] = ['--help']
+        names = ['--help'] + (args.commands or list(commands)[:-1])
+
+        for name in names:
+            runs = [_run(commands[name], tmp) for _ in range(args.runs)]
+            wall = statistics.median(r[0] for r in runs)
+            modules = runs[-1][1] if runs[-1][1] is not None else '?'
+            errors = [r[2] for r in runs if r[2] is not None]
+            reasons = [f'failed: {errors[0]}'] if errors else _check(name, wall, args, baseline)
+            times[name] = wall
+            print(f'{name:<16}{wall:8.3f}s {modules:>6} modules'
+                  + ''.join(f'  {reason}' for reason in reasons))
+            if reasons:
+                failures.append(name)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(times, f, indent=2)
+    if failures:
+        print(f'regressions: {", ".join(failures)}')
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,317 @@
+import numpy as np
+import pandas as pd
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+# resolution of stored ECDFs
+ECDF_POINTS = 1001
+
+
+def quantile_columns(quantiles):
+    """column names of quantiles, e.g. 0.95 -> p95"""
+    return [f'p{q * 100:g}' for q in quantiles]
+
+
+def _finite(values):
+    values = np.asarray(values, dtype='float64')
+    return values[np.isfinite(values)]
+
+
+def ecdf_grid(values, points=ECDF_POINTS):
+    """ECDF on a fixed grid of probabilities: returns (x, p) with x the
+    nearest rank quantile at each of the points probabilities in [0, 1].
+    The ranks are selected with one np.partition instead of sorting."""
+    values = _finite(values)
+    p = np.linspace(0, 1, points)
+    if len(values) == 0:
+        return np.full(points, np.nan), p
+    # nearest rank as numpy's 'inverted_cdf'
+    ranks = np.clip(np.ceil(len(values) * p).astype('int64') - 1, 0, len(values) - 1)
+    kth = np.unique(ranks)
+    return np.partition(values, kth)[ranks], p
+
+
+def box_stats(values, whis=1.5):
+    """box and whisker statistics as computed by matplotlib's boxplot, without
+    fliers. Quartiles are selected with one np.partition."""
+    values = _finite(values)
+    if len(values) == 0:
+        return None
+    # linear interpolation between the neighboring ranks as np.percentile
+    positions = (len(values) - 1) * np.array([0.25, 0.5, 0.75])
+    low = np.floor(positions).astype('int64')
+    high = np.minimum(low + 1, len(values) - 1)
+    part = np.partition(values, np.unique(np.concatenate((low, high))))
+    q1, med, q3 = part[low] + (part[high] - part[low]) * (positions - low)
+
+    iqr = q3 - q1
+    whislo = values.min(where=values >= q1 - whis * iqr, initial=np.inf)
+    whishi = values.max(where=values <= q3 + whis * iqr, initial=-np.inf)
+    return {
+        'mean': values.mean(),
+        'med': med,
+        'q1': q1,
+        'q3': q3,
+        # like matplotlib, whiskers do not reach into the box
+        'whislo': min(whislo, q1),
+        'whishi': max(whishi, q3),
+    }
+
+
+# resamples and confidence level of bootstrap confidence intervals
+BOOTSTRAP_SAMPLES = 10000
+CONFIDENCE = 0.95
+
+
+def bootstrap_ci(values, samples=BOOTSTRAP_SAMPLES, confidence=CONFIDENCE, seed=0):
+    """mean and percentile bootstrap confidence interval of the mean of values
+    (n samples, one column per statistic). All columns are resampled with the
+    same (samples, n) index matrix. Returns (mean, low, high) arrays."""
+    values = np.asarray(values, dtype='float64')
+    if values.ndim == 1:
+        values = values[:, None]
+    values = values[np.isfinite(values).all(axis=1)]
+    if len(values) == 0:
+        nan = np.full(values.shape[1], np.nan)
+        return nan, nan, nan
+
+    rng = np.random.default_rng(seed)
+    idx = rng.integers(0, len(values), size=(samples, len(values)))
+    means = values[idx].mean(axis=1)
+    alpha = (1 - confidence) / 2
+    low, high = np.quantile(means, [alpha, 1 - alpha], axis=0)
+    return values.mean(axis=0), low, high
+
+
+def bootstrap_merged_ci(counts, sums, buckets, values, quantiles=QUANTILES,
+                        samples=BOOTSTRAP_SAMPLES, confidence=CONFIDENCE, seed=0):
+    """pooled mean and quantiles of n cases and their percentile bootstrap
+    confidence intervals. The cases are resampled (same (samples, n) index
+    matrix as bootstrap_ci) and merged as sketches: counts and sums are the
+    per case sample counts and sums, buckets the (n, buckets) counts of the
+    sketch buckets with the ascending values. Quantiles have rank
+    q * (count - 1) as DDSketch.quantile. Returns (estimate, low, high)
+    arrays of the mean followed by the quantiles."""
+    counts = np.asarray(counts, dtype='float64')
+    sums = np.asarray(sums, dtype='float64')
+    buckets = np.asarray(buckets, dtype='float64').reshape(len(counts), -1)
+    values = np.asarray(values, dtype='float64')
+    q = np.asarray(quantiles, dtype='float64')
+
+    def pooled(weights):
+        total = weights @ counts
+        result = np.full((len(weights), 1 + len(q)), np.nan)
+        result[:, 0] = (weights @ sums) / total
+        if len(values):
+            cumulative = np.cumsum(weights @ buckets, axis=1)
+            for i, quantile in enumerate(q):
+                rank = quantile * (total - 1)
+                idx = (cumulative <= rank[:, None]).sum(axis=1)
+                result[:, 1 + i] = values[np.minimum(idx, len(values) - 1)]
+        return result
+
+    n = len(counts)
+    if n == 0:
+        nan = np.full(1 + len(q), np.nan)
+        return nan, nan, nan
+    estimate = pooled(np.ones((1, n)))[0]
+
+    rng = np.random.default_rng(seed)
+    idx = rng.integers(0, n, size=(samples, n))
+    # times each case is drawn per resample, merged in chunks to bound memory
+    weights = np.zeros((samples, n))
+    np.add.at(weights, (np.arange(samples)[:, None], idx), 1)
+    chunk = max(1, 10_000_000 // max(1, buckets.shape[1]))
+    resampled = np.concatenate([pooled(weights[i:i + chunk])
+                                for i in range(0, samples, chunk)])
+    alpha = (1 - confidence) / 2
+    low, high = np.quantile(resampled, [alpha, 1 - alpha], axis=0)
+    return estimate, low, high
+
+
+class RankTree:
+    """Fenwick tree counting which of n ranks are present. Inserting, removing
+    and finding the k-th smallest present rank take O(log n), all operations
+    work on arrays of ranks at once."""
+
+    def __init__(self, n):
+        self.n = n
+        self.tree = np.zeros(n + 1, dtype='int64')
+        self.top = 1 << (n.bit_length() - 1) if n > 0 else 0
+
+    def add(self, ranks, delta):
+        idx = np.asarray(ranks, dtype='int64') + 1
+        while len(idx):
+            np.add.at(self.tree, idx, delta)
+            idx = idx + (idx & -idx)
+            idx = idx[idx <= self.n]
+
+    def kth(self, ks):
+        """0 based ranks of the ks-th (1 based) smallest present ranks"""
+        rem = np.asarray(ks, dtype='int64').copy()
+        pos = np.zeros(len(rem), dtype='int64')
+        bit = self.top
+        while bit:
+            nxt = pos + bit
+            counts = self.tree[np.minimum(nxt, self.n)]
+            take = (nxt <= self.n) & (counts < rem)
+            pos = np.where(take, nxt, pos)
+            rem = np.where(take, rem - counts, rem)
+            bit >>= 1
+        return pos
+
+
+def sliding_quantiles(seconds, values, window=1.0, step=None, quantiles=QUANTILES):
+    """quantiles of values in time windows (end - window, end] with ends every
+    step seconds (default: window). Quantiles are nearest rank (numpy's
+    'inverted_cdf'). The window is updated incrementally in a RankTree over
+    the value ranks instead of sorting each window."""
+    step = window if step is None else step
+    seconds = np.asarray(seconds, dtype='float64')
+    values = np.asarray(values, dtype='float64')
+    valid = np.isfinite(seconds) & np.isfinite(values)
+    seconds = seconds[valid]
+    values = values[valid]
+
+    columns = ['count'] + quantile_columns(quantiles)
+    if len(values) == 0:
+        return pd.DataFrame(columns=columns, index=pd.Index([], name='second'))
+
+    order = np.argsort(seconds, kind='stable')
+    seconds = seconds[order]
+    values = values[order]
+
+    by_value = np.argsort(values, kind='stable')
+    sorted_values = values[by_value]
+    ranks = np.empty(len(values), dtype='int64')
+    ranks[by_value] = np.arange(len(values))
+
+    first_end = (np.floor(seconds[0] / step) + 1) * step
+    ends = np.arange(first_end, seconds[-1] + step, step)
+    his = np.searchsorted(seconds, ends, side='right')
+    los = np.searchsorted(seconds, ends - window, side='right')
+
+    tree = RankTree(len(values))
+    result = np.full((len(ends), len(quantiles)), np.nan)
+    q = np.asarray(quantiles, dtype='float64')
+    lo = hi = 0
+    for i in range(len(ends)):
+        if his[i] > hi:
+            tree.add(ranks[hi:his[i]], 1)
+            hi = his[i]
+        if los[i] > lo:
+            tree.add(ranks[lo:los[i]], -1)
+            lo = los[i]
+        count = hi - lo
+        if count > 0:
+            ks = np.maximum(np.ceil(q * count - 1e-9), 1)
+            result[i] = sorted_values[tree.kth(ks)]
+
+    df = pd.DataFrame(result, columns=columns[1:],
+                      index=pd.Index(ends, name='second'))
+    df.insert(0, 'count', his - los)
+    return df
+
+
+# relative accuracy of sketches, quantiles are within this relative error
+SKETCH_ACCURACY = 0.01
+
+
+def _add_counts(counts, offset, keys, weights=None):
+    """adds keys to the dense bucket counts starting at key offset, grows counts as needed"""
+    if len(keys) == 0:
+        return counts, offset
+    low = min(int(keys.min()), offset if len(counts) else int(keys.min()))
+    high = max(int(keys.max()), offset + len(counts) - 1)
+    grown = np.zeros(high - low + 1, dtype='float64')
+    grown[offset - low:offset - low + len(counts)] = counts
+    grown += np.bincount(keys - low, weights=weights, minlength=len(grown))
+    return grown, low
+
+
+class DDSketch:
+    """Quantile sketch with relative accuracy (DDSketch). Values are counted in
+    logarithmic buckets, so sketches of different cases can be merged by adding
+    their bucket counts and quantiles of the merged data stay within the
+    relative accuracy. Count, sum and mean are exact."""
+
+    def __init__(self, relative_accuracy=None):
+        self.relative_accuracy = (SKETCH_ACCURACY if relative_accuracy is None
+                                  else relative_accuracy)
+        self.gamma = (1 + self.relative_accuracy) / (1 - self.relative_accuracy)
+        self.min_value = 1e-9
+        self.pos, self.pos_offset = np.zeros(0), 0
+        self.neg, self.neg_offset = np.zeros(0), 0
+        self.zero_count = 0.0
+        self.count = 0
+        self.sum = 0.0
+
+    @classmethod
+    def from_values(cls, values, relative_accuracy=None):
+        sketch = cls(relative_accuracy)
+        sketch.add(values)
+        return sketch
+
+    def _keys(self, values):
+        return np.ceil(np.log(values) / np.log(self.gamma)).astype('int64')
+
+    def _value(self, keys):
+        return 2 * self.gamma ** keys / (self.gamma + 1)
+
+    def add(self, values):
+        values = np.asarray(values, dtype='float64')
+        values = values[np.isfinite(values)]
+        pos = values[values > self.min_value]
+        neg = -values[values < -self.min_value]
+        self.pos, self.pos_offset = _add_counts(
+            self.pos, self.pos_offset, self._keys(pos))
+        self.neg, self.neg_offset = _add_counts(
+            self.neg, self.neg_offset, self._keys(neg))
+        self.zero_count += len(values) - len(pos) - len(neg)
+        self.count += len(values)
+        self.sum += float(values.sum())
+        return self
+
+    def buckets(self):
+        """(positive keys, counts, negative keys, counts, zero count)"""
+        return (np.arange(self.pos_offset, self.pos_offset + len(self.pos)), self.pos,
+                np.arange(self.neg_offset, self.neg_offset + len(self.neg)), self.neg,
+                self.zero_count)
+
+    def add_buckets(self, pos_keys, pos_counts, neg_keys, neg_counts, zero_count=0):
+        """adds bucket counts, count and sum have to be updated by the caller"""
+        self.pos, self.pos_offset = _add_counts(
+            self.pos, self.pos_offset, np.asarray(pos_keys, dtype='int64'), pos_counts)
+        self.neg, self.neg_offset = _add_counts(
+            self.neg, self.neg_offset, np.asarray(neg_keys, dtype='int64'), neg_counts)
+        self.zero_count += zero_count
+        return self
+
+    def merge(self, other):
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError('can only merge sketches with the same relative accuracy')
+        self.add_buckets(*other.buckets())
+        self.count += other.count
+        self.sum += other.sum
+        return self
+
+    @property
+    def mean(self):
+        return self.sum / self.count if self.count else np.nan
+
+    def quantile(self, q):
+        """values at quantiles q (scalar or array) with rank q * (count - 1)"""
+        q = np.asarray(q, dtype='float64')
+        if self.count == 0:
+            return np.full(q.shape, np.nan)
+
+        # buckets in ascending order of their values
+        neg_keys = np.arange(self.neg_offset, self.neg_offset + len(self.neg))[::-1]
+        pos_keys = np.arange(self.pos_offset, self.pos_offset + len(self.pos))
+        values = np.concatenate(
+            (-self._value(neg_keys), [0.0], self._value(pos_keys)))
+        counts = np.concatenate((self.neg[::-1], [self.zero_count], self.pos))
+
+        cumulative = np.cumsum(counts)
+        idx = np.searchsorted(cumulative, q * (self.count - 1), side='right')
+        return values[np.minimum(idx, len(values) - 1)]
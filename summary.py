@@ -0,0 +1,246 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import serializers
+import stats
+
+SUMMARY_FILE = 'summary.feather'
+
+COLUMNS = ['metric', 'stat', 'x', 'value']
+
+BOX_STATS = ['mean', 'med', 'q1', 'q3', 'whislo', 'whishi']
+
+
+def _rows(metric, stat, x, value):
+    value = np.atleast_1d(np.asarray(value, dtype='float64'))
+    x = np.broadcast_to(np.asarray(x, dtype='float64'), value.shape)
+    return pd.DataFrame({'metric': metric, 'stat': stat, 'x': x, 'value': value})
+
+
+def summarize(metric, values, relative_accuracy=None):
+    """rows of the summary for the samples of one metric: count, sum, min,
+    max, box stats, an ECDF with stats.ECDF_POINTS points and a DDSketch"""
+    values = np.asarray(values, dtype='float64')
+    values = values[np.isfinite(values)]
+    if len(values) == 0:
+        return pd.DataFrame(columns=COLUMNS)
+
+    box = stats.box_stats(values)
+    ecdf_x, ecdf_p = stats.ecdf_grid(values)
+    sketch = stats.DDSketch.from_values(values, relative_accuracy)
+    pos_keys, pos_counts, neg_keys, neg_counts, zero_count = sketch.buckets()
+    pos = pos_counts > 0
+    neg = neg_counts > 0
+
+    return pd.concat([
+        _rows(metric, 'count', np.nan, len(values)),
+        _rows(metric, 'sum', np.nan, values.sum()),
+        _rows(metric, 'min', np.nan, values.min()),
+        _rows(metric, 'max', np.nan, values.max()),
+        *[_rows(metric, name, np.nan, box[name]) for name in BOX_STATS],
+        _rows(metric, 'ecdf', ecdf_p, ecdf_x),
+        _rows(metric, 'sketch_accuracy', np.nan, sketch.relative_accuracy),
+        _rows(metric, 'sketch_pos', pos_keys[pos], pos_counts[pos]),
+        _rows(metric, 'sketch_neg', neg_keys[neg], neg_counts[neg]),
+        _rows(metric, 'sketch_zero', np.nan, zero_count),
+    ], ignore_index=True)
+
+
+def summarize_loss(metric, sent, received):
+    return pd.concat([
+        _rows(metric, 'sent', np.nan, sent),
+        _rows(metric, 'received', np.nan, received),
+        _rows(metric, 'rate', np.nan, 1 - received / sent if sent else np.nan),
+    ], ignore_index=True)
+
+
+class Summary:
+    """Per test case summary (see summarize), a long table of
+    (metric, stat, x, value) rows"""
+
+    def __init__(self, df):
+        self.df = df
+        self._groups = {key: group for key, group in df.groupby(
+            ['metric', 'stat'], sort=False, observed=True)}
+
+    @classmethod
+    def read(cls, dir):
+        return cls(serializers.read_feather(Path(dir) / Path(SUMMARY_FILE)))
+
+    def has(self, metric):
+        return (metric, 'count') in self._groups or (metric, 'sent') in self._groups
+
+    def rows(self, metric, stat):
+        group = self._groups.get((metric, stat))
+        if group is None:
+            return pd.DataFrame(columns=COLUMNS)
+        return group
+
+    def stat(self, metric, stat):
+        rows = self.rows(metric, stat)
+        return rows['value'].iloc[0] if len(rows) else np.nan
+
+    def ecdf(self, metric):
+        """(x, p) of the stored ECDF"""
+        rows = self.rows(metric, 'ecdf')
+        return rows['value'].to_numpy(), rows['x'].to_numpy()
+
+    def box_stats(self, metric, label=None):
+        """box stats in the format of matplotlib's Axes.bxp"""
+        if not self.has(metric):
+            return None
+        box = {name: self.stat(metric, name) for name in BOX_STATS}
+        box['label'] = label
+        box['fliers'] = []
+        return box
+
+    def sketch(self, metric):
+        if not self.has(metric):
+            return None
+        sketch = stats.DDSketch(self.stat(metric, 'sketch_accuracy'))
+        pos = self.rows(metric, 'sketch_pos')
+        neg = self.rows(metric, 'sketch_neg')
+        sketch.add_buckets(pos['x'].to_numpy(), pos['value'].to_numpy(),
+                           neg['x'].to_numpy(), neg['value'].to_numpy(),
+                           self.stat(metric, 'sketch_zero'))
+        sketch.count = int(self.stat(metric, 'count'))
+        sketch.sum = self.stat(metric, 'sum')
+        return sketch
+
+
+def tidy(summaries, keys):
+    """summaries of several cases as one long table, keys holds a dict of key
+    values per summary (e.g. iteration, testcase, link) that are added as
+    categorical columns"""
+    if not summaries:
+        return pd.DataFrame(columns=COLUMNS)
+    df = pd.concat([s.df for s in summaries], ignore_index=True)
+    lengths = [len(s.df) for s in summaries]
+    for name in keys[0]:
+        values = pd.Categorical([k[name] for k in keys])
+        df[name] = pd.Categorical.from_codes(
+            np.repeat(values.codes, lengths), values.categories)
+    return df
+
+
+def _bucket_values(buckets, accuracy):
+    """values of the sketch buckets (see stats.DDSketch) with the relative accuracy per row"""
+    gamma = (1 + accuracy) / (1 - accuracy)
+    values = 2 * gamma ** buckets['x'].to_numpy() / (gamma + 1)
+    stat = buckets['stat'].to_numpy()
+    values = np.where(stat == 'sketch_neg', -values, values)
+    return np.where(stat == 'sketch_zero', 0.0, values)
+
+
+def sketch_stats(df, by, quantiles=stats.QUANTILES):
+    """statistics per group of the by column and metric of a tidy table: number
+    of cases, count, exact mean and the quantiles of the merged sketches of the
+    cases. Equal to merging stats.DDSketch objects, in one groupby over all
+    buckets."""
+    keys = [by, 'metric']
+    stat = df['stat']
+
+    counts = df[stat == 'count'].groupby(keys, observed=True)['value'].agg(['size', 'sum'])
+    sums = df[stat == 'sum'].groupby(keys, observed=True)['value'].sum()
+    accuracy = df[stat == 'sketch_accuracy'].groupby(keys, observed=True)['value'].agg(['min', 'max'])
+    if (accuracy['min'] != accuracy['max']).any():
+        raise ValueError('can only merge sketches with the same relative accuracy')
+
+    result = pd.DataFrame({'cases': counts['size'], 'count': counts['sum']})
+    result['mean'] = sums / result['count']
+
+    # merged bucket counts in ascending order of their values per group
+    buckets = df[stat.isin(['sketch_pos', 'sketch_neg', 'sketch_zero'])]
+    buckets = buckets.join(accuracy['min'].rename('accuracy'), on=keys)
+    buckets = buckets.assign(bucket=_bucket_values(buckets, buckets['accuracy'].to_numpy()))
+    merged = buckets.groupby(keys + ['bucket'], observed=True)['value'].sum()
+    merged = merged[merged > 0]
+    if merged.empty:
+        for column in stats.quantile_columns(quantiles):
+            result[column] = np.nan
+        return result
+
+    group = merged.groupby(level=keys, observed=True).ngroup().to_numpy()
+    groups = merged.index.droplevel('bucket').unique()
+    starts = np.searchsorted(group, np.arange(len(groups)))
+    ends = np.searchsorted(group, np.arange(len(groups)), side='right')
+
+    # ranks are compared with the cumulative counts within each group
+    counts = merged.to_numpy()
+    cumulative = np.cumsum(counts)
+    local = cumulative - np.repeat(cumulative[starts] - counts[starts], ends - starts)
+    total = result['count'].reindex(groups).to_numpy()
+    values = merged.index.get_level_values('bucket').to_numpy()
+    positions = np.arange(len(merged))
+
+    for q, column in zip(quantiles, stats.quantile_columns(quantiles)):
+        rank = np.repeat(q * (total - 1), ends - starts)
+        first = np.where(local > rank, positions, len(merged))
+        idx = np.minimum(np.minimum.reduceat(first, starts), ends - 1)
+        result[column] = pd.Series(values[idx], index=groups)
+    return result
+
+
+def case_stats(df, by, quantiles=stats.QUANTILES):
+    """mean and nearest rank quantiles (read from the stored ECDFs) per case
+    and metric of a tidy table, cases are identified by the by columns.
+    Quantiles have to be points of the ECDF grid."""
+    grid = np.linspace(0, 1, stats.ECDF_POINTS)
+    off_grid = [q for q in quantiles if not np.isclose(grid, q, rtol=0, atol=1e-9).any()]
+    if off_grid:
+        raise ValueError(f'quantiles {off_grid} are not on the ECDF grid of '
+                         f'{stats.ECDF_POINTS} points')
+
+    keys = [*by, 'metric']
+    stat = df['stat']
+    count = df[stat == 'count'].set_index(keys)['value']
+    total = df[stat == 'sum'].set_index(keys)['value']
+    result = pd.DataFrame({'mean': total / count})
+
+    ecdf = df[stat == 'ecdf']
+    for q, column in zip(quantiles, stats.quantile_columns(quantiles)):
+        rows = ecdf[np.isclose(ecdf['x'], q, rtol=0, atol=1e-9)]
+        result[column] = rows.set_index(keys)['value']
+    return result
+
+
+def pooled_bootstrap(df, by, case, quantiles=stats.QUANTILES, samples=stats.BOOTSTRAP_SAMPLES,
+                     confidence=stats.CONFIDENCE, seed=0):
+    """pooled mean and quantiles per group of the by column and metric of a
+    tidy table (the statistics of sketch_stats) with bootstrap confidence
+    intervals over its cases, identified by the case column (see
+    stats.bootstrap_merged_ci). Returns one row per group and statistic
+    (mean, p50, ...) with estimate, ci_low, ci_high and cases."""
+    names = ['mean'] + stats.quantile_columns(quantiles)
+    rows = []
+    for (group, metric), part in df.groupby([by, 'metric'], observed=True):
+        stat = part['stat']
+        counts = part[stat == 'count'].set_index(case)['value']
+        if counts.empty:
+            # e.g. loss has no samples
+            continue
+        sums = part[stat == 'sum'].set_index(case)['value'].reindex(counts.index)
+        accuracy = part.loc[stat == 'sketch_accuracy', 'value'].unique()
+        if len(accuracy) > 1:
+            raise ValueError('can only merge sketches with the same relative accuracy')
+
+        cases = pd.Index(counts.index)
+        buckets = part[stat.isin(['sketch_pos', 'sketch_neg', 'sketch_zero'])]
+        buckets = buckets[buckets['value'] > 0]
+        values = (_bucket_values(buckets, accuracy[0]) if len(accuracy)
+                  else np.zeros(len(buckets)))
+        unique_values, columns = np.unique(values, return_inverse=True)
+        matrix = np.zeros((len(cases), len(unique_values)))
+        np.add.at(matrix, (cases.get_indexer(buckets[case]), columns), buckets['value'].to_numpy())
+
+        estimate, low, high = stats.bootstrap_merged_ci(
+            counts.to_numpy(), sums.to_numpy(), matrix, unique_values,
+            quantiles, samples, confidence, seed)
+        for i, name in enumerate(names):
+            rows.append({by: group, 'metric': metric, 'statistic': name,
+                         'estimate': estimate[i], 'ci_low': low[i], 'ci_high': high[i],
+                         'cases': len(cases)})
+    return pd.DataFrame(rows, columns=[by, 'metric', 'statistic', 'estimate',
+                                       'ci_low', 'ci_high', 'cases'])
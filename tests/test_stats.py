@@ -0,0 +1,108 @@
+import numpy as np
+import pytest
+
+import stats
+import summary
+
+
+def test_sliding_quantiles_match_percentile():
+    rng = np.random.default_rng(1)
+    seconds = np.sort(rng.uniform(0, 20, 5000))
+    values = rng.exponential(0.05, len(seconds))
+    quantiles = (0.1, 0.5, 0.95, 0.99)
+
+    df = stats.sliding_quantiles(seconds, values, window=1.0, step=0.25, quantiles=quantiles)
+
+    for end, row in df.iterrows():
+        in_window = values[(seconds > end - 1.0) & (seconds <= end)]
+        assert row['count'] == len(in_window)
+        if len(in_window) == 0:
+            assert row[stats.quantile_columns(quantiles)].isna().all()
+            continue
+        expected = np.percentile(in_window, np.array(quantiles) * 100, method='inverted_cdf')
+        np.testing.assert_array_equal(row[stats.quantile_columns(quantiles)].to_numpy(), expected)
+
+
+def test_sliding_quantiles_unsorted_and_invalid():
+    seconds = np.array([3.5, 0.5, np.nan, 1.5, 2.5])
+    values = np.array([4.0, 1.0, 9.0, np.nan, 3.0])
+    df = stats.sliding_quantiles(seconds, values, window=1.0, quantiles=(0.5,))
+    assert df.index.tolist() == [1.0, 2.0, 3.0, 4.0]
+    assert df['count'].tolist() == [1, 0, 1, 1]
+    np.testing.assert_array_equal(df['p50'].to_numpy(), [1.0, np.nan, 3.0, 4.0])
+
+
+def _tidy(cases):
+    summaries = [summary.Summary(summary.summarize(metric, values))
+                 for _, metric, values in cases]
+    keys = [{'testcase': testcase} for testcase, _, _ in cases]
+    return summary.tidy(summaries, keys)
+
+
+def test_sketch_stats_equal_merged_sketches():
+    rng = np.random.default_rng(2)
+    cases = [
+        ('a', 'owd', rng.exponential(0.05, 1000)),
+        ('a', 'owd', rng.exponential(0.08, 700)),
+        ('a', 'ssim', rng.uniform(0.5, 1, 300)),
+        ('b', 'owd', rng.normal(0, 0.02, 500)),
+        ('b', 'owd', np.zeros(20)),
+        ('b', 'ssim', rng.uniform(0.8, 1, 50)),
+    ]
+    quantiles = (0.01, 0.5, 0.95, 0.99)
+    result = summary.sketch_stats(_tidy(cases), 'testcase', quantiles=quantiles)
+
+    for (testcase, metric), row in result.iterrows():
+        parts = [values for t, m, values in cases if (t, m) == (testcase, metric)]
+        merged = stats.DDSketch()
+        for values in parts:
+            merged.merge(stats.DDSketch.from_values(values))
+        assert row['cases'] == len(parts)
+        assert row['count'] == merged.count
+        assert row['mean'] == pytest.approx(merged.mean)
+        np.testing.assert_array_equal(
+            row[stats.quantile_columns(quantiles)].to_numpy(dtype='float64'),
+            merged.quantile(np.array(quantiles)))
+    assert len(result) == 4
+
+
+def test_sketch_stats_rejects_mixed_accuracy():
+    df = summary.tidy(
+        [summary.Summary(summary.summarize('owd', [1.0, 2.0], 0.01)),
+         summary.Summary(summary.summarize('owd', [1.0, 2.0], 0.02))],
+        [{'testcase': 'a'}, {'testcase': 'a'}])
+    with pytest.raises(ValueError):
+        summary.sketch_stats(df, 'testcase')
+
+
+def test_pooled_bootstrap_estimates_equal_sketch_stats():
+    rng = np.random.default_rng(3)
+    cases = [
+        ('a', 'owd', rng.exponential(0.05, 1000)),
+        ('a', 'owd', rng.exponential(0.08, 700)),
+        ('a', 'owd', rng.exponential(0.06, 900)),
+        ('b', 'owd', rng.normal(0, 0.02, 500)),
+        ('b', 'owd', np.zeros(20)),
+    ]
+    summaries = [summary.Summary(summary.summarize(metric, values)) for _, metric, values in cases]
+    keys = [{'testcase': testcase, 'iteration': f'iter{i}'}
+            for i, (testcase, _, _) in enumerate(cases)]
+    df = summary.tidy(summaries, keys)
+
+    expected = summary.sketch_stats(df, 'testcase', quantiles=(0.5, 0.99))
+    cis = summary.pooled_bootstrap(df, 'testcase', 'iteration', quantiles=(0.5, 0.99),
+                                   samples=500)
+    assert len(cis) == 6
+    for _, row in cis.iterrows():
+        estimate = expected.loc[(row['testcase'], row['metric']), row['statistic']]
+        assert row['estimate'] == pytest.approx(estimate, rel=1e-12, abs=1e-15)
+        assert row['ci_low'] <= row['estimate'] <= row['ci_high']
+        assert row['cases'] == expected.loc[(row['testcase'], row['metric']), 'cases']
+
+
+def test_case_stats_rejects_quantiles_off_the_ecdf_grid():
+    df = summary.tidy([summary.Summary(summary.summarize('owd', np.arange(10.0)))],
+                      [{'testcase': 'a', 'iteration': 'iter1'}])
+    assert summary.case_stats(df, ['testcase', 'iteration'], quantiles=(0.5,))['p50'].notna().all()
+    with pytest.raises(ValueError):
+        summary.case_stats(df, ['testcase', 'iteration'], quantiles=(0.9995,))
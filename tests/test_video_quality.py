@@ -0,0 +1,87 @@
+import shutil
+import subprocess
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import video_quality
+import y4m
+
+ffmpeg_quality_metrics = pytest.importorskip('ffmpeg_quality_metrics')
+
+WIDTH = 32
+HEIGHT = 16
+FRAMES = 30
+LOST = [0, 3, 4, 10, 29]
+
+
+def _has_ffmpeg():
+    """ffmpeg with the two input scale filter (7.1 or newer) that
+    ffmpeg_quality_metrics and the streamed reference use"""
+    if shutil.which('ffmpeg') is None:
+        return False
+    r = subprocess.run(['ffmpeg', '-hide_banner', '-f', 'lavfi', '-i', 'color=s=16x16:d=0.04',
+                        '-f', 'lavfi', '-i', 'color=s=32x32:d=0.04',
+                        '-filter_complex', '[1][0]scale=rw:rh', '-f', 'null', '-'],
+                       capture_output=True)
+    return r.returncode == 0
+
+
+pytestmark = pytest.mark.skipif(not _has_ffmpeg(), reason='needs ffmpeg 7.1 or newer')
+
+
+def _write_y4m(path, frames):
+    with open(path, 'wb') as f:
+        f.write(f'YUV4MPEG2 W{WIDTH} H{HEIGHT} F30:1 Ip A1:1 C420jpeg\n'.encode())
+        for frame in frames:
+            f.write(b'FRAME\n' + frame.tobytes())
+
+
+@pytest.fixture
+def videos(tmp_path):
+    """reference and a noisy distorted video without the LOST frames"""
+    rng = np.random.default_rng(0)
+    size = WIDTH * HEIGHT * 3 // 2
+    ref = [rng.integers(0, 256, size, dtype='u1') for _ in range(FRAMES)]
+    dist = [np.clip(frame + rng.integers(-8, 9, size), 0, 255).astype('u1')
+            for i, frame in enumerate(ref) if i not in LOST]
+    _write_y4m(tmp_path / 'ref.y4m', ref)
+    _write_y4m(tmp_path / 'out.y4m', dist)
+    return tmp_path / 'ref.y4m', tmp_path / 'out.y4m'
+
+
+def _rows(csv_text):
+    """data rows by frame number n, without the input_file_ref column"""
+    lines = csv_text.split('\r\n')
+    assert lines[-1] == ''
+    return {line.split(',', 1)[0]: line.rsplit(',', 1)[0] for line in lines[:-1]}
+
+
+def test_streamed_reference_equals_copied_reference(videos, tmp_path):
+    ref_file, dist_file = videos
+    lost = pd.DataFrame({'frame_number': LOST})
+
+    copy = tmp_path / 'tmp_ref_file.y4m'
+    video_quality.remove_frames(ref_file, lost, copy, FRAMES)
+    qm = ffmpeg_quality_metrics.FfmpegQualityMetrics(
+        ref=str(copy), dist=str(dist_file), framerate=30.0)
+    qm.calculate()
+    expected = qm.get_results_csv()
+
+    with y4m.Y4MReader(ref_file) as ref:
+        ranges = video_quality.kept_ranges(ref, lost, FRAMES)
+        df = video_quality.stream_quality_metrics(
+            ref, ranges, dist_file, 30.0,
+            threads=qm.DEFAULT_THREADS, scaler=qm.DEFAULT_SCALER, progress=False)
+    streamed = video_quality.results_csv(df)
+
+    # where ffmpeg stops at the end of the shorter input varies between
+    # runs (also between two runs of the library), compared are the frames
+    # of both runs
+    expected_rows = _rows(expected)
+    streamed_rows = _rows(streamed)
+    common = expected_rows.keys() & streamed_rows.keys()
+    assert len(common) > 1
+    assert len(streamed_rows) <= FRAMES - len(LOST) + 1
+    assert {n: streamed_rows[n] for n in common} == {n: expected_rows[n] for n in common}
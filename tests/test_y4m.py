@@ -0,0 +1,95 @@
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import video_quality
+import y4m
+
+WIDTH = 16
+HEIGHT = 8
+FRAME_SIZE = WIDTH * HEIGHT * 3 // 2
+
+
+@pytest.fixture
+def ref_file(tmp_path):
+    """4:2:0 Y4M file with 30 frames, some FRAME lines carry tags"""
+    rng = np.random.default_rng(0)
+    path = tmp_path / 'ref.y4m'
+    with open(path, 'wb') as f:
+        f.write(f'YUV4MPEG2 W{WIDTH} H{HEIGHT} F30:1 Ip A1:1 C420jpeg\n'.encode())
+        for i in range(30):
+            f.write(b'FRAME Ixyz\n' if i % 4 == 0 else b'FRAME\n')
+            f.write(rng.integers(0, 256, FRAME_SIZE, dtype='u1').tobytes())
+    return path
+
+
+def _copy_frame_by_frame(ref_file, skip, num_frames):
+    """the reference without the skipped frames, copied frame by frame"""
+    out = []
+    with open(ref_file, 'rb') as f:
+        out.append(f.readline())
+        for i in range(num_frames):
+            line = f.readline()
+            if not line:
+                break
+            data = f.read(FRAME_SIZE)
+            if i not in skip:
+                out.append(line + data)
+    return b''.join(out)
+
+
+LOST = [0, 5, 6, 7, 13, 29]
+
+
+def test_remove_frames_equals_frame_by_frame_copy(ref_file, tmp_path):
+    out = tmp_path / 'out.y4m'
+    lost = pd.DataFrame({'frame_number': LOST})
+    video_quality.remove_frames(ref_file, lost, out, 25)
+    assert out.read_bytes() == _copy_frame_by_frame(ref_file, set(LOST), 25)
+
+
+def test_ranges_merge_adjacent_frames(ref_file):
+    with y4m.Y4MReader(ref_file) as ref:
+        assert len(ref) == 30
+        ranges = ref.ranges([1, 2, 3, 8, 10, 11])
+        assert len(ranges) == 3
+        assert ranges[0] == (ref.frame_range(1)[0], ref.frame_range(3)[1])
+        assert ref.ranges([]) == []
+
+
+def _copy_to_pipe(ref, ranges):
+    read_fd, write_fd = os.pipe()
+    chunks = []
+    reader = threading.Thread(target=lambda: chunks.extend(
+        iter(lambda: os.read(read_fd, 65536), b'')))
+    reader.start()
+    with os.fdopen(write_fd, 'wb') as pipe:
+        pipe.write(ref.header)
+        ref.copy_ranges(ranges, pipe)
+    reader.join()
+    os.close(read_fd)
+    return b''.join(chunks)
+
+
+def test_copy_ranges_to_pipe(ref_file):
+    expected = _copy_frame_by_frame(ref_file, set(LOST), 30)
+    with y4m.Y4MReader(ref_file) as ref:
+        kept = video_quality.kept_ranges(ref, pd.DataFrame({'frame_number': LOST}), 30)
+        # copy_file_range does not write to pipes, sendfile is used
+        assert _copy_to_pipe(ref, kept) == expected
+        assert _copy_to_pipe(ref, kept) == expected
+
+
+def test_copy_ranges_write_fallback(ref_file, monkeypatch):
+    def unsupported(*args):
+        raise OSError(22, 'Invalid argument')
+    monkeypatch.setattr(y4m, '_copy_file_range', unsupported)
+    monkeypatch.setattr(y4m, '_sendfile', unsupported)
+
+    expected = _copy_frame_by_frame(ref_file, set(LOST), 30)
+    with y4m.Y4MReader(ref_file) as ref:
+        kept = video_quality.kept_ranges(ref, pd.DataFrame({'frame_number': LOST}), 30)
+        assert _copy_to_pipe(ref, kept) == expected
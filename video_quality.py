@@ -1,10 +1,18 @@
+import csv
+import io
+import os
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
-import cv2
-import ffmpeg_quality_metrics as ffmpeg
+import numpy as np
+import pandas as pd
 from pandas import DataFrame
 
 import parsers
+import serializers
+import y4m
 
 
 def map_frames_sender_pipeline(tx_df):
@@ -48,37 +56,62 @@ def map_frames_receiver_pipeline(rx_df):
     return rx_merged
 
 
-def get_lost_frames(sender_log_file, receiver_log_file):
-    tx_df = parsers.parse_json_log(sender_log_file)
-    tx_merged = map_frames_sender_pipeline(tx_df)
+def get_frames(tx_df, rx_df):
+    """Returns one row per raw frame with its lifecycle timestamps, size and status.
 
-    rx_df = parsers.parse_json_log(receiver_log_file)
+    status is 'received' if the frame was decoded, 'dropped' if it never got an
+    RTP mapping (e.g. dropped by the encoder), 'lost' if it was sent but not
+    played out and 'truncated' if it was sent after the last received frame."""
+    # datetimes keep the timestamps of incomplete frames exact (NaT instead of NaN)
+    tx_df = tx_df.assign(time=pd.to_datetime(tx_df['time']))
+    rx_df = rx_df.assign(time=pd.to_datetime(rx_df['time']))
+    tx_merged = map_frames_sender_pipeline(tx_df)
     rx_merged = map_frames_receiver_pipeline(rx_df)
 
-    # Left anti join: get rows from tx_merged where rtp-timestamp is NOT in rx_merged
-    # <=> all frames that where not played out
-    lost_frames_df = tx_merged[~tx_merged['rtp-timestamp_mapping']
-                               .isin(rx_merged['rtp-timestamp_mapping'])]
-
-    # Remove lost frames with timestamp larger than max received timestamp
-    max_rx_timestamp = rx_merged['rtp-timestamp_mapping'].max()
-    lost_frames_df = lost_frames_df[lost_frames_df['rtp-timestamp_mapping']
-                                    <= max_rx_timestamp]
-
-    return lost_frames_df
+    # one row per frame on each side, the mapping is logged for every packet
+    tx_frames = tx_merged.groupby('frame-count_ori', dropna=True).agg(
+        pts=('pts-shifted', 'first'),
+        rtp_timestamp=('rtp-timestamp_mapping', 'first'),
+        time_encoder_sink=('time_ori', 'first'),
+        time_encoder_src=('time_frame', 'first'),
+        time_rtp_mapping=('time_mapping', 'min'),
+        size=('length_frame', 'first'),
+        packets=('rtp-timestamp_mapping', 'count'),
+    )
+    tx_frames.index = tx_frames.index.astype('int64').rename('frame_number')
+    rx_frames = rx_merged.groupby('rtp-timestamp_mapping').agg(
+        time_decoder_src=('time_frame', 'first'),
+        received_packets=('rtp-timestamp_mapping', 'count'),
+    )
+
+    frames = tx_frames.reset_index().merge(
+        rx_frames, left_on='rtp_timestamp', right_index=True, how='left')
+    frames['received_packets'] = frames['received_packets'].fillna(
+        0).astype('int64')
+
+    max_rx_timestamp = rx_frames.index.max()
+    frames['status'] = 'truncated'
+    frames.loc[frames['rtp_timestamp'] <= max_rx_timestamp, 'status'] = 'lost'
+    frames.loc[frames['time_decoder_src'].notna(), 'status'] = 'received'
+    frames.loc[frames['rtp_timestamp'].isna(), 'status'] = 'dropped'
+
+    return frames
+
+
+def get_lost_frames(frames):
+    """all frames that where sent but not played out"""
+    return frames[frames['status'] == 'lost']
 
 
 def export_lost_frames_csv(lost_frames: DataFrame, out_file: Path):
-    export_df = lost_frames[['frame-count_ori', 'rtp-timestamp_mapping']]
-    export_df = export_df.rename(columns={
-        'frame-count_ori': 'frame_number',
-        'rtp-timestamp_mapping': 'rtp_timestamp'
-    })
+    export_df = lost_frames[['frame_number', 'rtp_timestamp']]
     export_df.to_csv(out_file, index=False)
 
 
-def remove_frames(ref_file: Path, lost_frames, out_file: Path, num_frames: int):
-    frames_to_skip = sorted(lost_frames['frame-count_ori'].astype(int))
+def kept_ranges(ref, lost_frames, num_frames: int):
+    """byte ranges of the first num_frames frames of the reference (a
+    y4m.Y4MReader) without the lost frames"""
+    frames_to_skip = lost_frames['frame_number'].astype(int).to_numpy()
 
     # Example:
     # YUV4MPEG2 <tagged-fields>\n
@@ -87,122 +120,200 @@ def remove_frames(ref_file: Path, lost_frames, out_file: Path, num_frames: int):
     # data...FRAME <tagged-fields>\n
     # data...
 
-    with open(ref_file, 'rb') as infile, open(out_file, 'wb') as outfile:
-        header = infile.readline()
-
-        if not header.startswith(b'YUV4MPEG2'):
-            raise ValueError("Not a valid Y4M file")
-
-        outfile.write(header)
-
-        # Parse dimensions
-        header_str = header.decode()
-        width = int(header_str.split('W')[1].split()[0])
-        height = int(header_str.split('H')[1].split()[0])
-
-        chroma_format = ''
-        if 'C' in header_str:
-            chroma_tag = header_str.split('C')[1].split()[0]
-            if chroma_tag.startswith('420'):
-                chroma_format = '420'
-            elif chroma_tag.startswith('422'):
-                chroma_format = '422'
-            elif chroma_tag.startswith('444'):
-                chroma_format = '444'
-            elif chroma_tag.startswith('mono'):
-                chroma_format = 'mono'
-            else:
-                raise ValueError(
-                    "Could not determine chroma format from Y4M header")
-
-        frame_pixels = width * height
-
-        frame_data_size = 0
-        if chroma_format == '420':
-            # 4:2:0 - for every 4 luma -> two chroma => 0.5 chroma per luma
-            frame_data_size = int(frame_pixels * 1.5)
-
-        elif chroma_format == '422':
-            # 4:2:2 - For every 2 luma -> two choma ==> 1 chroma per luma
-            frame_data_size = frame_pixels * 2
-
-        elif chroma_format == '444':
-            # 4:4:4 - For every luma -> 2 chroma per luma
-            frame_data_size = frame_pixels * 3
-
-        elif chroma_format == 'mono':
-            # Monochrome - luma only
-            frame_data_size = frame_pixels
-        else:
-            raise ValueError("Unsupported chroma format")
-
-        frame_idx = 0
-        frames_written = 0
+    # runs of kept frames are contiguous in the file => copy byte ranges
+    kept = np.setdiff1d(np.arange(min(num_frames, len(ref))), frames_to_skip)
+    ranges = ref.ranges(kept)
+    print(f"Reference without lost frames has {len(kept)} frames "
+          f"({len(ranges)} contiguous ranges)")
+    return ranges
 
-        for _ in range(num_frames):
-            # Read "FRAME\n" text marker
-            frame_marker = infile.readline()
-            if not frame_marker:
-                break
 
-            # Read frame exactly
-            frame_data = infile.read(frame_data_size)
-            if len(frame_data) != frame_data_size:
-                break
-
-            # Write if not skipped
-            if frame_idx not in frames_to_skip:
-                outfile.write(frame_marker)
-                outfile.write(frame_data)
-                frames_written += 1
+def remove_frames(ref_file: Path, lost_frames, out_file: Path, num_frames: int):
+    with y4m.Y4MReader(ref_file) as ref, open(out_file, 'wb') as outfile:
+        outfile.write(ref.header)
+        ref.copy_ranges(kept_ranges(ref, lost_frames, num_frames), outfile)
 
-            frame_idx += 1
 
-            if frame_idx % 100 == 0:
-                print(f"Processed {frame_idx}/{num_frames} frames", end='\r')
+def _feed_reference(ref, ranges, pipe, progress):
+    """writes the header and the byte ranges of the reference to the pipe,
+    ffmpeg may stop reading early when the distorted video is shorter"""
+    try:
+        pipe.write(ref.header)
+        progress.update(len(ref.header))
+        for start, end in ranges:
+            ref.copy_ranges([(start, end)], pipe)
+            progress.update(end - start)
+    except BrokenPipeError:
+        pass
+    finally:
+        try:
+            pipe.close()
+        except BrokenPipeError:
+            pass
+
+
+# metrics computed for a streamed reference, in the order of ffmpeg_quality_metrics
+STREAMED_METRICS = ('ssim', 'psnr')
+
+
+def _metric_filter_graph(stats_files, scaler='bicubic'):
+    """filter graph comparing input 1 (distorted, scaled to the reference)
+    with input 0 (reference) frame by frame, as ffmpeg_quality_metrics does,
+    each metric writes its per frame stats to stats_files[metric]"""
+    framesync = 'shortest=1:repeatlast=0'
+    chains = [
+        '[0]settb=AVTB,setpts=PTS-STARTPTS[refaligned]',
+        '[refaligned]split=2[refscale][refpts]',
+        '[1]settb=AVTB,setpts=PTS-STARTPTS[distaligned]',
+        f'[distaligned][refscale]scale=rw:rh:flags={scaler}[distpts]',
+    ]
+    for source in ('dist', 'ref'):
+        chains.append(f'[{source}pts]split={len(stats_files)}'
+                      + ''.join(f'[{source}{metric}]' for metric in stats_files))
+    for metric, path in stats_files.items():
+        chains.append(f"[dist{metric}][ref{metric}]{metric}='{path}':{framesync}")
+    return ';'.join(chains)
+
+
+def _read_stats_file(path, metric):
+    """per frame stats of ffmpeg's psnr or ssim filter, with the column names
+    and rounding of ffmpeg_quality_metrics. Lines look like:
+    n:1 mse_avg:529.52 mse_y:887.00 ... psnr_avg:20.89 psnr_y:18.65 ...
+    n:1 Y:0.937213 U:0.961733 V:0.945788 All:0.948245 (12.860441)"""
+    rows = []
+    with open(path) as f:
+        for line in f:
+            fields = line.strip().split(' (')[0].split()
+            if not fields:
+                continue
+            row = {}
+            for field in fields:
+                key, value = field.split(':')
+                if key == 'n':
+                    row[key] = int(value)
+                    continue
+                if metric == 'ssim':
+                    key = 'ssim_' + key.lower().replace('all', 'avg')
+                row[key] = round(float(value), 3)
+            rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def stream_quality_metrics(ref, ranges, dist_file, fps, threads=0, scaler='bicubic',
+                           progress=True, ffmpeg_path='ffmpeg'):
+    """PSNR and SSIM per frame of dist_file against the byte ranges of the
+    reference (a y4m.Y4MReader), which are piped into ffmpeg's stdin instead
+    of writing a copy. threads and scaler are the options of
+    ffmpeg_quality_metrics. Returns a DataFrame with the columns of
+    ffmpeg_quality_metrics' CSV results (see results_csv)."""
+    from tqdm import tqdm
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        stats_files = {metric: Path(tmp_dir) / f'{metric}.txt' for metric in STREAMED_METRICS}
+        cmd = [
+            ffmpeg_path, '-nostats', '-y', '-threads', str(threads),
+            '-r', str(fps), '-f', 'yuv4mpegpipe', '-i', 'pipe:0',
+            '-r', str(fps), '-i', str(dist_file),
+            '-filter_complex', _metric_filter_graph(stats_files, scaler),
+            '-an', '-f', 'null', os.devnull,
+        ]
+        total = len(ref.header) + sum(end - start for start, end in ranges)
+        proc = subprocess.Popen(cmd, stdin=subprocess.PIPE,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        with tqdm(total=total, unit='B', unit_scale=True, desc=', '.join(STREAMED_METRICS),
+                  disable=not progress) as bar, ThreadPoolExecutor(1) as feeder:
+            fed = feeder.submit(_feed_reference, ref, ranges, proc.stdin, bar)
+            stderr = proc.stderr.read().decode('utf-8')
+            proc.wait()
+            fed.result()
+
+        if proc.returncode != 0:
+            raise RuntimeError(f"error running command: {' '.join(cmd)}\n{stderr}")
+
+        df = None
+        for metric, path in stats_files.items():
+            stats = _read_stats_file(path, metric)
+            df = stats if df is None else df.merge(stats, on='n', how='outer')
+
+    if df is None or df.empty:
+        raise ValueError('ffmpeg computed no quality metrics')
+    df = df.sort_values('n')
+    df = df[['n'] + sorted(c for c in df.columns if c != 'n')]
+    df['input_file_dist'] = str(dist_file)
+    df['input_file_ref'] = str(ref.path)
+    return df
+
+
+def results_csv(df):
+    """quality metrics of stream_quality_metrics as CSV text, written like
+    FfmpegQualityMetrics.get_results_csv (csv.writer, str values, empty
+    fields for missing values)"""
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(df.columns)
+    for row in df.itertuples(index=False):
+        writer.writerow(['' if pd.isna(value) else str(value) for value in row])
+    return output.getvalue()
+
+
+def get_fps(video_file):
+    """frame rate from the Y4M header, other formats are probed with OpenCV"""
+    try:
+        with y4m.Y4MReader(video_file) as video:
+            if video.fps is not None:
+                return video.fps
+    except ValueError:
+        pass
 
-        print(f"\nFinished copy: ref video has {frames_written} frames")
+    import cv2
+    cam = cv2.VideoCapture(video_file)
+    return cam.get(cv2.CAP_PROP_FPS)
 
 
 def calculate_quality_metrics(ref_file, input_dir, out_dir):
     dist_file = Path(input_dir) / "out.y4m"
 
-    cam = cv2.VideoCapture(ref_file)
-    fps = cam.get(cv2.CAP_PROP_FPS)
+    fps = get_fps(ref_file)
 
+    frames_feather = Path(input_dir) / "frames.feather"
     try:
-        lost_frames = get_lost_frames(f'{input_dir}/sender.stderr.log',
-                                      f'{input_dir}/receiver.stderr.log')
-    except (KeyError):
+        if frames_feather.is_file():
+            frames = serializers.read_feather(frames_feather)
+        else:
+            frames = get_frames(parsers.parse_json_log(f'{input_dir}/sender.stderr.log'),
+                                parsers.parse_json_log(f'{input_dir}/receiver.stderr.log'))
+    except (KeyError, ValueError):
         print("Invalid log files")
         return
+    lost_frames = get_lost_frames(frames)
 
     config = parsers.parse_json_log_no_convert(f'{input_dir}/config.json')
     duration = config['duration'][0]
     num_frames = int(fps * duration)
 
+    # only needed for the video-quality command
+    import ffmpeg_quality_metrics as ffmpeg
+
     if len(lost_frames) > 0:
-        print("Distorted video has missing frames. Create copy of reference and remove missing frames...")
+        print("Distorted video has missing frames. Stream reference without missing frames...")
 
-        tmp_file = Path(out_dir) / "tmp_ref_file.y4m"
         lost_frame_log = Path(out_dir) / "lost_frames.csv"
-
-        remove_frames(Path(ref_file), lost_frames, tmp_file, num_frames)
         export_lost_frames_csv(lost_frames, lost_frame_log)
 
-        qm = ffmpeg.FfmpegQualityMetrics(
-            ref=str(tmp_file), dist=str(dist_file), framerate=fps, progress=True)
-        qm.calculate()
-
-        tmp_file.unlink()
+        with y4m.Y4MReader(ref_file) as ref:
+            ranges = kept_ranges(ref, lost_frames, num_frames)
+            df = stream_quality_metrics(
+                ref, ranges, dist_file, fps,
+                threads=ffmpeg.FfmpegQualityMetrics.DEFAULT_THREADS,
+                scaler=ffmpeg.FfmpegQualityMetrics.DEFAULT_SCALER)
+        csv_output = results_csv(df)
 
     else:
         qm = ffmpeg.FfmpegQualityMetrics(
             ref=ref_file, dist=str(dist_file), framerate=fps, progress=True, num_frames=num_frames)
 
         qm.calculate()
-
-    csv_output = qm.get_results_csv()
+        csv_output = qm.get_results_csv()
 
     with open(f"{out_dir}/video.quality.csv", "w+") as f:
         f.write(csv_output)
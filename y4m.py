@@ -0,0 +1,198 @@
+import errno
+import mmap
+import os
+import stat
+from fractions import Fraction
+
+import numpy as np
+
+FRAME_MARKER = b'FRAME'
+
+# (horizontal, vertical) chroma subsampling by chroma tag prefix, None for luma only
+_SUBSAMPLING = {
+    '420': (2, 2),
+    '422': (2, 1),
+    '444': (1, 1),
+    '411': (4, 1),
+    'mono': None,
+}
+
+
+def _parse_header(line):
+    """tags of the stream header line as dict, e.g. {'W': '1280', ...}"""
+    fields = line.decode('ascii').split()
+    if not fields or fields[0] != 'YUV4MPEG2':
+        raise ValueError('Not a valid Y4M file')
+    return {field[0]: field[1:] for field in fields[1:]}
+
+
+def _plane_layout(chroma, width, height):
+    """(dtype, [(rows, columns), ...]) of the planes of a frame"""
+    for prefix, subsampling in _SUBSAMPLING.items():
+        if chroma.startswith(prefix):
+            break
+    else:
+        raise ValueError(f'Unsupported chroma format {chroma}')
+
+    depth = chroma[len(prefix):]
+    wide = depth in ('16',) or depth.startswith(('p9', 'p10', 'p12', 'p14', 'p16'))
+    dtype = np.dtype('<u2') if wide else np.dtype('u1')
+
+    planes = [(height, width)]
+    if subsampling is not None:
+        sx, sy = subsampling
+        chroma_plane = (-(-height // sy), -(-width // sx))
+        planes += [chroma_plane, chroma_plane]
+        if depth == 'alpha':
+            planes.append((height, width))
+    return dtype, planes
+
+
+# errors of copy_file_range and sendfile for files they cannot copy between,
+# the next copy method is used then
+_UNSUPPORTED = {errno.EINVAL, errno.EXDEV, errno.ENOSYS, errno.EOPNOTSUPP}
+
+# bytes written at once if the kernel cannot copy
+COPY_CHUNK = 16 * 1024 * 1024
+
+
+def _copy_file_range(src, dst, offset, count):
+    return os.copy_file_range(src, dst, count, offset)
+
+
+def _sendfile(src, dst, offset, count):
+    return os.sendfile(dst, src, offset, count)
+
+
+class Y4MReader:
+    """Memory mapped Y4M file. The byte offsets of all frames are indexed once
+    when opening (FRAME lines may carry their own tagged parameters), frames
+    are returned as NumPy views into the mapping without copying."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        header_end = self._mm.find(b'\n')
+        if header_end < 0:
+            raise ValueError('Not a valid Y4M file')
+        self.header = self._mm[:header_end + 1]
+        self.tags = _parse_header(self.header)
+        self.width = int(self.tags['W'])
+        self.height = int(self.tags['H'])
+        self.chroma = self.tags.get('C', '420jpeg')
+        self.dtype, self.planes = _plane_layout(self.chroma, self.width, self.height)
+        self.frame_size = sum(rows * columns for rows, columns in self.planes) * self.dtype.itemsize
+
+        self.starts, self.data_offsets = self._index(header_end + 1)
+        # working copy methods per kind of output (file, pipe, ...)
+        self._copiers = {}
+
+    def _index(self, pos):
+        """offsets of the FRAME lines and of the frame data, a truncated last frame is left out"""
+        starts = []
+        data_offsets = []
+        size = len(self._mm)
+        while pos < size:
+            if self._mm[pos:pos + len(FRAME_MARKER)] != FRAME_MARKER:
+                raise ValueError(f'Missing FRAME marker at byte {pos}')
+            line_end = self._mm.find(b'\n', pos)
+            if line_end < 0 or line_end + 1 + self.frame_size > size:
+                break
+            starts.append(pos)
+            data_offsets.append(line_end + 1)
+            pos = line_end + 1 + self.frame_size
+        return np.array(starts, dtype='int64'), np.array(data_offsets, dtype='int64')
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def fps(self):
+        """frame rate of the F tag, None if the header has none"""
+        if 'F' not in self.tags:
+            return None
+        num, den = self.tags['F'].split(':')
+        return float(Fraction(int(num), int(den)))
+
+    def frame_range(self, i):
+        """(start, end) bytes of frame i including its FRAME line"""
+        return int(self.starts[i]), int(self.data_offsets[i]) + self.frame_size
+
+    def frame_bytes(self, i):
+        """frame i including its FRAME line as bytes (a copy)"""
+        start, end = self.frame_range(i)
+        return self._mm[start:end]
+
+    def ranges(self, frames):
+        """(start, end) bytes of the frames (indices), adjacent frames are
+        merged into one range as they follow each other in the file"""
+        frames = np.unique(np.asarray(frames, dtype='int64'))
+        if len(frames) == 0:
+            return []
+        breaks = np.flatnonzero(np.diff(frames) != 1)
+        first = frames[np.concatenate(([0], breaks + 1))]
+        last = frames[np.concatenate((breaks, [len(frames) - 1]))]
+        return list(zip(self.starts[first].tolist(),
+                        (self.data_offsets[last] + self.frame_size).tolist()))
+
+    def copy_ranges(self, ranges, out):
+        """writes the byte ranges of the file to the file object out. The
+        kernel copies them with copy_file_range (files) or sendfile (also
+        pipes and sockets), writes from the mapping are the fallback."""
+        out.flush()
+        dst = out.fileno()
+        # methods that failed for this kind of output are not tried again
+        copiers = self._copiers.setdefault(
+            stat.S_IFMT(os.fstat(dst).st_mode),
+            [copier for copier, name in [(_copy_file_range, 'copy_file_range'),
+                                         (_sendfile, 'sendfile')]
+             if hasattr(os, name)])
+        with open(self.path, 'rb') as src:
+            for start, end in ranges:
+                offset = start
+                while offset < end:
+                    if copiers:
+                        try:
+                            copied = copiers[0](src.fileno(), dst, offset, end - offset)
+                        except OSError as e:
+                            if e.errno not in _UNSUPPORTED:
+                                raise
+                            copiers.pop(0)
+                            continue
+                    else:
+                        copied = os.write(dst, self._mm[offset:min(end, offset + COPY_CHUNK)])
+                    if copied == 0:
+                        raise OSError(f'unexpected end of {self.path} at byte {offset}')
+                    offset += copied
+
+    def frame(self, i):
+        """samples of frame i as flat read only array (no copy)"""
+        return np.frombuffer(self._mm, dtype=self.dtype,
+                             count=self.frame_size // self.dtype.itemsize,
+                             offset=int(self.data_offsets[i]))
+
+    def frame_planes(self, i):
+        """planes (Y, U, V[, A]) of frame i as 2D read only arrays (no copy)"""
+        data = self.frame(i)
+        planes = []
+        offset = 0
+        for rows, columns in self.planes:
+            planes.append(data[offset:offset + rows * columns].reshape(rows, columns))
+            offset += rows * columns
+        return planes
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.frame_planes(i)
+
+    def close(self):
+        """unmaps the file, fails with BufferError while frame views are alive"""
+        self._mm.close()